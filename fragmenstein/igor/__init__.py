@@ -18,6 +18,7 @@ from typing import Dict, List, Optional, Tuple, Union, Sequence
 from ._igor_init import _IgorInit, pyrosetta
 from ._igor_min import _IgorMin
 from ._igor_utils import _IgorUtils
+from .resource_cache import ResourceCache
 
 # this contains the init and the two classmethods.
 
@@ -42,6 +43,16 @@ class Igor(_IgorInit, _IgorMin, _IgorUtils):
     If it is a pyrosetta.Vector1 it is assumed that 1 mean select this residue (as a result of a ``selector.apply(pose)`` operation)
     If it is a list or tuple, the elements are interpreted similarly to ligand.
 
+    The apo poses and the score functions are cached per process in the class attribute ``resource_cache``
+    (a ``ResourceCache``), so ``Igor.from_apo_pdbblock(..)`` splices a ligand into a copy of the apo pose
+    without parsing the protein again.
+
+    ``ligand_score`` gets the interaction energy of the ligand from the energy graph of the pose (``score_interaction``)
+    and from a copy of the pose with the ligand moved away (``score_split``, the ``xyz_`` keys).
+    Setting the class attribute ``ligand_scoring_mode`` to 'interaction' skips the latter, the costly one
+    ('split' skips the former). ``ligand_score(mode=...)`` overrides it for a call:
+    ``Victor.reanimate`` scores its rounds with 'interaction' and splits only the final pose.
+
     """
 
     def residues_in_selector(self, pose: pyrosetta.Pose, selector) -> List[str]:
@@ -13,12 +13,20 @@ from typing import Dict, List, Optional, Tuple, Union, Sequence
 
 from warnings import warn
 
+from .resource_cache import ResourceCache
+
 
 class _IgorInit:
     atom_pair_constraint = 10
     angle_constraint = 10
     coordinate_constraint = 1
     fa_intra_rep = 0.005
+    # how ``ligand_score`` gets the interaction energy: 'interaction' (energy graph), 'split' (copy of pose) or 'both'
+    # ('both' keeps the ``xyz_`` keys of the split, 'interaction' is the cheap opt-in;
+    # Victor scores its reanimation rounds in 'interaction' mode regardless and splits the final pose alone)
+    ligand_scoring_mode = 'both'
+    # apo PDB blocks, apo poses and score functions shared by the placements in this process
+    resource_cache = ResourceCache()
 
     # ============= Init ===============================================================================================
 
@@ -36,7 +44,7 @@ class _IgorInit:
         :param key_residues: multiple entries -see class docstring
         """
         self.pose = pose
-        pyrosetta.create_score_function('ref2015')(pose)
+        self.resource_cache.get_scorefxn('ref2015')(pose)
         self.constraint_file = constraint_file
         self.ligand_residue = self._parse_residue(ligand_residue)
         self.key_residues = self._parse_key_residues(key_residues)
@@ -57,6 +65,42 @@ class _IgorInit:
         pyrosetta.rosetta.core.import_pose.pose_from_pdbstring(pose, pdbblock)
         return cls(pose, constraint_file, ligand_residue, key_residues)
 
+    @classmethod
+    def from_apo_pdbblock(cls,
+                          apo_pdbblock: str,
+                          ligand_pdbblock: str,
+                          params_file: str,
+                          constraint_file: str,
+                          ligand_residue: Union[str, int, Tuple[int, str], pyrosetta.Vector1] = 'LIG',
+                          key_residues: Union[None, Sequence[Union[int, str, Tuple[int, str]]], pyrosetta.Vector1] = None):
+        """
+        Given the apo PDB block and that of a non-covalent ligand, splice the ligand into a copy of the apo pose,
+        which is parsed only once per process (see ``resource_cache``).
+        This is ``from_pdbblock`` of the two blocks joined, without parsing the protein again.
+        A covalent ligand needs the LINK record of the joined block (patched residues), so ``from_pdbblock``.
+
+        :param apo_pdbblock: pdb block of the protein
+        :param ligand_pdbblock: pdb block of the ligand residue
+        :param params_file: params file
+        :param constraint_file: filename
+        :param ligand_residue: ligand -see class docstring
+        :param key_residues: multiple entries -see class docstring
+        :return:
+        """
+        params_paths = pyrosetta.rosetta.utility.vector1_string()
+        params_paths.extend([params_file])
+        pose = cls.resource_cache.get_apo_pose(apo_pdbblock)
+        pyrosetta.generate_nonstandard_residue_set(pose, params_paths)
+        ligand = pyrosetta.Pose()
+        pyrosetta.generate_nonstandard_residue_set(ligand, params_paths)
+        pyrosetta.rosetta.core.import_pose.pose_from_pdbstring(ligand, ligand_pdbblock)
+        # like the parser, the new chain is rooted on the first residue.
+        pose.append_residue_by_jump(ligand.residue(1), 1, '', '', True)
+        pose.pdb_info().set_resinfo(res=pose.total_residue(),
+                                    chain_id=ligand.pdb_info().chain(1),
+                                    pdb_res=ligand.pdb_info().number(1))
+        return cls(pose, constraint_file, ligand_residue, key_residues)
+
     @classmethod
     def from_pdbfile(cls,
                      pdbfile: str,
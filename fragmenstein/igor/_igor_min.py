@@ -122,7 +122,10 @@ class _IgorMin:
             return float('nan')
 
     def _get_scorefxn(self, name: str = "ref2015"):
-        scorefxn = pyrosetta.create_score_function(name)
+        scorefxn = self.resource_cache.get_scorefxn(name, {'atom_pair_constraint': self.atom_pair_constraint,
+                                                           'angle_constraint': self.angle_constraint,
+                                                           'coordinate_constraint': self.coordinate_constraint,
+                                                           'fa_intra_rep': self.fa_intra_rep})
         # ref2015_cart_cst.wts
         # constrain
         if self.constraint_file:
@@ -133,11 +136,6 @@ class _IgorMin:
         coord = pyrosetta.rosetta.protocols.relax.AtomCoordinateCstMover()
         coord.set_native_pose(self.pose.clone())
         coord.apply(self.pose)
-        stm = pyrosetta.rosetta.core.scoring.ScoreTypeManager()
-        scorefxn.set_weight(stm.score_type_from_name("atom_pair_constraint"), self.atom_pair_constraint)
-        scorefxn.set_weight(stm.score_type_from_name("angle_constraint"), self.angle_constraint)
-        scorefxn.set_weight(stm.score_type_from_name("coordinate_constraint"), self.coordinate_constraint)
-        scorefxn.set_weight(stm.score_type_from_name("fa_intra_rep"), self.fa_intra_rep)
         return scorefxn
 
     def _get_selector(self,
@@ -323,16 +321,66 @@ class _IgorMin:
 
 
 
-    def ligand_score(self):
+    def ligand_score(self, mode: Optional[str] = None):
+        """
+        The scores of the ligand. The interaction energy is got as per ``mode``
+        ('interaction', 'split' or 'both', see ``score_interaction`` and ``score_split``).
+
+        :param mode: if None the class attribute ``ligand_scoring_mode`` is used.
+        :return:
+        """
+        if mode is None:
+            mode = self.ligand_scoring_mode
         lig_pos = self.ligand_residue[0]
         # no constraints here
-        scorefxn = pyrosetta.rosetta.core.scoring.ScoreFunctionFactory.create_score_function("ref2015")
-        scorefxn(self.pose)
+        scorefxn = self.resource_cache.get_scorefxn('ref2015')
+        holo_score = scorefxn(self.pose)
         sfxd = self.detailed_scores(self.pose, lig_pos)
-        return {'MMFF_ligand': self.MMFF_score(delta=True),
-                'holo_ref2015': scorefxn(self.pose),
-                'ligand_ref2015': sfxd,
-                **self.score_split()}
+        scores = {'MMFF_ligand': self.MMFF_score(delta=True),
+                  'holo_ref2015': holo_score,
+                  'ligand_ref2015': sfxd}
+        if mode not in ('interaction', 'split', 'both'):
+            raise ValueError(f'ligand_scoring_mode {mode} is not interaction, split or both')
+        if mode in ('interaction', 'both'):
+            scores['interaction_ref2015'] = self.score_interaction(scorefxn=scorefxn)  # the pose is scored
+        if mode in ('split', 'both'):
+            scores.update(self.score_split())
+        return scores
+
+    def score_interaction(self,
+                          scorefxn: Optional[pyrosetta.ScoreFunction] = None,
+                          pose: Optional[pyrosetta.Pose] = None) -> Dict[str, float]:
+        """
+        The interaction energy of the ligand with the rest of the pose (weighted, by score type and ``total_score``),
+        summed over the edges of the ligand in the energy graph of the scored pose.
+        This is the ∆∆G of ``score_split`` (``xyz_∆∆G``) without copying the pose and scoring it again
+        with the ligand 500 Å away, bar the context dependence of the hydrogen bonds of the protein
+        and, if covalent, the terms of the bond that ``score_split`` severs: ``score_split`` is kept to verify it.
+
+        :param scorefxn: the score function the pose was scored with (if None, ref2015 and the pose is scored)
+        :param pose: if no pose is provided self.pose is used.
+        :return: score type name to interaction energy
+        """
+        if pose is None:
+            pose = self.pose
+        if scorefxn is None:
+            scorefxn = self.resource_cache.get_scorefxn('ref2015')
+            scorefxn(pose)
+        lig_pos = self.ligand_residue[0]
+        graph = pose.energies().energy_graph()
+        weights = scorefxn.weights()
+        score_types = list(scorefxn.get_nonzero_weighted_scoretypes())
+        names = [pyrosetta.rosetta.core.scoring.name_from_score_type(score_type) for score_type in score_types]
+        energies = dict.fromkeys(names, 0.)
+        for resi in range(1, pose.total_residue() + 1):
+            edge = graph.find_energy_edge(lig_pos, resi) if resi != lig_pos else None
+            if edge is None:  # not a neighbour
+                continue
+            emap = edge.fill_energy_map()
+            for name, score_type in zip(names, score_types):
+                energies[name] += emap[score_type] * weights[score_type]
+        energies['total_score'] = sum(energies.values())
+        return energies
 
     @classmethod
     def detailed_scores(cls, pose, lig_pos:int) -> Dict:
@@ -375,7 +423,7 @@ class _IgorMin:
         xyz.z = 0.0
         for a in range(1, split_pose.residue(lig_pos).natoms() + 1):
             split_pose.residue(lig_pos).set_xyz(a, split_pose.residue(lig_pos).xyz(a) + xyz)
-        scorefxn = pyrosetta.rosetta.core.scoring.ScoreFunctionFactory.create_score_function("ref2015")
+        scorefxn = self.resource_cache.get_scorefxn('ref2015')
         if repack:
             # get neighbourhood
             self._get_selector(ligand_only=True)
@@ -8,7 +8,9 @@ These are extra functionality for Igor
 ########################################################################################################################
 
 import requests, shutil, pyrosetta
-from typing import Optional, Dict
+from typing import Optional, Dict, Tuple
+
+import numpy as np
 
 import pyrosetta
 
@@ -25,7 +27,7 @@ class _IgorUtils:
         docked.pdb_info().set_resinfo(res=self.ligand_residue[0], chain_id='B', pdb_res=1)
         docked.remove_constraints()
         pyrosetta.rosetta.protocols.docking.setup_foldtree(docked, 'A_B', pyrosetta.Vector1([1]))
-        scorefxn = pyrosetta.create_score_function('ligand')
+        scorefxn = self.resource_cache.get_scorefxn('ligand')
         docking = pyrosetta.rosetta.protocols.docking.DockMCMProtocol()
         docking.set_scorefxn(scorefxn)
         docking.apply(docked)
@@ -34,7 +36,8 @@ class _IgorUtils:
     def per_atom_scores(self,
                         pose: Optional[pyrosetta.Pose]=None,
                         target_res: Optional[int]=None,
-                        scorefxn: Optional[pyrosetta.ScoreFunction]=None) -> Dict[str, Dict[str, float]]:
+                        scorefxn: Optional[pyrosetta.ScoreFunction]=None,
+                        cutoff: float = 6.) -> Dict[str, Dict[str, float]]:
         """
         Per atom scores are generally a bad idea as a score relative to something else is better.
         So do treat with the appropriate caution.
@@ -47,9 +50,14 @@ class _IgorUtils:
         * Solvatation (zero)
         * Electrostatic interactions
 
+        Only the atom pairs within ``cutoff`` are evaluated: the residues are preselected by their neighbour atoms
+        and radii and then the atom pairs by their distances (numpy), which, as the terms are zero beyond their range,
+        gives the same scores as evaluating every atom pair of the pose, with thousands of calls instead of millions.
+
         :param pose:
         :param target_res:
         :param scorefxn:
+        :param cutoff: Å, the range of the etable (``-score:fa_max_dis``, which is longer than that of fa_elec)
         :return: a dict of atom names to dict of 'lj_atr', 'lj_rep', 'fa_solv', 'fa_elec' to value
         """
         # Defaults
@@ -58,26 +66,37 @@ class _IgorUtils:
         if pose is None:
             pose = self.pose
         if scorefxn is None:
-            scorefxn = pyrosetta.get_fa_scorefxn() # unconstrained!
+            scorefxn = self.resource_cache.get_scorefxn() # unconstrained!
         # Prep
         score_types = ['lj_atr', 'lj_rep', 'fa_solv', 'fa_elec']
         residue = pose.residue(target_res)
         scores = {residue.atom_name(i): {st: 0 for st in score_types} for i in range(1, residue.natoms() + 1)}
-        # Iterate per target residue's atom per all other residues' atoms
-        for i in range(1, residue.natoms() + 1):
-            iname = residue.atom_name(i)
-            for r in range(1, pose.total_residue() + 1):
-                other = pose.residue(r)
-                for o in range(1, other.natoms() + 1):
-                    score = pyrosetta.toolbox.atom_pair_energy.etable_atom_pair_energies(residue,
-                                                                                         i,
-                                                                                         other,
-                                                                                         o,
-                                                                                         scorefxn)
-                    for st, s in zip(score_types, score):
-                        scores[iname][st] += s
+        # residues that may have an atom within the cutoff
+        # (all atoms are within nbr_radius of the nbr_atom, plus 1 Å of slack for non-ideal geometries)
+        nbr_xyz = np.array([self._xyz2array(pose.residue(r).nbr_atom_xyz()) for r in range(1, pose.total_residue() + 1)])
+        nbr_radii = np.array([pose.residue(r).nbr_radius() for r in range(1, pose.total_residue() + 1)])
+        reach = np.sqrt(np.sum((nbr_xyz - self._xyz2array(residue.nbr_atom_xyz())) ** 2, axis=1))
+        neighbors = np.where(reach <= nbr_radii + residue.nbr_radius() + cutoff + 1.)[0] + 1
+        # Iterate per target residue's atom per close atom of the neighbouring residues
+        target_xyz = np.array([self._xyz2array(residue.xyz(i)) for i in range(1, residue.natoms() + 1)])
+        for r in neighbors:
+            other = pose.residue(int(r))
+            other_xyz = np.array([self._xyz2array(other.xyz(o)) for o in range(1, other.natoms() + 1)])
+            distances = np.sqrt(np.sum((target_xyz[:, np.newaxis, :] - other_xyz[np.newaxis, :, :]) ** 2, axis=2))
+            for i, o in zip(*np.where(distances <= cutoff)):
+                score = pyrosetta.toolbox.atom_pair_energy.etable_atom_pair_energies(residue,
+                                                                                     int(i) + 1,
+                                                                                     other,
+                                                                                     int(o) + 1,
+                                                                                     scorefxn)
+                for st, s in zip(score_types, score):
+                    scores[residue.atom_name(int(i) + 1)][st] += s
         return scores
 
+    @staticmethod
+    def _xyz2array(xyz: pyrosetta.rosetta.numeric.xyzVector_double_t) -> Tuple[float, float, float]:
+        return xyz.x, xyz.y, xyz.z
+
     @classmethod
     def download_map(cls, pdbcode: str, filename: str):
         """
@@ -101,7 +120,7 @@ class _IgorUtils:
         :param ccp4_file: download map from ePDB
         :return: Relaxes pose in place
         """
-        scorefxnED = pyrosetta.get_fa_scorefxn()
+        scorefxnED = cls.resource_cache.get_scorefxn()
         ED = pyrosetta.rosetta.core.scoring.electron_density.getDensityMap(ccp4_file)
         sdsm = pyrosetta.rosetta.protocols.electron_density.SetupForDensityScoringMover()
         sdsm.apply(pose)
@@ -0,0 +1,103 @@
+########################################################################################################################
+
+__doc__ = \
+    """
+Per-process cache (not inherited) of the resources shared by the placements of a batch.
+    """
+
+########################################################################################################################
+
+import hashlib
+import os
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional
+
+import pyrosetta
+
+
+class ResourceCache:
+    """
+    Least-recently-used cache of the resources that are the same for every compound of a batch,
+    namely the apo PDB blocks (by filename and modification time),
+    the apo poses parsed from them (by checksum of the block)
+    and the configured score functions (by name and weights).
+    Each kind has its own bound, as a pose of a large protein is several megabytes.
+
+    The cache is a class attribute of Igor, so it is one per process (a forked worker inherits a copy).
+    Poses and score functions are cloned on the way out, so the cached ones are never altered.
+
+    >>> pose = Igor.resource_cache.get_apo_pose(pdbblock)  # a clone
+    >>> scorefxn = Igor.resource_cache.get_scorefxn('ref2015_cart', {'coordinate_constraint': 1})
+
+    :ivar hits: lookups served from the cache
+    :ivar misses: lookups that made the resource
+    """
+
+    def __init__(self, max_pdbblocks: int = 8, max_poses: int = 4, max_scorefxns: int = 32):
+        self.bounds = {'pdbblock': max_pdbblocks, 'pose': max_poses, 'scorefxn': max_scorefxns}
+        self.stores = {kind: OrderedDict() for kind in self.bounds}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return sum(map(len, self.stores.values()))
+
+    def clear(self) -> None:
+        for store in self.stores.values():
+            store.clear()
+
+    def _get(self, kind: str, key: Hashable, fun: Callable):
+        store = self.stores[kind]
+        if key in store:
+            self.hits += 1
+            store.move_to_end(key)
+            return store[key]
+        self.misses += 1
+        store[key] = value = fun()
+        while len(store) > self.bounds[kind]:
+            store.popitem(last=False)
+        return value
+
+    # ==== resources ===================================================================================================
+
+    def get_pdbblock(self, filename: str) -> str:
+        """
+        The content of the PDB file, read again only if the file was modified.
+        """
+        def read():
+            with open(filename) as fh:
+                return fh.read()
+
+        return self._get('pdbblock', (os.path.abspath(filename), os.path.getmtime(filename)), read)
+
+    def get_apo_pose(self, pdbblock: str) -> pyrosetta.Pose:
+        """
+        A copy of the pose of the PDB block, which is parsed only the first time.
+        """
+        def parse():
+            pose = pyrosetta.Pose()
+            pyrosetta.rosetta.core.import_pose.pose_from_pdbstring(pose, pdbblock)
+            return pose
+
+        return self._get('pose', hashlib.sha1(pdbblock.encode()).hexdigest(), parse).clone()
+
+    def get_scorefxn(self,
+                     name: Optional[str] = None,
+                     weights: Optional[Dict[str, float]] = None) -> pyrosetta.ScoreFunction:
+        """
+        A copy of the score function with the weights of the given score types changed.
+
+        :param name: weights file, e.g. ``ref2015_cart`` (None is the default, ``pyrosetta.get_fa_scorefxn``)
+        :param weights: score type name to weight
+        :return: a copy of the score function
+        """
+        weights = weights or {}
+
+        def create():
+            scorefxn = pyrosetta.create_score_function(name) if name else pyrosetta.get_fa_scorefxn()
+            stm = pyrosetta.rosetta.core.scoring.ScoreTypeManager()
+            for score_type, weight in weights.items():
+                scorefxn.set_weight(stm.score_type_from_name(score_type), weight)
+            return scorefxn
+
+        return self._get('scorefxn', (name, tuple(sorted(weights.items()))), create).clone()
@@ -38,6 +38,7 @@ It is inherited by ``Monster`` only.
 from .positional_mapping import GPM
 from .bond_provenance import BondProvenance
 from .unmerge_mapper import Unmerge
+from .mcs_cache import MCSCache
 
 
 # ---  Monster ---------------------------------------------------------------------------------------------------------
@@ -88,6 +89,11 @@ class Monster(_MonsterUtil, _MonsterPlace, _MonsterCombine):
     If an atom in a Chem.Mol object is provided via ``attachment`` argument and the molecule contains a dummy atom.
     Namely element R in mol file or * in string.
 
+    For many follow-ups against the same hits, ``place_many`` is a generator of positioned mols
+    that does the hit-only steps once:
+
+    >>> for positioned in monster.place_many(mols):
+
     ## Combine
 
     >>> monster.combine(keep_all=True, collapse_rings=True, joining_cutoff= 5))
@@ -135,6 +141,27 @@ class Monster(_MonsterUtil, _MonsterPlace, _MonsterCombine):
     :vartype num_common: int
     :var percent_common: (dynamic) percentage of atoms of follow-up that are present in the hits
     :vartype percent_common: float
+    :cvar mcs_cache: memoised MCS atom maps shared across instances (see ``MCSCache``)
+    :vartype mcs_cache: MCSCache
+    :cvar mcs_timeout: max seconds for a single MCS search
+    :vartype mcs_timeout: int
+    :cvar mcs_budget: max seconds of MCS searches per placement (then only the strict searches are run, cut short)
+    :vartype mcs_budget: int
+    :cvar mcs_max_matches: max substructure matches of the MCS enumerated per molecule
+    :vartype mcs_max_matches: int
+    :ivar mcs_seconds: seconds spent in MCS searches in the last placement
+    :vartype mcs_seconds: float
+    :ivar mcs_exhausted: whether an MCS search timed out or the budget was spent in the last placement
+    :vartype mcs_exhausted: bool
+    :cvar n_workers: processes across which the unmerge search tree is explored (1 is serial)
+    :vartype n_workers: int
+    :cvar sextant_conformers: conformers of the follow-up embedded once per placement and reused by every
+        template/alternative to place the novel atoms (the 'sextant'). One, as before, by default:
+        more give ``sextant_pick_best`` a choice at the cost of embedding and optimising them
+    :vartype sextant_conformers: int
+    :cvar sextant_pick_best: whether each team of novel atoms is placed from the conformer that aligns best
+        (lowest RMSD) as opposed to the first
+    :vartype sextant_pick_best: bool
 
     ``combine`` specific:
 
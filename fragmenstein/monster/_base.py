@@ -10,6 +10,7 @@ import logging
 from typing import List
 from rdkit import Chem
 from rdkit.Chem import rdFMCS
+from .mcs_cache import MCSCache
 
 
 class _MonsterBase:
@@ -53,6 +54,14 @@ class _MonsterBase:
              bondCompare=rdFMCS.BondCompare.CompareOrder,
              ringCompare=rdFMCS.RingCompare.PermissiveRingFusion,
              ringMatchesRingOnly=True)]
+    mcs_timeout = 10  #: max seconds for a single FindMCS call
+    mcs_budget = 60  #: max seconds of FindMCS calls for a single placement
+    mcs_max_matches = 1000  #: max substructure matches of the MCS enumerated per molecule
+    # memoised FindMCS results shared by all instances (``MCSCache(path=...)`` for a disk tier across processes)
+    mcs_cache = MCSCache()
+    n_workers = 1  #: processes across which ``Unmerge`` explores its search tree
+    sextant_conformers = 1  #: ETKDG conformers of the follow-up embedded once per placement (see ``place_from_map``)
+    sextant_pick_best = True  #: per team of novel atoms, use the sextant conformer that aligns best (lowest RMSD)
 
     # ------------------------------------------------------------------------------------------------------------------
 
@@ -86,7 +95,12 @@ class _MonsterBase:
         self.positioned_mol = None  # final molecule
         self.joining_cutoff = 5  # over-ridden
         self.mol_options = []  # equally valid alternatives to self.positioned_mol
+        self.mcs_seconds = 0.  # time spent in FindMCS in the current placement
+        self.mcs_exhausted = False  # a FindMCS timed out or the budget was spent in the current placement
         self._collapsed_ring_offset = 0  # variable to keep track of how much to offset in ring collapse.
+        self._ring_registry = {}  # data of the collapsed rings by handle (see ``_MonsterRing._register_ring``)
+        self._sextant_cache = {}  # embedded conformers of the follow-up (see ``_MonsterBlend._get_sextant``)
+        self._hit_cache = None  # hit-only results shared by the placements of ``place_many`` (dict while it runs)
         # formerly:
         # self.scaffold = None  # template which may have wrong elements in place, or
         # self.chimera = None  # merger of hits but with atoms made to match the to-be-aligned mol
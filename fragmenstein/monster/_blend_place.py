@@ -10,9 +10,10 @@ from rdkit.Chem import rdmolops
 
 import itertools
 import json
+import time
 from collections import Counter
 from collections import defaultdict
-from typing import Optional, Dict, List, Tuple
+from typing import Optional, Dict, List, Tuple, Any, Callable
 from warnings import warn
 
 import numpy as np
@@ -35,8 +36,12 @@ class _MonsterBlend(_MonsterMerge):
         """
         a single scaffold is made (except for ``.unmatched``)
         """
-        self.mol_options = [self.simply_merge_hits()]
-        scaffold = self.posthoc_refine(self.mol_options[0])
+        def merge():
+            merged = self.simply_merge_hits()
+            return [merged, self.posthoc_refine(merged)], list(self.unmatched)
+
+        (merged, scaffold), self.unmatched = self._get_hit_side('full_blending', merge)
+        self.mol_options = [merged]
         chimera = self.make_chimera(scaffold)
         self.keep_copy(scaffold, 'scaffold')
         self.keep_copy(chimera, 'chimera')
@@ -48,7 +53,8 @@ class _MonsterBlend(_MonsterMerge):
         """
         multiple possible scaffolds for placement and best is chosen
         """
-        self.mol_options = self.partially_blend_hits()  # merger of hits
+        # merger of hits
+        self.mol_options, _ = self._get_hit_side('partial_blending', lambda: (self.partially_blend_hits(), []))
         unrefined_scaffold, mode_index = self.pick_best()
         used = unrefined_scaffold.GetProp('_Name').split('-')
         self.unmatched = [h.GetProp('_Name') for h in self.hits if h.GetProp('_Name') not in used]
@@ -78,10 +84,13 @@ class _MonsterBlend(_MonsterMerge):
                                                        matchChiralTag=True)
                 pair_atom_maps = [dict(p) for p in pair_atom_maps_t]
                 maps[template.GetProp('_Name')] = pair_atom_maps
+        hit_matrices, _ = self._get_hit_side('hit_matrices', lambda: (Unmerge.get_hit_matrices(self.hits), []))
         um = Unmerge(followup=self.initial_mol,
                      mols=self.hits,
                      maps=maps,
-                     no_discard=self.throw_on_discard)
+                     no_discard=self.throw_on_discard,
+                     n_workers=self.n_workers,
+                     hit_matrices=hit_matrices)
         self.keep_copy(um.combined, 'scaffold')
         self.keep_copy(um.combined_bonded, 'chimera')
         self.unmatched = [m.GetProp('_Name') for m in um.disregarded]
@@ -100,6 +109,27 @@ class _MonsterBlend(_MonsterMerge):
         self.positioned_mol = self.posthoc_refine(placed)
         self.mol_options = [self.posthoc_refine(mol) for mol in placed_options]
 
+    def _get_hit_side(self, key: str, fun: Callable[[], Tuple[Any, List[str]]]) -> Tuple[Any, List[str]]:
+        """
+        Calls ``fun``, a step that depends on the hits only, which returns its result and the unmatched hit names.
+        During ``place_many`` the result is calculated once and copies of it are returned thereafter.
+
+        :param key: name of the step
+        :param fun: no argument function returning result (a mol, a list of mols or other) and unmatched
+        :return: result and unmatched
+        """
+        if self._hit_cache is None:
+            return fun()
+        if key not in self._hit_cache:
+            self._hit_cache[key] = fun()
+        # the placement may alter the mols, so the cached ones are never handed out
+        result, unmatched = self._hit_cache[key]
+        if isinstance(result, Chem.Mol):
+            result = Chem.Mol(result)
+        elif isinstance(result, list):
+            result = [Chem.Mol(r) if isinstance(r, Chem.Mol) else r for r in result]
+        return result, list(unmatched)
+
     # ================= Blend hits ===================================================================================
 
     def partially_blend_hits(self, hits: Optional[List[Chem.Mol]] = None) -> List[Chem.Mol]:
@@ -332,10 +362,7 @@ class _MonsterBlend(_MonsterMerge):
         # prealignment
         if target_mol is None:
             target_mol = self.initial_mol
-        sextant = Chem.Mol(target_mol)
-        Chem.SanitizeMol(sextant)
-        AllChem.EmbedMolecule(sextant)
-        AllChem.MMFFOptimizeMolecule(sextant)
+        sextant = self._get_sextant(target_mol)
         ######################################################
         # mapping retrieval and sextant alignment
         # variables: atom_map sextant -> uniques
@@ -343,9 +370,10 @@ class _MonsterBlend(_MonsterMerge):
             atom_map, mode = self.get_mcs_mapping(target_mol, template_mol)
             msg = {**{k: str(v) for k, v in mode.items()}, 'N_atoms': len(atom_map)}
             self.journal.debug(f"followup-chimera' = {msg}")
-        rdMolAlign.AlignMol(sextant, template_mol, atomMap=list(atom_map.items()), maxIters=500)
+        conf_id = self._align_sextant(sextant, template_mol, list(atom_map.items()))
         # place atoms that have a known location
-        putty = Chem.Mol(sextant)
+        putty = Chem.Mol(sextant, False, conf_id)
+        putty.GetConformer().SetId(0)
         pconf = putty.GetConformer()
         chimera_conf = template_mol.GetConformer()
         uniques = set()  # unique atoms in followup
@@ -389,8 +417,7 @@ class _MonsterBlend(_MonsterMerge):
                 r = list(categories['dummies'])[0]
                 pconf.SetAtomPosition(r, self.attachment.GetConformer().GetAtomPosition(0))
                 sights.add((r, r))
-            rdMolAlign.AlignMol(sextant, putty, atomMap=list(sights), maxIters=500)
-            sconf = sextant.GetConformer()
+            sconf = sextant.GetConformer(self._align_sextant(sextant, putty, list(sights)))
             self.journal.debug(f'alignment atoms for {unique_idx} ({team}): {sights}')
             # self.draw_nicely(sextant, highlightAtoms=[a for a, b in sights])
             # copy position over
@@ -406,6 +433,50 @@ class _MonsterBlend(_MonsterMerge):
 
 
 
+    def _get_sextant(self, target_mol: Chem.Mol) -> Chem.Mol:
+        """
+        A copy of the target with the conformers of the sextant,
+        which are embedded and MMFF optimised only once per follow-up (``sextant_conformers``)
+        and are reused by all the template/alternative placements.
+
+        :param target_mol:
+        :return:
+        """
+        sextant = Chem.Mol(target_mol)
+        Chem.SanitizeMol(sextant)
+        # the atom order matters, not just the compound
+        key = Chem.MolToSmiles(sextant) + sextant.GetProp('_smilesAtomOutputOrder')
+        if key not in self._sextant_cache:
+            ensemble = Chem.Mol(sextant)
+            AllChem.EmbedMultipleConfs(ensemble, numConfs=self.sextant_conformers)
+            if ensemble.GetNumConformers() == 0:  # ETKDG failed: random coordinates are more forgiving
+                AllChem.EmbedMolecule(ensemble, useRandomCoords=True)
+            if ensemble.GetNumConformers() == 0:
+                raise ValueError(f'The follow-up {Chem.MolToSmiles(sextant)} could not be embedded (sextant)')
+            AllChem.MMFFOptimizeMoleculeConfs(ensemble)
+            self._sextant_cache[key] = ensemble
+        sextant.RemoveAllConformers()
+        for conf in self._sextant_cache[key].GetConformers():
+            sextant.AddConformer(Chem.Conformer(conf), assignId=True)
+        return sextant
+
+    def _align_sextant(self, sextant: Chem.Mol, reference: Chem.Mol, atom_map: List[Tuple[int, int]]) -> int:
+        """
+        Aligns the sextant conformers to the reference
+        and returns the id of the conformer to use: the lowest RMSD if ``sextant_pick_best`` else the first.
+
+        :param sextant:
+        :param reference:
+        :param atom_map: pairs of sextant and reference indices
+        :return: conformer id
+        """
+        conf_ids = [conf.GetId() for conf in sextant.GetConformers()]
+        if not self.sextant_pick_best:
+            conf_ids = conf_ids[:1]
+        rmsds = [rdMolAlign.AlignMol(sextant, reference, prbCid=conf_id, atomMap=atom_map, maxIters=500)
+                 for conf_id in conf_ids]
+        return conf_ids[int(np.argmin(rmsds))]
+
     def transfer_ring_data(self, donor: Chem.Atom, acceptor: Chem.Atom):
         """
         Transfer the info if a ringcore atom.
@@ -423,6 +494,8 @@ class _MonsterBlend(_MonsterMerge):
     def posthoc_refine(self, scaffold, indices: Optional[List[int]] = None) -> Chem.Mol:
         """
         Averages the overlapping atoms.
+        The positions of the hit atoms that overlap each atom are scattered into a (N_atoms, N_hits, 3) masked array,
+        so the mean, standard deviation and max of the deviations are a few reductions.
 
         :param scaffold:
         :return:
@@ -431,35 +504,35 @@ class _MonsterBlend(_MonsterMerge):
             indices = list(range(scaffold.GetNumAtoms()))
         refined = Chem.RWMol(scaffold)
         refconf = refined.GetConformer()
-        positions = defaultdict(list)  # coordinates
-        equivalence = defaultdict(list)  # atom indices of hits.
-        for h in self.hits:
-            if h.GetProp('_Name') in self.unmatched:
+        hits = [h for h in self.hits if h.GetProp('_Name') not in self.unmatched]
+        n_atoms = scaffold.GetNumAtoms()
+        positions = np.zeros((n_atoms, len(hits), 3))  # coordinates
+        equivalence = np.full((n_atoms, len(hits)), -1)  # atom indices of hits.
+        for hi, h in enumerate(hits):
+            mapping = self.get_positional_mapping(scaffold, h)
+            if not mapping:
                 continue
-            hc = h.GetConformer()
-            for k, v in self.get_positional_mapping(scaffold, h).items():
-                positions[k].append([hc.GetAtomPosition(v).x, hc.GetAtomPosition(v).y, hc.GetAtomPosition(v).z])
-                equivalence[k].append(f'{h.GetProp("_Name")}.{v}')
-        for i in range(scaffold.GetNumAtoms()):
-            if i not in indices:
-                continue
-            elif len(positions[i]) == 0:
-                refined.GetAtomWithIdx(i).SetDoubleProp('_Stdev', 0.)
-                refined.GetAtomWithIdx(i).SetDoubleProp('_Max', 0.)
-                refined.GetAtomWithIdx(i).SetProp('_Origin', 'none')
-                # warn(f'Atom {i}  {scaffold.GetAtomWithIdx(i).GetSymbol}/{refined.GetAtomWithIdx(i).GetSymbol} '+ \
-                #     'in scaffold that has no positions.')
-            else:
-                p = np.mean(np.array(positions[i]), axis=0).astype(float)
-                # sd = np.mean(np.std(np.array(positions[i]), axis=0)).astype(float)
-                ds = [np.linalg.norm(p - pi) for pi in positions[i]]
-                sd = np.std(ds)
-                md = np.max(ds)
-                refined.GetAtomWithIdx(i).SetProp('_Origin', json.dumps(equivalence[i]))
-                refined.GetAtomWithIdx(i).SetDoubleProp('_Stdev', sd)
-                refined.GetAtomWithIdx(i).SetDoubleProp('_Max', md)
-                if self.average_position:
-                    refconf.SetAtomPosition(i, Point3D(p[0], p[1], p[2]))
+            ks = np.array(list(mapping.keys()))
+            vs = np.array(list(mapping.values()))
+            positions[ks, hi] = h.GetConformer().GetPositions()[vs]
+            equivalence[ks, hi] = vs
+        present = equivalence != -1
+        positions = np.ma.masked_array(positions, mask=np.repeat(~present[:, :, np.newaxis], 3, axis=2))
+        means = positions.mean(axis=1)
+        deviations = np.sqrt(((positions - means[:, np.newaxis, :]) ** 2).sum(axis=2))
+        stdevs = deviations.std(axis=1).filled(0.)
+        maxima = deviations.max(axis=1).filled(0.)
+        names = [h.GetProp('_Name') for h in hits]
+        origins = ['none' if not present[i].any() else
+                   json.dumps([f'{names[hi]}.{v}' for hi, v in enumerate(equivalence[i]) if v != -1])
+                   for i in range(n_atoms)]
+        for i in indices:
+            atom = refined.GetAtomWithIdx(i)
+            atom.SetProp('_Origin', origins[i])
+            atom.SetDoubleProp('_Stdev', float(stdevs[i]))
+            atom.SetDoubleProp('_Max', float(maxima[i]))
+            if self.average_position and present[i].any():
+                refconf.SetAtomPosition(i, Point3D(*means[i].tolist()))
         Chem.SanitizeMol(refined,
                          sanitizeOps=Chem.rdmolops.SanitizeFlags.SANITIZE_ADJUSTHS +
                                      Chem.rdmolops.SanitizeFlags.SANITIZE_SETAROMATICITY,
@@ -485,6 +558,13 @@ class _MonsterBlend(_MonsterMerge):
         for i, mode in enumerate(self.matching_modes):
             if i < min_mode_index:
                 continue
+            if len(strict) == 0:
+                # no lax match can include a strict one: no point in searching.
+                continue
+            if self.mcs_seconds >= self.mcs_budget:
+                self.mcs_exhausted = True
+                self.journal.warning(f'MCS budget ({self.mcs_budget} s) spent: strict mapping used.')
+                break
             lax = self._get_atom_maps(molA, molB, **mode)
             # remove the lax matches that disobey
             neolax = [l for l in lax if any([len(set(s) - set(l)) == 0 for s in strict])]
@@ -492,11 +572,10 @@ class _MonsterBlend(_MonsterMerge):
                 continue
             else:
                 return [dict(n) for n in neolax], mode
-        else:
-            # Then the strict will have to do.
-            return [dict(n) for n in strict], strict_settings  # tuple to dict
-            # raise ValueError('This is chemically impossible: nothing matches in the MCS step ' +\
-            #                  f'({len(self.matching_modes)} modes tried')
+        # Then the strict will have to do (reported as the strictest matching mode, which is what pick_best expects).
+        return [dict(n) for n in strict], self.matching_modes[-1]  # tuple to dict
+        # raise ValueError('This is chemically impossible: nothing matches in the MCS step ' +\
+        #                  f'({len(self.matching_modes)} modes tried')
 
     def get_mcs_mapping(self, molA, molB, min_mode_index: int = 0) -> Tuple[Dict[int, int], dict]:
         """
@@ -512,20 +591,98 @@ class _MonsterBlend(_MonsterMerge):
         return ms[0], mode
 
     def _get_atom_maps(self, molA, molB, **mode) -> List[List[Tuple[int, int]]]:
-        mcs = rdFMCS.FindMCS([molA, molB], **mode)
+        """
+        Returns the alternative mappings (tuples of pairs of indices of molA and molB) of the MCS.
+        The results are memoised in ``self.mcs_cache`` (class attribute, see ``MCSCache``).
+        """
+        key, orderA, orderB = self.mcs_cache.make_key(molA, molB, mode, self.mcs_max_matches)
+        matches = self.mcs_cache.get(key, orderA, orderB)
+        if matches is None:
+            mcs = self._find_mcs(molA, molB, **mode)
+            matches = self._get_atom_maps_from_mcs(molA, molB, mcs)
+            if not mcs.canceled:  # a timed out search is not the MCS
+                self.mcs_cache.put(key, orderA, orderB, matches)
+        return matches
+
+    def _find_mcs(self, molA, molB, **mode) -> rdFMCS.MCSResult:
+        """
+        ``rdFMCS.FindMCS`` with a timeout of ``mcs_timeout`` seconds, capped by what is left of ``mcs_budget``
+        for the placement. Time spent is added to ``.mcs_seconds``.
+        If the budget is spent (or the search times out) ``.mcs_exhausted`` is set
+        and the search is cut to a second, so the placement goes on with a partial result.
+        (The lax searches of ``get_mcs_mappings`` are skipped altogether once it is spent.)
+        """
+        remaining = self.mcs_budget - self.mcs_seconds
+        if remaining <= 0:
+            self.mcs_exhausted = True
+            self.journal.warning(f'MCS budget ({self.mcs_budget} s) spent: search cut short.')
+        tick = time.time()
+        mcs = rdFMCS.FindMCS([molA, molB], timeout=max(1, int(min(self.mcs_timeout, remaining))), **mode)
+        self.mcs_seconds += time.time() - tick
+        if mcs.canceled:
+            self.mcs_exhausted = True
+            self.journal.warning(f'MCS search timed out ({mode}). Partial result used.')
+        return mcs
+
+    def _get_atom_maps_from_mcs(self, molA, molB, mcs: rdFMCS.MCSResult) -> List[List[Tuple[int, int]]]:
+        """
+        The alternative mappings of the MCS between molA and molB.
+        The matches of each molecule are enumerated once (up to ``mcs_max_matches`` each)
+        and the matches of molA that differ only by a symmetry of the MCS itself are skipped,
+        as they give the same mappings with a different match of molB.
+        """
         common = Chem.MolFromSmarts(mcs.smartsString)
         matches = []
         # prevent a dummy to match a non-dummy, which can happen when the mode is super lax.
         is_dummy = lambda mol, at: mol.GetAtomWithIdx(at).GetSymbol() == '*'
         all_bar_dummy = lambda Aat, Bat: (is_dummy(molA, Aat) and is_dummy(molB, Bat)) or not (
                 is_dummy(molA, Aat) or is_dummy(molB, Bat))
-        for molA_match in molA.GetSubstructMatches(common, uniquify=False):
-            for molB_match in molB.GetSubstructMatches(common, uniquify=False):
+        molA_matches = molA.GetSubstructMatches(common, uniquify=False, maxMatches=self.mcs_max_matches)
+        molB_matches = molB.GetSubstructMatches(common, uniquify=False, maxMatches=self.mcs_max_matches)
+        automorphisms = self._get_query_automorphisms(common, molA_matches)
+        seen = set()
+        for molA_match in molA_matches:
+            # molA_match and molA_match∘σ pair up with the same molB matches but shuffled: same mappings.
+            orbit_key = min(tuple(molA_match[k] for k in sigma) for sigma in automorphisms)
+            if orbit_key in seen:
+                continue
+            seen.add(orbit_key)
+            for molB_match in molB_matches:
                 matches.append([(molA_at, molB_at) for molA_at, molB_at in zip(molA_match, molB_match) if
                                 all_bar_dummy(molA_at, molB_at)])
         # you can map two toluenes 4 ways, but two are repeats.
         matches = set([tuple(sorted(m, key=lambda i: i[0])) for m in matches])
-        return matches
+        return list(matches)
+
+    def _get_query_automorphisms(self, query: Chem.Mol, matches: Tuple[Tuple[int, ...], ...]) \
+            -> List[Tuple[int, ...]]:
+        """
+        The permutations of the query atoms that preserve its atom and bond queries (always including the identity).
+        These are found among the matches that cover the same atoms as the first match.
+
+        :param query: the MCS as a query mol (from SMARTS)
+        :param matches: the uniquify=False matches of the query to a mol
+        :return: list of permutations: ``sigma[k]`` is the query atom that takes the place of ``k``.
+        """
+        identity = tuple(range(query.GetNumAtoms()))
+        if len(matches) == 0:
+            return [identity]
+        first = matches[0]
+        position = {idx: k for k, idx in enumerate(first)}
+        atom_smarts = [atom.GetSmarts() for atom in query.GetAtoms()]
+        bonds = [(bond.GetBeginAtomIdx(), bond.GetEndAtomIdx(), bond.GetSmarts()) for bond in query.GetBonds()]
+        automorphisms = {identity}
+        for match in matches:
+            if set(match) != set(first):
+                continue
+            sigma = tuple(position[idx] for idx in match)
+            if any(atom_smarts[k] != atom_smarts[sigma[k]] for k in identity):
+                continue
+            mapped_bonds = [query.GetBondBetweenAtoms(sigma[i], sigma[j]) for i, j, _ in bonds]
+            if all(bond is not None and bond.GetSmarts() == smarts
+                   for bond, (_, _, smarts) in zip(mapped_bonds, bonds)):
+                automorphisms.add(sigma)
+        return sorted(automorphisms)
 
     def _get_atom_map(self, molA, molB, **mode) -> List[Tuple[int, int]]:
         return self._get_atom_maps(molA, molB, **mode)[0]
@@ -16,7 +16,7 @@ import itertools
 import json
 from collections import defaultdict
 from functools import partial
-from typing import Optional, Dict, List, Any, Tuple, Union, Callable
+from typing import Optional, Dict, List, Any, Tuple, Union, Callable, Sequence
 
 import numpy as np
 from rdkit import Chem
@@ -24,6 +24,8 @@ from rdkit.Geometry.rdGeometry import Point3D
 
 from ._join_neighboring import _MonsterJoinNeigh
 from .bond_provenance import BondProvenance
+from .distance_context import DistanceContext
+from .spatial_index import SpatialIndex
 
 
 ########################################################################################################################
@@ -40,7 +42,8 @@ class _MonsterRing( _MonsterJoinNeigh):
     def collapse_ring(self, mol: Chem.Mol) -> Chem.Mol:
         """
         Collapses a ring(s) into a single dummy atom(s).
-        Stores data as JSON in the atom.
+        Stores the data of the ring atoms in the ring registry (see ``_register_ring``),
+        the dummy atom gets only the handle (``_ring_core``).
 
         :param mol:
         :return:
@@ -48,18 +51,17 @@ class _MonsterRing( _MonsterJoinNeigh):
         self.store_positions(mol)
         mol = Chem.RWMol(mol)
         conf = mol.GetConformer()
+        positions = conf.GetPositions()
         center_idxs = []
         morituri = []
         old2center = defaultdict(list)
+        neighss_per_center = []
+        bondss_per_center = []
         # Store simple info
         for atomset in mol.GetRingInfo().AtomRings():
             morituri.extend(atomset)
             neighs = []
-            neighbonds = []
             bonds = []
-            xs = []
-            ys = []
-            zs = []
             elements = []
             # add elemental ring
             c = mol.AddAtom(Chem.Atom('C'))
@@ -75,27 +77,25 @@ class _MonsterRing( _MonsterJoinNeigh):
                 neighs.append(neigh_i)
                 bond = [mol.GetBondBetweenAtoms(i, j).GetBondType().name for j in neigh_i]
                 bonds.append(bond)
-                pos = conf.GetAtomPosition(i)
-                xs.append(pos.x)
-                ys.append(pos.y)
-                zs.append(pos.z)
                 elements.append(atom.GetSymbol())
-            # store data in elemental ring
+            neighss_per_center.append(neighs)
+            bondss_per_center.append(bonds)
+            xyz = positions[list(atomset)]
+            # store data in the registry
             central.SetIntProp('_ori_i', -1)
-            central.SetProp('_ori_is', json.dumps(atomset))
-            central.SetProp('_neighbors', json.dumps(neighs))
-            central.SetProp('_xs', json.dumps(xs))
-            central.SetProp('_ys', json.dumps(ys))
-            central.SetProp('_zs', json.dumps(zs))
-            central.SetProp('_elements', json.dumps(elements))
-            central.SetProp('_bonds', json.dumps(bonds))
-            conf.SetAtomPosition(c, Point3D(*[sum(axis) / len(axis) for axis in (xs, ys, zs)]))
+            handle = self._register_ring(ori_is=np.array(atomset, dtype=int),
+                                         neighbors=[np.array(neigh_i, dtype=int) for neigh_i in neighs],
+                                         xyz=xyz,
+                                         elements=elements,
+                                         bonds=bonds)
+            central.SetIntProp('_ring_core', handle)
+            # used by the closeness weights, which get only the atom
+            central.SetBoolProp('_aromatic_ring', any('AROMATIC' in bond for bond in bonds))
+            conf.SetAtomPosition(c, Point3D(*[sum(axis) / len(axis) for axis in xyz.T.tolist()]))
         # Store complex info
-        for atomset, center_i in zip(mol.GetRingInfo().AtomRings(), center_idxs):
+        for atomset, center_i, neighss, bondss in zip(mol.GetRingInfo().AtomRings(), center_idxs,
+                                                      neighss_per_center, bondss_per_center):
             # bond to elemental ring
-            central = mol.GetAtomWithIdx(center_i)
-            neighss = json.loads(central.GetProp('_neighbors'))
-            bondss = json.loads(central.GetProp('_bonds'))
             for neighs, bonds in zip(neighss, bondss):
                 for neigh, bond in zip(neighs, bonds):
                     if neigh not in atomset:
@@ -128,13 +128,17 @@ class _MonsterRing( _MonsterJoinNeigh):
         """
         self.journal.debug('Starting ring expansion')
         mol = Chem.RWMol(mol)
+        # the distance matrix is calculated once and updated as atoms are added and deleted.
+        distances = DistanceContext(mol)
         rings = self._get_expansion_data(mol)  # List[Dict[str, List[Any]]]
         self._place_ring_atoms(mol, rings)
+        distances.add_atoms(mol)
         # bonded_as_original. Rectifier will fix.
         self._restore_original_bonding(mol, rings)
         self.keep_copy(mol, 'Rings expanded and original bonding restored.')
-        self._add_novel_bonding(mol, rings)  # formerly `_ring_overlap_scenario` and `_infer_bonding_by_proximity`.
-        self._delete_collapsed(mol)
+        # formerly `_ring_overlap_scenario` and `_infer_bonding_by_proximity`.
+        self._add_novel_bonding(mol, rings, distances)
+        distances.remove_atoms(self._delete_collapsed(mol))
         self._detriangulate(mol)
         try:
             mol = self._emergency_joining(mol)  # does not modify in place!
@@ -177,15 +181,16 @@ class _MonsterRing( _MonsterJoinNeigh):
                 pass  # ringcores have -1 ori_i
         # sort the ringcore
         for atom in self._get_collapsed_atoms(mol):
-            old = json.loads(atom.GetProp('_ori_is'))
-            new = [i + self._collapsed_ring_offset for i in old]
-            atom.SetProp('_ori_is', json.dumps(new))
-            old2new = {**old2new, **dict(zip(old, new))}
+            old = self._get_ring(atom)['ori_is']
+            new = old + self._collapsed_ring_offset
+            self._update_ring(atom, ori_is=new)
+            old2new = {**old2new, **dict(zip(old.tolist(), new.tolist()))}
         # this has to be done afterwards in case of a bonded mol
         for atom in self._get_collapsed_atoms(mol):
-            old_neighss = json.loads(atom.GetProp('_neighbors'))  # if i in old2new else i
-            new_neighss = [[old2new[i] for i in old_neighs if i in old2new] for old_neighs in old_neighss]
-            atom.SetProp('_neighbors', json.dumps(new_neighss))
+            old_neighss = self._get_ring(atom)['neighbors']  # if i in old2new else i
+            new_neighss = [np.array([old2new[i] for i in old_neighs.tolist() if i in old2new], dtype=int)
+                           for old_neighs in old_neighss]
+            self._update_ring(atom, neighbors=new_neighss)
         # determine if the new atoms have close neighbours.
         pass
 
@@ -208,14 +213,15 @@ class _MonsterRing( _MonsterJoinNeigh):
                 continue
             i = atom.GetIntProp('_ori_i')
             if i == -1:
+                ring = self._get_ring(atom)
                 # original indices
-                ori = json.loads(atom.GetProp('_ori_is'))
-                alt = [dd if dd not in mapping else mapping[dd] for dd in ori]
-                atom.SetProp('_ori_is', json.dumps(alt))
+                alt_is = [dd if dd not in mapping else mapping[dd] for dd in ring['ori_is'].tolist()]
                 # original neighbors
-                ori = json.loads(atom.GetProp('_neighbors'))
-                alt = [[dd if dd not in mapping else mapping[dd] for dd in inner] for inner in ori]
-                atom.SetProp('_neighbors', json.dumps(alt))
+                alt_neighbors = [[dd if dd not in mapping else mapping[dd] for dd in inner.tolist()]
+                                 for inner in ring['neighbors']]
+                self._update_ring(atom,
+                                  ori_is=np.array(alt_is, dtype=int),
+                                  neighbors=[np.array(inner, dtype=int) for inner in alt_neighbors])
             elif i in mapping:
                 atom.SetIntProp('_ori_i', mapping[i])
             else:
@@ -245,17 +251,53 @@ class _MonsterRing( _MonsterJoinNeigh):
         :param mol:
         :return:
         """
-        return [
-            dict(atom=atom,
-                 ori_name=atom.GetProp('_ori_name'),
-                 elements=json.loads(atom.GetProp('_elements')),
-                 neighbors=json.loads(atom.GetProp('_neighbors')),
-                 ori_is=json.loads(atom.GetProp('_ori_is')),
-                 xs=json.loads(atom.GetProp('_xs')),
-                 ys=json.loads(atom.GetProp('_ys')),
-                 zs=json.loads(atom.GetProp('_zs')),
-                 bonds=json.loads(atom.GetProp('_bonds')))
-            for atom in self._get_collapsed_atoms(mol)]
+        rings = []
+        for atom in self._get_collapsed_atoms(mol):
+            ring = self._get_ring(atom)
+            rings.append(dict(atom=atom,
+                              ori_name=atom.GetProp('_ori_name'),
+                              elements=list(ring['elements']),
+                              neighbors=[neighs.tolist() for neighs in ring['neighbors']],
+                              ori_is=ring['ori_is'].tolist(),
+                              xs=ring['xyz'][:, 0].tolist(),
+                              ys=ring['xyz'][:, 1].tolist(),
+                              zs=ring['xyz'][:, 2].tolist(),
+                              bonds=[list(bonds) for bonds in ring['bonds']]))
+        return rings
+
+    # =========== Ring registry ========================================================================================
+    # the data of the atoms of a collapsed ring is kept in ``self._ring_registry`` and not in its dummy atom.
+    # An entry is never altered once registered (a change registers a new one) as the dummy atom may have been copied.
+
+    def _register_ring(self, **ring_data) -> int:
+        """
+        Stores the data of a collapsed ring and returns its handle (int prop ``_ring_core`` of the dummy atom):
+
+        * ``ori_is``: original indices (int array)
+        * ``neighbors``: original indices of the neighbours of each (list of int arrays)
+        * ``xyz``: coordinates (N x 3 array)
+        * ``elements``: symbols (list of str)
+        * ``bonds``: bond type names to each neighbour (list of list of str)
+
+        :param ring_data:
+        :return: handle
+        """
+        handle = len(self._ring_registry)
+        self._ring_registry[handle] = ring_data
+        return handle
+
+    def _get_ring(self, ringcore: Chem.Atom) -> Dict[str, Any]:
+        """
+        The registry entry of a collapsed ring dummy atom (see ``_register_ring``).
+        """
+        return self._ring_registry[ringcore.GetIntProp('_ring_core')]
+
+    def _update_ring(self, ringcore: Chem.Atom, **changes) -> None:
+        """
+        Registers a copy of the entry of ``ringcore`` with the changes and gives ``ringcore`` its handle.
+        """
+        handle = self._register_ring(**{**self._get_ring(ringcore), **changes})
+        ringcore.SetIntProp('_ring_core', handle)
 
     def _get_expansion_for_atom(self, ring: Dict[str, List[Any]], i: int) -> Dict[str, Any]:
         """
@@ -370,12 +412,18 @@ class _MonsterRing( _MonsterJoinNeigh):
         #     except (KeyError, ValueError) as err:
         #         warn(str(err))
 
-    def _delete_collapsed(self, mol: Chem.RWMol):
+    def _delete_collapsed(self, mol: Chem.RWMol) -> List[int]:
+        deleted = []
         for a in reversed(range(mol.GetNumAtoms())):
             if mol.GetAtomWithIdx(a).GetIntProp('_ori_i') == -1:
                 mol.RemoveAtom(a)
+                deleted.append(a)
+        return deleted
 
-    def _add_novel_bonding(self, mol: Chem.RWMol, rings: List[Dict[str, List[Any]]]):
+    def _add_novel_bonding(self,
+                           mol: Chem.RWMol,
+                           rings: List[Dict[str, List[Any]]],
+                           distances: Optional[DistanceContext] = None):
         """
         Formerly `_ring_overlap_scenario`,`_connenct_ring`,  `_infer_bonding_by_proximity`.
 
@@ -393,9 +441,12 @@ class _MonsterRing( _MonsterJoinNeigh):
         :param mol:
         :param rings: output of `_get_expansion_data`.
         :type rings: List[Dict[str, List[Any]]]
+        :param distances: distance matrix of mol, which is kept up to date (made if None)
         :return:
         """
         self.journal.debug('Adding novel bonding (if any)...')
+        if distances is None:
+            distances = DistanceContext(mol)
         # ===== Deal with Ring on ring bonding ------------------------------------------
         novel_ringcore_pairs = self._get_novel_ringcore_pairs(mol, rings, cutoff=1.5)
         # these is a list of Chem.Atom pairs.
@@ -403,17 +454,17 @@ class _MonsterRing( _MonsterJoinNeigh):
             self.journal.debug('determining novel bond between ring markers ' + \
                                f'{ringcore_A.GetIdx()} and {ringcore_B.GetIdx()}')
             # _determine_mergers_novel_ringcore_pair finds mergers
-            self._determine_mergers_novel_ringcore_pair(mol, ringcore_A, ringcore_B)
+            self._determine_mergers_novel_ringcore_pair(mol, ringcore_A, ringcore_B, distances)
         # ===== Deal with Ring on other bonding ------------------------------------------
         # formerly: _infer_bonding_by_proximity
-        novel_other_pairs = self._get_novel_other_pairs(mol, rings, 1.0)
+        novel_other_pairs = self._get_novel_other_pairs(mol, rings, 1.0, distances)
         for ringcore, other in novel_other_pairs:
             self.journal.debug(f'determining novel bond between ' + \
                                f'ring marker {ringcore.GetIdx()} and non-ring {other.GetIdx()}')
             # _determine_mergers_novel_ringcore_pair finds, bonds and marks for deletion.
-            self._determine_mergers_novel_other_pair(mol, ringcore, other)
+            self._determine_mergers_novel_other_pair(mol, ringcore, other, distances)
         # ===== Clean up ------------------------------------------------------------------
-        self._delete_marked(mol)
+        distances.remove_atoms(self._delete_marked(mol))
 
     # =========== dependant methods =================================================================================
 
@@ -421,11 +472,11 @@ class _MonsterRing( _MonsterJoinNeigh):
                        name_restriction: Optional[str] = None) -> int:
         """
         Given an old index check in ``_ori_i`` for what the current one is.
-        NB. ring placeholder will be -1 and these also have ``_ori_is``. a JSON of the ori_i they summarise.
+        NB. ring placeholder will be -1 and these also have ``_ring_core``, the handle of the ori_i they summarise.
 
         :param mol:
         :param old: old index
-        :param search_collapsed: seach also in ``_ori_is``
+        :param search_collapsed: seach also in the ``ori_is`` of the ring registry
         :parm name_restriction: restrict to original name.
         :return:
         """
@@ -435,8 +486,8 @@ class _MonsterRing( _MonsterJoinNeigh):
             elif atom.GetIntProp('_ori_i') == old:
                 return i
             elif search_collapsed and \
-                    atom.HasProp('_ori_is') and \
-                    old in json.loads(atom.GetProp('_ori_is')):
+                    atom.HasProp('_ring_core') and \
+                    old in self._get_ring(atom)['ori_is']:
                 return i
             else:
                 pass
@@ -559,10 +610,10 @@ class _MonsterRing( _MonsterJoinNeigh):
     def _get_atom_indices_per_origin(self, mol: Chem.Mol) -> Dict[str, List[int]]:
         atomdex = defaultdict(list)
         for atom in mol.GetAtoms():
-            if not atom.HasProp('ori_name'):
+            if not atom.HasProp('_ori_name'):
                 atomdex['unknown'].append(atom.GetIdx())
             else:
-                name = atom.GetProp('ori_name')
+                name = atom.GetProp('_ori_name')
                 atomdex[name].append(atom.GetIdx())
         return atomdex
 
@@ -597,12 +648,16 @@ class _MonsterRing( _MonsterJoinNeigh):
         """
         atomdex = self._get_ring_atom_indices_per_origin(rings)
         # not calling get_distance matrxi because tehre may be more than 2 origins.
-        distance_matrix = Chem.Get3DDistanceMatrix(mol)
+        # spatial index query of ring atoms vs. ring atoms, dropping the pairs that share an origin.
+        origins = defaultdict(set)
         for origin_name, indices in atomdex.items():
-            # this blanks subsquares of same origin but not interesections of different indices from atomdex...
-            self._nan_fill_submatrix(distance_matrix, list(indices))
-        self._nan_fill_others(mol, distance_matrix, [idx for idcs in atomdex.values() for idx in idcs])
-        return self._get_closest_from_matrix(distance_matrix, cutoff)
+            for idx in indices:
+                origins[idx].add(origin_name)
+        ring_idxs = np.array(sorted(origins), dtype=int)
+        xyz = SpatialIndex.get_coordinates(mol)[ring_idxs]
+        idx_A, idx_B, distances = SpatialIndex.get_close_pairs(xyz, xyz, cutoff)
+        return [(int(ring_idxs[a]), int(ring_idxs[b])) for a, b, d in zip(idx_A, idx_B, distances)
+                if d < cutoff and not origins[ring_idxs[a]] & origins[ring_idxs[b]]]
 
     def _get_closest_from_matrix(self, matrix: np.ndarray, cutoff: int) -> List[Tuple[int, int]]:
         # get the pair of atom indices that are less thna cutoff.
@@ -613,33 +668,40 @@ class _MonsterRing( _MonsterJoinNeigh):
     def _get_close_novel_ring_other_indices(self,
                                             mol: Chem.Mol,
                                             rings: List[Dict[str, List[Any]]],
-                                            cutoff: int) -> List[Tuple[int, int]]:
+                                            cutoff: int,
+                                            distances: Optional[DistanceContext] = None) -> List[Tuple[int, int]]:
         """
         Get the list of pairs of indices between an ring atom and a non-ring atom from a different origin that is too close.
 
         :param mol:
         :param rings: output of `_get_expansion_data`. See that for details.
         :param cutoff:
+        :param distances: distance matrix of mol (made if None)
         :return:
         """
         atomdex = self._get_ring_atom_indices_per_origin(rings)
         oridex = self._get_atom_indices_per_origin(mol)
-        distance_matrix = Chem.Get3DDistanceMatrix(mol)
-        # blank all rings to rings
-        self._nan_fill_submatrix(distance_matrix, [i for l in atomdex.values() for i in l])
-        closeness = []
-        for origin_name, indices in atomdex.items():
-            sub = distance_matrix.copy()
-            self._nan_fill_submatrix(sub, oridex[origin_name])
-            # get the pair of atom indices that are less thna cutoff.
-            # where returns a tuple of np.arrays of dtype=np.int64
-            closeness.extend(self._get_closest_from_matrix(distance_matrix, cutoff))
-        return closeness
+        if distances is None:
+            distances = DistanceContext(mol)
+        # the close pairs are taken from the upper triangle of the unmasked matrix (each pair once, no self-pairs)
+        # and a single mask is applied to the pairs: rings to rings and atoms of the same origin to each other.
+        with np.errstate(invalid='ignore'):
+            idx_A, idx_B = np.where(np.triu(distances.get_matrix() < cutoff, k=1))
+        in_ring = np.zeros(len(distances), dtype=bool)
+        in_ring[[i for l in atomdex.values() for i in l]] = True
+        same_origin = np.zeros(len(idx_A), dtype=bool)
+        for origin_name in atomdex:
+            in_origin = np.zeros(len(distances), dtype=bool)
+            in_origin[oridex[origin_name]] = True
+            same_origin |= in_origin[idx_A] & in_origin[idx_B]
+        keep = ~(in_ring[idx_A] & in_ring[idx_B]) & ~same_origin
+        return list(zip(idx_A[keep].astype(int), idx_B[keep].astype(int)))
 
     def _determine_mergers_novel_ringcore_pair(self,
                                                mol: Chem.RWMol,
                                                ringcore_A: Chem.Atom,
-                                               ringcore_B: Chem.Atom) -> List[Tuple[int, int]]:
+                                               ringcore_B: Chem.Atom,
+                                               distances: Optional[DistanceContext] = None) -> List[Tuple[int, int]]:
         """
         Preps to resolve ringcore pairs.
         Formerly part of ``_ring_overlap_scenario``.
@@ -649,6 +711,7 @@ class _MonsterRing( _MonsterJoinNeigh):
         :param mol:
         :param ringcore_A:
         :param ringcore_B:
+        :param distances: distance matrix of mol (made if None)
         :return: list of atoms to be merged
         """
         absorption_distance = 1.  # Å
@@ -656,11 +719,10 @@ class _MonsterRing( _MonsterJoinNeigh):
         # print('B', ringcore_B, ringcore_B.GetIdx(), ringcore_B.GetIntProp('_ori_i'))
         indices_A = json.loads(ringcore_A.GetProp('_current_is'))
         indices_B = json.loads(ringcore_B.GetProp('_current_is'))
-        distance_matrix = self._get_distance_matrix(mol, indices_A, indices_B)  # currently in `_join_neighboring`.
-        # distance matrix is for the whole thing
-        # TODO merge into _get_distance_matrix
-        # blanking the other atom indices:
-        self._nan_fill_others(mol, distance_matrix, indices_A + indices_B)
+        if distances is None:
+            distances = DistanceContext(mol)
+        # the matrix is of the atoms of A and B only (``indices``) with the A-A and B-B distances blanked.
+        indices, distance_matrix = distances.get_pair_matrix(indices_A, indices_B)
         # get closest pair.
         distance = np.nanmin(distance_matrix)
         if np.isnan(distance):
@@ -668,8 +730,8 @@ class _MonsterRing( _MonsterJoinNeigh):
             return []
         elif distance > absorption_distance:  # bonded
             p = np.where(distance_matrix == distance)
-            a = int(p[0][0])
-            b = int(p[1][0])
+            a = int(indices[p[0][0]])
+            b = int(indices[p[1][0]])
             present_bond = mol.GetBondBetweenAtoms(ringcore_A.GetIdx(), ringcore_B.GetIdx())
             self._add_bond_by_reference(mol, a, b, present_bond)
             self.journal.info('A novel bond-connected ring pair was found')
@@ -678,17 +740,17 @@ class _MonsterRing( _MonsterJoinNeigh):
             return []  # bonded
         else:  # Spiro or fused.
             p = np.where(distance_matrix == distance)
-            a = int(p[0][0])
-            b = int(p[1][0])
+            a = int(indices[p[0][0]])
+            b = int(indices[p[1][0]])
             self._mark_for_deletion(mol, b)
             self._copy_bonding(mol, a, b, force=True)
-            distance_matrix[a, b] = np.nan
-            distance_matrix[b, a] = np.nan
+            distance_matrix[p[0][0], p[1][0]] = np.nan
+            distance_matrix[p[1][0], p[0][0]] = np.nan
             distance = np.nanmin(distance_matrix)
             if np.isnan(distance) or distance < absorption_distance:
                 p = np.where(distance_matrix == distance)
-                c = int(p[0][0])
-                d = int(p[1][0])
+                c = int(indices[p[0][0]])
+                d = int(indices[p[1][0]])
                 self._mark_for_deletion(mol, d)
                 self._copy_bonding(mol, c, d, force=True)
                 self.journal.info('A novel fused ring pair was found')
@@ -734,7 +796,8 @@ class _MonsterRing( _MonsterJoinNeigh):
                     pairs.append((ringcore, neigh))
         return pairs
 
-    def _get_novel_other_pairs(self, mol, rings, cutoff: float) -> List[Tuple[Chem.Atom, Chem.Atom]]:
+    def _get_novel_other_pairs(self, mol, rings, cutoff: float, distances: Optional[DistanceContext] = None) \
+            -> List[Tuple[Chem.Atom, Chem.Atom]]:
         """
         similar to self._get_novel_ringcore_pairs... but opposite
         It deals with bonded and close pairs.
@@ -743,11 +806,12 @@ class _MonsterRing( _MonsterJoinNeigh):
         :param rings: output of `_get_expansion_data`. See that for details.
         :type rings: List[Dict[str, List[Any]]]
         :param cutoff:
+        :param distances: distance matrix of mol (made if None)
         :return:
         """
         # ----------------------------------------------------------
         # scenario where they are closer than the cutoff
-        close_pairs = self._get_close_novel_others(mol, rings, cutoff)  # 2.7889 ring diameter + 1.45 C-C bond
+        close_pairs = self._get_close_novel_others(mol, rings, cutoff, distances)  # 2.7889 ring diameter + 1.45 C-C bond
         # ----------------------------------------------------------
         # scenario where they are bonded...
         bonded_pairs = self._get_novel_other_bonded_pairs(rings)
@@ -757,22 +821,27 @@ class _MonsterRing( _MonsterJoinNeigh):
     def _get_close_novel_others(self,
                                 mol,
                                 rings,
-                                cutoff):
-        idx_pairs = self._get_close_novel_ring_other_indices(mol, rings, cutoff)
+                                cutoff,
+                                distances: Optional[DistanceContext] = None):
+        idx_pairs = self._get_close_novel_ring_other_indices(mol, rings, cutoff, distances)
         # filter out those that are bonded already to core atom.
         return self._indices_to_atoms_n_cores(mol, idx_pairs)
 
-    def _get_merging_penalties(self, mol, shape: Tuple[int, int], indices_ring):
+    def _get_merging_penalties(self, mol, shape: Tuple[int, int], indices_ring,
+                               indices: Optional[Sequence[int]] = None):
         """
         confusingly this is a different set of penalties to `_get_joining_penalties` which is for joining
         :param mol:
         :param shape:
         :param indices_ring: The indices inside the ring atom, aka. prop _current_is
+        :param indices: the atom indices of the rows/columns of the matrix (all atoms if None)
         :return:
         """
         penalties = np.zeros(shape)
-        for i in indices_ring:
-            atom = mol.GetAtomWithIdx(i)
+        rows = {idx: n for n, idx in enumerate(indices)} if indices is not None else None
+        for idx in indices_ring:
+            atom = mol.GetAtomWithIdx(idx)
+            i = idx if rows is None else rows[idx]
             neighs = [neigh for neigh in atom.GetNeighbors() if self._is_count_valid(neigh)]
             n_neighs = len(neighs)
             if atom.GetAtomicNum() > 8:  # next row.
@@ -808,7 +877,8 @@ class _MonsterRing( _MonsterJoinNeigh):
     def _determine_mergers_novel_other_pair(self,
                                             mol: Chem.RWMol,
                                             ringcore: Chem.Atom,
-                                            other: Chem.Atom) -> List[Tuple[int, int]]:
+                                            other: Chem.Atom,
+                                            distances: Optional[DistanceContext] = None) -> List[Tuple[int, int]]:
         """
         Like _determine_mergers_novel_ringcore_pair finds, bonds and marks for deletion.
         It however finds atoms to absorb between a ring and a given non-ring atom.
@@ -816,6 +886,7 @@ class _MonsterRing( _MonsterJoinNeigh):
         :param mol:
         :param ringcore:
         :param other:
+        :param distances: distance matrix of mol (made if None)
         :return:
         """
         # ---- Prep data.
@@ -823,11 +894,12 @@ class _MonsterRing( _MonsterJoinNeigh):
         index_other = other.GetIdx()
         indices_other = [index_other]
         index_core = ringcore.GetIdx()
-        distance_matrix = self._get_distance_matrix(mol, indices_ring,
-                                                    indices_other)  # currently in `_join_neighboring`.
-        self._nan_fill_others(mol, distance_matrix, indices_ring + indices_other)
+        if distances is None:
+            distances = DistanceContext(mol)
+        # the matrix is of the ring atoms and the other only (``indices``).
+        indices, distance_matrix = distances.get_pair_matrix(indices_ring, indices_other)
         # merging penalties
-        penalties = self._get_merging_penalties(mol, distance_matrix.shape, indices_ring)
+        penalties = self._get_merging_penalties(mol, distance_matrix.shape, indices_ring, indices)
         core_absorption_distance = 1.5  # Å between ring core and other. 2.8 Å is diameter.
         core_other_distance = self._get_distance(ringcore, other)
         if core_other_distance < core_absorption_distance:
@@ -846,12 +918,12 @@ class _MonsterRing( _MonsterJoinNeigh):
             return []
         else:  # bonded
             p = np.where(pendist_matrix == pendistance)
-            a = int(p[0][0])
-            b = int(p[1][0])
+            a = int(indices[p[0][0]])
+            b = int(indices[p[1][0]])
             assert index_other in (a, b), 'CRITICIAL: Matrix error!'
             # absorb or bond
-            distance = distance_matrix[a, b]
-            penalty = penalties[a, b]  # penalties were already applied. this is for msgs only
+            distance = distance_matrix[p[0][0], p[1][0]]
+            penalty = penalties[p[0][0], p[1][0]]  # penalties were already applied. this is for msgs only
             if distance > 4:
                 self.journal.warning(f'(DetMergeNovOther: {a}, {b}). ' + \
                                      f'The bond between {a} and {b} too long {distance} ' + \
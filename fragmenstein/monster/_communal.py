@@ -13,6 +13,7 @@ from rdkit import Chem
 
 from ._modification_logging import _MonsterTracker
 from .bond_provenance import BondProvenance
+from .spatial_index import SpatialIndex
 
 
 # _MonsterBase -> _MonsterTracker -> _MonsterCommunal
@@ -36,7 +37,7 @@ class _MonsterCommunal(_MonsterTracker):
         if atom.GetIsAromatic():
             return True
         elif atom.HasProp('_ori_i') and atom.GetIntProp('_ori_i') == -1:
-            if atom.HasProp('_bonds') and 'AROMATIC' in atom.GetProp('_bonds'):
+            if atom.HasProp('_aromatic_ring') and atom.GetBoolProp('_aromatic_ring'):
                 return True  # technically it could be non-aromatic (ring fusion).
             else:
                 return False
@@ -77,7 +78,7 @@ class _MonsterCommunal(_MonsterTracker):
         """
         combo = Chem.RWMol(Chem.CombineMols(mol_A, mol_B))
         # ========= distance matrix pre-tweaks.
-        distance_matrix = self._get_distance_matrix(combo, mol_A, mol_B)
+        distance_matrix = self._get_close_distance_matrix(combo, mol_A, mol_B)
         penalties = self._get_joining_penalties(combo, distance_matrix.shape)
         # ========= get closest
         pendist_matrix = penalties + distance_matrix
@@ -142,6 +143,40 @@ class _MonsterCommunal(_MonsterTracker):
         self._nan_fill_submatrix(distance_matrix, B_idxs)
         return distance_matrix
 
+    def _get_close_distance_matrix(self, combo: Chem.Mol, mol_A: Chem.Mol, mol_B: Chem.Mol) -> np.ndarray:
+        """
+        Called by ``_find_all_closest``.
+        Equivalent to ``_get_distance_matrix`` for two molecules as far as the closest (penalised) pairs are concerned,
+        but only the pairs that could be the closest are measured (spatial index), the rest are nan.
+        The radius is the nearest distance between non-excluded atoms plus the spread of the pair penalties,
+        or 1 Å (cutoff for the other candidates) minus the lowest pair penalty, whichever is largest.
+        This holds for negative penalties (bonuses) as well.
+
+        :param combo: combined molecule of A and B
+        :param mol_A:
+        :param mol_B:
+        :return: square matrix of the size of combo
+        """
+        n_A = mol_A.GetNumAtoms()
+        length = combo.GetNumAtoms()
+        distance_matrix = np.full((length, length), np.nan)
+        xyz = SpatialIndex.get_coordinates(combo)
+        atom_penalties = np.zeros(length)
+        for fun, weight in self.closeness_weights:
+            atom_penalties[np.array([fun(atom) for atom in combo.GetAtoms()], dtype=bool)] += weight
+        allowed = ~np.isnan(atom_penalties)
+        allowed_A = np.where(allowed[:n_A])[0]
+        allowed_B = np.where(allowed[n_A:])[0] + n_A
+        nearest = SpatialIndex.get_nearest_distance(xyz[allowed_A], xyz[allowed_B])
+        if np.isinf(nearest):
+            return distance_matrix
+        lowest, highest = np.min(atom_penalties[allowed]), np.max(atom_penalties[allowed])
+        radius = max(nearest + 2 * (highest - lowest), 1. - 2 * lowest)
+        idx_A, idx_B, distances = SpatialIndex.get_close_pairs(xyz[:n_A], xyz[n_A:], radius)
+        distance_matrix[idx_A, idx_B + n_A] = distances
+        distance_matrix[idx_B + n_A, idx_A] = distances
+        return distance_matrix
+
     def _nan_fill_others(self, mol: Chem.Mol, distance_matrix: np.array, good_indices: List[int]):
         """
         Nan fill the inidices that are not the good_indices.
@@ -175,29 +210,29 @@ class _MonsterCommunal(_MonsterTracker):
     def _nan_fill_submatrix(self, matrix, indices):
         """
         Given a square matrix, blank the self-submatrix of the group of indices
-        There is probably a better way to do this.
         changed from _nan_submatrix as to nan is not a verb.
 
         :param matrix:
         :param indices:
         :return:
         """
-        dimension = matrix.shape[0]
-        bool_vector = np.zeros((dimension, 1)).astype(bool)
-        bool_vector[indices] = True
-        bool_matrix = np.tile(bool_vector, (1, dimension))
-        logic = np.logical_and(bool_matrix, bool_matrix.transpose())
-        matrix[logic] = np.nan
+        indices = np.array(list(indices), dtype=int)
+        matrix[np.ix_(indices, indices)] = np.nan
 
     # ============= Deletion ===========================================================================================
 
     def _mark_for_deletion(self, mol: Chem.Mol, i: int):
         mol.GetAtomWithIdx(i).SetBoolProp('DELETE', True)
 
-    def _delete_marked(self, mol: Chem.RWMol):
-        morituri = list(reversed(mol.GetAtomsMatchingQuery(Chem.rdqueries.HasPropQueryAtom('DELETE'))))
-        for atom in morituri:
-            mol.RemoveAtom(atom.GetIdx())
+    def _delete_marked(self, mol: Chem.RWMol) -> List[int]:
+        """
+        Remove the atoms marked for deletion. Returns their indices (descending).
+        """
+        morituri = [atom.GetIdx() for atom in mol.GetAtomsMatchingQuery(Chem.rdqueries.HasPropQueryAtom('DELETE'))]
+        morituri = sorted(morituri, reverse=True)
+        for idx in morituri:
+            mol.RemoveAtom(idx)
+        return morituri
 
     # ============= Other ==============================================================================================
 
@@ -7,7 +7,7 @@ Place followup
 
 ########################################################################################################################
 
-from typing import Optional
+from typing import Optional, Iterable, Iterator, Union
 from warnings import warn
 
 from rdkit import Chem
@@ -40,6 +40,9 @@ class _MonsterPlace(_MonsterBlend):
         # Reset
         self.unmatched = []
         self.mol_options = []
+        self.mcs_seconds = 0.
+        self.mcs_exhausted = False
+        self._sextant_cache = {}
         # do calculations
         if merging_mode == 'off':
             pass
@@ -57,6 +60,44 @@ class _MonsterPlace(_MonsterBlend):
                 f"Merging mode can only be {'| '.join(valid_modes)}, not '{merging_mode}'")
         return self
 
+    def place_many(self,
+                   mols: Iterable[Union[Chem.Mol, str]],
+                   attachment: Optional[Chem.Mol] = None,
+                   merging_mode: str = 'none_permissive',
+                   skip_errors: bool = True) -> Iterator[Optional[Chem.Mol]]:
+        """
+        Places many follow-ups (mols or SMILES) against the same hits, see ``place``.
+        This is a generator of the positioned mols, in the order of ``mols``:
+
+        >>> for positioned in monster.place_many(mols):
+
+        The steps that depend only on the hits (the hit to hit positional maps of the unmerging,
+        the merged hits of full and partial blending) are done once for all the follow-ups.
+        The MCS cache and the spatial indices are shared by all instances anyway.
+        The other attributes (``unmatched``, ``mol_options`` etc.) are those of the last follow-up yielded.
+
+        :param mols: iterable of follow-ups
+        :param attachment: see ``place``
+        :param merging_mode: see ``place``
+        :param skip_errors: a follow-up that fails is logged and yields None instead of raising
+        :return: generator of positioned mols
+        """
+        self._hit_cache = {}
+        try:
+            for mol in mols:
+                try:
+                    if isinstance(mol, str):
+                        mol = Chem.MolFromSmiles(mol)
+                    self.place(mol=mol, attachment=attachment, merging_mode=merging_mode)
+                except Exception as error:
+                    if not skip_errors:
+                        raise error
+                    self.journal.warning(f'Placement failed ({error.__class__.__name__}: {error})')
+                    self.positioned_mol = None
+                yield self.positioned_mol
+        finally:
+            self._hit_cache = None
+
     def place_smiles(self,
                      smiles: str,
                      attachment: Optional[Chem.Mol] = None):
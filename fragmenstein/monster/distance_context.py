@@ -0,0 +1,101 @@
+########################################################################################################################
+
+__doc__ = \
+    """
+Distance context (not inherited) of a molecule being altered, namely during ring expansion.
+    """
+
+########################################################################################################################
+
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+from rdkit import Chem
+
+from .spatial_index import SpatialIndex
+
+
+class DistanceContext:
+    """
+    The 3D distance matrix of a molecule, calculated once
+    and kept in step with the molecule as atoms are appended or removed, without recalculating it.
+
+    Removed atoms are merely dropped from ``rows`` (the matrix row of each current atom index),
+    so the matrix is reallocated only when atoms are appended.
+    The masked matrices are made from the submatrix of the atoms of interest (``np.ix_``),
+    the values are identical to those of ``Chem.Get3DDistanceMatrix``.
+
+    >>> distances = DistanceContext(mol)
+    >>> indices, matrix = distances.get_pair_matrix(indices_A, indices_B)
+
+    :ivar matrix: the distance matrix, including the rows of the removed atoms
+    :ivar rows: the row in ``matrix`` of each atom of the molecule
+    """
+
+    def __init__(self, mol: Chem.Mol):
+        self.coordinates = SpatialIndex.get_coordinates(mol)
+        self.matrix = self.measure(self.coordinates, self.coordinates)
+        self.rows = np.arange(len(self.coordinates))
+
+    def __len__(self):
+        return len(self.rows)
+
+    @staticmethod
+    def measure(xyz_A: np.ndarray, xyz_B: np.ndarray) -> np.ndarray:
+        """
+        Distances between the (N, 3) and (M, 3) coordinates as a (N, M) array.
+        """
+        return np.sqrt(np.sum((xyz_A[:, np.newaxis, :] - xyz_B[np.newaxis, :, :]) ** 2, axis=2))
+
+    # ==== changes =====================================================================================================
+
+    def add_atoms(self, mol: Chem.Mol) -> None:
+        """
+        Add the atoms appended to ``mol`` since the last update.
+        Only the distances of the new atoms are calculated.
+        """
+        xyz = SpatialIndex.get_coordinates(mol)[len(self.rows):]
+        if len(xyz) == 0:
+            return
+        n = len(self.coordinates)
+        self.coordinates = np.vstack([self.coordinates, xyz])
+        cross = self.measure(self.coordinates, xyz)
+        matrix = np.empty((n + len(xyz), n + len(xyz)))
+        matrix[:n, :n] = self.matrix
+        matrix[:, n:] = cross
+        matrix[n:, :] = cross.T
+        self.matrix = matrix
+        self.rows = np.append(self.rows, np.arange(n, n + len(xyz)))
+
+    def remove_atoms(self, indices: Sequence[int]) -> None:
+        """
+        Remove the atoms (indices prior to the removal), as ``RemoveAtom`` does the following indices shift down.
+        """
+        self.rows = np.delete(self.rows, np.array(list(indices), dtype=int))
+
+    # ==== access ======================================================================================================
+
+    def get_matrix(self, indices: Optional[Sequence[int]] = None) -> np.ndarray:
+        """
+        The distance matrix of the atoms (all if None) in the order given.
+        The full matrix with no atoms removed is not copied, so it must not be modified.
+        """
+        if indices is None and len(self.rows) == len(self.matrix):
+            return self.matrix
+        rows = self.rows if indices is None else self.rows[np.array(indices, dtype=int)]
+        return self.matrix[np.ix_(rows, rows)]
+
+    def get_pair_matrix(self,
+                        indices_A: Sequence[int],
+                        indices_B: Sequence[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        The distance matrix of the atoms of A and B (sorted atom indices, returned first)
+        blanked (nan) so only the distances between A and B are present,
+        namely the submatrix of the full matrix blanked by ``_get_distance_matrix`` and ``_nan_fill_others``.
+        """
+        indices = np.array(sorted(set(indices_A) | set(indices_B)), dtype=int)
+        matrix = self.get_matrix(indices)
+        for group in (indices_A, indices_B):
+            local = np.searchsorted(indices, np.array(list(group), dtype=int))
+            matrix[np.ix_(local, local)] = np.nan
+        return indices, matrix
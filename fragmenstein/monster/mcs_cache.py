@@ -0,0 +1,144 @@
+########################################################################################################################
+
+__doc__ = \
+    """
+MCS cache (not inherited). An instance is a class attribute of Monster (``mcs_cache``).
+    """
+
+########################################################################################################################
+
+import json
+import os
+import sqlite3
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from rdkit import Chem
+
+
+class MCSCache:
+    """
+    Memoises the atom maps of ``_get_atom_maps`` (the expensive ``rdFMCS.FindMCS`` step of placement).
+
+    The key is the canonical SMILES of the two molecules, the (frozen) MCS mode
+    and the cap on the substructure matches enumerated (``Monster.mcs_max_matches``), which truncates the maps.
+    The maps are stored in canonical atom order (SMILES output order) and converted back to the indices of
+    the molecules they are requested for, therefore a different atom ordering of the same compound is fine.
+
+    The in-memory tier is an LRU of ``max_size`` entries.
+    The optional on-disk tier (``path``) is a SQLite file, which can be shared by several worker processes.
+
+    >>> Monster.mcs_cache = MCSCache(path='mcs.sqlite')
+
+    :ivar hits: number of lookups served from the cache (either tier)
+    :ivar misses: number of lookups that required a FindMCS
+    """
+
+    def __init__(self, max_size: int = 10_000, path: Optional[str] = None):
+        self.max_size = max_size
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._connection = None
+        self._connection_pid = None
+
+    # ==== key =========================================================================================================
+
+    def make_key(self,
+                 molA: Chem.Mol,
+                 molB: Chem.Mol,
+                 mode: Dict[str, Any],
+                 max_matches: Optional[int] = None) -> Tuple[str, List[int], List[int]]:
+        """
+        Returns the key and the canonical orders of the atoms of the two molecules.
+        ``order[n]`` is the index of the atom that is n-th in the canonical SMILES.
+
+        :param molA:
+        :param molB:
+        :param mode: MCS mode
+        :param max_matches: max substructure matches enumerated per molecule
+        """
+        smilesA, orderA = self._get_canonical(molA)
+        smilesB, orderB = self._get_canonical(molB)
+        frozen_mode = json.dumps({k: str(v) for k, v in mode.items()}, sort_keys=True)
+        return f'{smilesA}>>{smilesB}|{frozen_mode}|{max_matches}', orderA, orderB
+
+    def _get_canonical(self, mol: Chem.Mol) -> Tuple[str, List[int]]:
+        smiles = Chem.MolToSmiles(mol)
+        # the prop is formatted '[2,1,0,]' in older versions of rdkit and '[2,1,0]' in newer.
+        order = json.loads(mol.GetProp('_smilesAtomOutputOrder').replace(',]', ']'))
+        return smiles, order
+
+    # ==== access ======================================================================================================
+
+    def get(self, key: str, orderA: List[int], orderB: List[int]) -> Optional[List[Tuple[Tuple[int, int], ...]]]:
+        """
+        Get the maps (list of tuples of pairs of indices of A and B) or None if absent.
+        """
+        canonical_maps = self._get_canonical_maps(key)
+        if canonical_maps is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return [tuple(sorted(((orderA[a], orderB[b]) for a, b in canonical_map), key=lambda pair: pair[0]))
+                for canonical_map in canonical_maps]
+
+    def put(self, key: str, orderA: List[int], orderB: List[int], maps: List[Tuple[Tuple[int, int], ...]]) -> None:
+        """
+        Store the maps (list of tuples of pairs of indices of A and B).
+        """
+        rankA = {idx: n for n, idx in enumerate(orderA)}
+        rankB = {idx: n for n, idx in enumerate(orderB)}
+        canonical_maps = [[(rankA[a], rankB[b]) for a, b in atom_map] for atom_map in maps]
+        self._store_in_memory(key, canonical_maps)
+        if self.path:
+            with self._get_connection() as connection:
+                connection.execute('INSERT OR REPLACE INTO mcs VALUES (?, ?)', (key, json.dumps(canonical_maps)))
+
+    def clear(self) -> None:
+        """
+        Empties the in-memory tier and resets the counters. The on-disk tier is not touched.
+        """
+        self._memory.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._memory)
+
+    # ==== tiers =======================================================================================================
+
+    def _get_canonical_maps(self, key: str) -> Optional[List[List[Tuple[int, int]]]]:
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return self._memory[key]
+        elif self.path:
+            row = self._get_connection().execute('SELECT value FROM mcs WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            canonical_maps = [[tuple(pair) for pair in canonical_map] for canonical_map in json.loads(row[0])]
+            self._store_in_memory(key, canonical_maps)
+            return canonical_maps
+        else:
+            return None
+
+    def _store_in_memory(self, key: str, canonical_maps: List[List[Tuple[int, int]]]) -> None:
+        self._memory[key] = canonical_maps
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_size:
+            self._memory.popitem(last=False)
+
+    def _get_connection(self) -> sqlite3.Connection:
+        # a connection cannot be shared with a forked process.
+        if self._connection is None or self._connection_pid != os.getpid():
+            self._connection = sqlite3.connect(self.path, timeout=60)
+            self._connection.execute('CREATE TABLE IF NOT EXISTS mcs (key TEXT PRIMARY KEY, value TEXT)')
+            self._connection_pid = os.getpid()
+        return self._connection
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_connection'] = None
+        state['_connection_pid'] = None
+        return state
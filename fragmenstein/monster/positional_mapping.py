@@ -9,8 +9,10 @@ Positional mapping
 
 
 from rdkit import Chem
-from typing import Dict, List, Tuple
+from typing import Dict, Tuple
 import numpy as np
+from scipy.optimize import linear_sum_assignment
+from .spatial_index import SpatialIndex
 
 
 # ========= Get positional mapping =================================================================================
@@ -22,6 +24,8 @@ class GPM:
     """
 
     cutoff = 2
+    assignment = 'greedy'  # greedy | optimal. See ``_gpm_covert``
+    dense_threshold = 20_000  # A x B atom pairs below which all distances are measured. See ``_gpm_matrices``
 
     @classmethod
     def get_positional_mapping(cls, mol_A: Chem.Mol, mol_B: Chem.Mol, dummy_w_dummy=True) -> Dict[int, int]:
@@ -35,26 +39,19 @@ class GPM:
         :return: dictionary mol A atom idx -> mol B atom idx.
         """
 
-        mols = [mol_A, mol_B]
-        confs = [m.GetConformers()[0] for m in mols]
-        distance_protomatrix = []
-        dummy_distance_protomatrix = []
-        ring_distance_protomatrix = []
-        for i in range(mols[0].GetNumAtoms()):
-            distance_protovector = []
-            dummy_distance_protovector = []
-            ring_distance_protovector = []
-            for j in range(mols[1].GetNumAtoms()):
-                distance, dummy_distance, ring_distance = cls._gpm_distance(mols, confs, i, j, dummy_w_dummy)
-                distance_protovector.append(distance)
-                dummy_distance_protovector.append(dummy_distance)
-                ring_distance_protovector.append(ring_distance)
-            distance_protomatrix.append(distance_protovector)
-            dummy_distance_protomatrix.append(dummy_distance_protovector)
-            ring_distance_protomatrix.append(ring_distance_protovector)
-        distance_matrix = np.array(distance_protomatrix)
-        dummy_distance_matrix = np.array(dummy_distance_protomatrix)
-        ring_distance_matrix = np.array(ring_distance_protomatrix)
+        matrices = cls._gpm_matrices(mol_A, mol_B, dummy_w_dummy)
+        return cls._gpm_from_matrices(*matrices, dummy_w_dummy=dummy_w_dummy)
+
+    @classmethod
+    def _gpm_from_matrices(cls,
+                           distance_matrix: np.ndarray,
+                           dummy_distance_matrix: np.ndarray,
+                           ring_distance_matrix: np.ndarray,
+                           dummy_w_dummy=True) -> Dict[int, int]:
+        """
+        See get_positional_distance.
+        The mapping from the three matrices of ``_gpm_matrices``.
+        """
         if dummy_w_dummy:
             return {**cls._gpm_covert(distance_matrix, cls.cutoff),
                     **cls._gpm_covert(dummy_distance_matrix, cls.cutoff * 2),
@@ -64,63 +61,110 @@ class GPM:
                     **cls._gpm_covert(ring_distance_matrix, cls.cutoff)}
 
     @classmethod
-    def _gpm_distance(cls, mols: List[Chem.Mol], confs: [Chem.Conformer], i, j, dummy_w_dummy=True) \
-            -> Tuple[float, float, float]:
+    def _gpm_matrices(cls, mol_A: Chem.Mol, mol_B: Chem.Mol, dummy_w_dummy=True) \
+            -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
         """
-        See get_positional_distance
+        See get_positional_distance.
+        Returns the regular, dummy and collapsed-ring distance matrices (A x B).
+        Pairs that are not of the matrix's category are 9999.
+        Below ``dense_threshold`` pairs (i.e. hits) all the distances are measured in a single broadcasted pass,
+        above it only those within twice the cutoff are (spatial index) and the rest are 9999 too.
 
-        :param mols:
+        :param mol_A:
+        :param mol_B:
         :param dummy_w_dummy:
-        :return:
+        :return: distance_matrix, dummy_distance_matrix, ring_distance_matrix
         """
-        measure_distance = lambda a, b: ((a.x - b.x) ** 2 + (a.y - b.y) ** 2 + (a.z - b.z) ** 2) ** 0.5
-        is_collapsed_ring = lambda atom: atom.HasProp('_ori_i') and atom.GetIntProp('_ori_i') == -1
-        zeroth = mols[0].GetAtomWithIdx(i)
-        first = mols[1].GetAtomWithIdx(j)
-        if dummy_w_dummy and \
-                zeroth.GetSymbol() == '*' and \
-                first.GetSymbol() == '*':
-            distance = 9999
-            dummy_distance = measure_distance(confs[0].GetAtomPosition(i), confs[1].GetAtomPosition(j))
-            ring_distance = 9999
-        elif dummy_w_dummy and \
-                (zeroth.GetSymbol() == '*' or
-                 first.GetSymbol() == '*'):
-            distance = 9999
-            dummy_distance = 9999
-            ring_distance = 9999
-        elif is_collapsed_ring(zeroth) and is_collapsed_ring(first):
-            distance = 9999
-            dummy_distance = 9999
-            ring_distance = measure_distance(confs[0].GetAtomPosition(i), confs[1].GetAtomPosition(j))
-        elif is_collapsed_ring(zeroth) or is_collapsed_ring(first):
-            distance = 9999
-            dummy_distance = 9999
-            ring_distance = 9999
+        xyz_A = SpatialIndex.get_coordinates(mol_A)
+        xyz_B = SpatialIndex.get_coordinates(mol_B)
+        if len(xyz_A) * len(xyz_B) < cls.dense_threshold:
+            distances = np.sum((xyz_A[:, np.newaxis, :] - xyz_B[np.newaxis, :, :]) ** 2, axis=2) ** 0.5
         else:
-            distance = measure_distance(confs[0].GetAtomPosition(i), confs[1].GetAtomPosition(j))
-            dummy_distance = 9999
-            ring_distance = 9999
-        return distance, dummy_distance, ring_distance
+            # only the pairs within the widest cutoff (dummy) are measured, the rest are out of range anyway.
+            distances = np.full((len(xyz_A), len(xyz_B)), 9999.)
+            idx_A, idx_B, close = SpatialIndex.get_close_pairs(xyz_A, xyz_B, cls.cutoff * 2)
+            distances[idx_A, idx_B] = close
+        # atom classification: dummy / collapsed-ring / regular
+        dummy_A, ring_A = cls._gpm_classify(mol_A, dummy_w_dummy)
+        dummy_B, ring_B = cls._gpm_classify(mol_B, dummy_w_dummy)
+        any_dummy = np.logical_or.outer(dummy_A, dummy_B)
+        any_ring = np.logical_or.outer(ring_A, ring_B)
+        dummy_pairs = np.logical_and.outer(dummy_A, dummy_B)
+        ring_pairs = np.logical_and.outer(ring_A, ring_B) & ~any_dummy
+        regular_pairs = ~any_dummy & ~any_ring
+        return (np.where(regular_pairs, distances, 9999.),
+                np.where(dummy_pairs, distances, 9999.),
+                np.where(ring_pairs, distances, 9999.))
+
+    @classmethod
+    def _gpm_classify(cls, mol: Chem.Mol, dummy_w_dummy=True) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Boolean masks of which atoms are dummies (only if ``dummy_w_dummy``) and which are collapsed rings.
+
+        :param mol:
+        :param dummy_w_dummy: match */R with */R.
+        :return: is_dummy, is_collapsed_ring
+        """
+        atoms = mol.GetAtoms()
+        is_dummy = np.array([dummy_w_dummy and atom.GetSymbol() == '*' for atom in atoms], dtype=bool)
+        is_collapsed_ring = np.array([atom.HasProp('_ori_i') and atom.GetIntProp('_ori_i') == -1 for atom in atoms],
+                                     dtype=bool)
+        return is_dummy, is_collapsed_ring
 
     @classmethod
     def _gpm_covert(cls, array: np.array, cutoff: float) -> Dict[int, int]:
         """
-        See get_positional_distance
+        See get_positional_distance.
+        Converts a distance matrix into a mapping of row index to column index
+        with the backend set by the class attribute ``assignment``:
+
+        * ``greedy``: the closest pair is taken first and its row and column are then excluded
+          (a single sort of the entries under the cutoff)
+        * ``optimal``: the Hungarian algorithm, i.e. the most pairs under the cutoff with the lowest summed distance
 
         :param array:
         :param cutoff:
         :return:
         """
-        # find the closest
+        if cls.assignment == 'greedy':
+            return cls._gpm_greedy_assignment(array, cutoff)
+        elif cls.assignment == 'optimal':
+            return cls._gpm_optimal_assignment(array, cutoff)
+        else:
+            raise ValueError(f'Unknown assignment mode {cls.assignment}')
+
+    @classmethod
+    def _gpm_greedy_assignment(cls, array: np.array, cutoff: float) -> Dict[int, int]:
+        """
+        Closest first. Ties are resolved in row-major order.
+
+        :param array:
+        :param cutoff:
+        :return:
+        """
+        flat = np.ravel(array)
+        candidates = np.flatnonzero(flat <= cutoff)  # nan is never under the cutoff
+        ordered = candidates[np.argsort(flat[candidates], kind='stable')]
         mapping = {}
-        while 1 == 1:
-            d = np.nanmin(array)
-            if d > cutoff:
-                break
-            w = np.where(array == d)
-            f, s = w[0][0], w[1][0]
+        taken = set()
+        for f, s in zip(*np.unravel_index(ordered, array.shape)):
+            if f in mapping or s in taken:
+                continue
             mapping[int(f)] = int(s)  # np.int64 --> int
-            array[f, :] = np.ones(array.shape[1]) * 999
-            array[:, s] = np.ones(array.shape[0]) * 999
+            taken.add(s)
         return mapping
+
+    @classmethod
+    def _gpm_optimal_assignment(cls, array: np.array, cutoff: float) -> Dict[int, int]:
+        """
+        Linear sum assignment where the pairs over the cutoff cost more than all the pairs under the cutoff combined,
+        so the number of pairs is maximised first and their summed distance minimised second.
+
+        :param array:
+        :param cutoff:
+        :return:
+        """
+        allowed = np.nan_to_num(array, nan=np.inf) <= cutoff
+        penalty = cutoff * min(array.shape) + 1
+        costs = np.where(allowed, array, penalty)
+        return {int(f): int(s) for f, s in zip(*linear_sum_assignment(costs)) if allowed[f, s]}
@@ -0,0 +1,102 @@
+########################################################################################################################
+
+__doc__ = \
+    """
+Spatial index (KD-tree) of the atom positions of a conformer.
+Used by the proximity queries of Monster and Unmerge ("which atoms of A are within X Å of atoms of B")
+so that the cost scales with the number of neighbours and not with N x M.
+    """
+
+########################################################################################################################
+
+from collections import OrderedDict
+from typing import Tuple
+
+import numpy as np
+from rdkit import Chem
+from scipy.spatial import cKDTree
+
+
+class SpatialIndex:
+    """
+    The trees are cached per conformer, keyed by its coordinates,
+    so a molecule that has been moved or altered gets a fresh tree while an unchanged one is reused.
+    The distances returned are calculated from the coordinates and not by the tree,
+    so they are identical to those of a dense distance matrix.
+    """
+    cache_size = 256  #: number of trees kept.
+    _trees = OrderedDict()
+
+    @classmethod
+    def get_coordinates(cls, mol: Chem.Mol) -> np.ndarray:
+        """
+        (N, 3) array of the positions of the first conformer.
+        """
+        return np.array(mol.GetConformers()[0].GetPositions())
+
+    @classmethod
+    def get_tree(cls, coordinates: np.ndarray) -> cKDTree:
+        """
+        Get the (cached) tree for the coordinates.
+
+        :param coordinates: (N, 3) array
+        :return:
+        """
+        key = (coordinates.shape, coordinates.tobytes())
+        if key in cls._trees:
+            cls._trees.move_to_end(key)
+            return cls._trees[key]
+        tree = cKDTree(coordinates)
+        cls._trees[key] = tree
+        while len(cls._trees) > cls.cache_size:
+            cls._trees.popitem(last=False)
+        return tree
+
+    @classmethod
+    def get_pair_distances(cls,
+                           xyz_A: np.ndarray,
+                           xyz_B: np.ndarray,
+                           idx_A: np.ndarray,
+                           idx_B: np.ndarray) -> np.ndarray:
+        """
+        Distances between the atom pairs ``idx_A[n]``, ``idx_B[n]``.
+        """
+        return np.sum((xyz_A[idx_A] - xyz_B[idx_B]) ** 2, axis=1) ** 0.5
+
+    @classmethod
+    def get_close_pairs(cls,
+                        xyz_A: np.ndarray,
+                        xyz_B: np.ndarray,
+                        radius: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        The pairs of atoms of A and B that are within ``radius`` (inclusive), sorted in row-major order
+        (i.e. as ``np.where`` on a distance matrix would).
+
+        :param xyz_A: (N, 3) array
+        :param xyz_B: (M, 3) array
+        :param radius: Å
+        :return: indices of A, indices of B, distances
+        """
+        empty = np.array([], dtype=int)
+        if len(xyz_A) == 0 or len(xyz_B) == 0:
+            return empty, empty, np.array([])
+        # the tree has its own rounding, hence the tiny slack and the exact filter after.
+        neighbors = cls.get_tree(xyz_A).query_ball_tree(cls.get_tree(xyz_B), radius + 1e-6)
+        idx_A = np.array([i for i, js in enumerate(neighbors) for j in js], dtype=int)
+        idx_B = np.array([j for js in neighbors for j in js], dtype=int)
+        order = np.lexsort((idx_B, idx_A))
+        idx_A, idx_B = idx_A[order], idx_B[order]
+        distances = cls.get_pair_distances(xyz_A, xyz_B, idx_A, idx_B)
+        within = distances <= radius
+        return idx_A[within], idx_B[within], distances[within]
+
+    @classmethod
+    def get_nearest_distance(cls, xyz_A: np.ndarray, xyz_B: np.ndarray) -> float:
+        """
+        Shortest distance between any atom of A and any atom of B. ``np.inf`` if either is empty.
+        """
+        if len(xyz_A) == 0 or len(xyz_B) == 0:
+            return np.inf
+        distances, nearest = cls.get_tree(xyz_B).query(xyz_A, k=1)
+        i = int(np.argmin(distances))
+        return float(cls.get_pair_distances(xyz_A, xyz_B, np.array([i]), nearest[[i]])[0])
@@ -15,17 +15,33 @@ __citation__ = ""
 ########################################################################################################################
 
 
-from typing import Callable, List, Dict, Tuple, Optional, Any
+from typing import Callable, List, Dict, Tuple, Optional, Any, Mapping, NamedTuple
+from types import MappingProxyType
 from rdkit import Chem
 from rdkit.Chem import rdFMCS
 import numpy as np
 import json
+import multiprocessing
 from .positional_mapping import GPM
+from .spatial_index import SpatialIndex
 from collections import deque
 import logging
 
 log = logging.getLogger(__name__)
 
+class UnmergeState(NamedTuple):
+    """
+    The state of a node of the Unmerge search: the combined mol without the mol.
+
+    * ``included``: the hits combined (indices of ``Unmerge.mols``) in order
+    * ``offsets``: index in combined of the first atom of each included hit, plus the total number of atoms
+    * ``mapping``: followup -> combined (read-only)
+    """
+    included: Tuple[int, ...] = ()
+    offsets: Tuple[int, ...] = (0,)
+    mapping: Mapping[int, int] = MappingProxyType({})
+
+
 class Unmerge(GPM):
     """
     This class tries to solve the mapping problem by try all possible mappings of the target to the ligand.
@@ -46,12 +62,18 @@ class Unmerge(GPM):
     rotational_approach = True
     pick = 0 # override to pick not the first(0) best match.
     distance_cutoff = 3 #: how distance is too distant in Å
+    branch_and_bound = True  #: prune branches that cannot beat the best complete option (only if pick == 0)
+    n_workers = 1  #: processes across which the top-level branches are explored (1 = serial)
+    # settings that a worker process needs to copy as they may have been altered in the parent
+    _worker_settings = ('max_strikes', 'pick', 'distance_cutoff', 'branch_and_bound', 'cutoff', 'assignment')
 
     def __init__(self,
                  followup: Chem.Mol,
                  mols: List[Chem.Mol],
                  maps: Dict[str, List[Dict[int, int]]],
-                 no_discard:bool=False):
+                 no_discard:bool=False,
+                 n_workers: Optional[int]=None,
+                 hit_matrices: Optional[Dict[Tuple[int, int], Tuple[np.ndarray, ...]]]=None):
         """
 
 
@@ -62,19 +84,14 @@ class Unmerge(GPM):
         :param maps: can be generated outseide of Monster by ``.make_maps``.
         :type maps: Dict[List[Dict[int, int]]]
         :param no_discard: do not allow any to be discarded
+        :param n_workers: processes to use (default: the class attribute ``n_workers``)
+        :param hit_matrices: output of ``get_hit_matrices`` for these mols, to reuse across follow-ups
         """
         # ---- inputs ------------
-        self.followup = followup
-        self.mols = mols
-        self.maps = maps
-        self.no_discard = no_discard
-        if self.no_discard:
-            self.max_strikes = 100
-        # ---- to be filled ------------
+        self.setup(followup, mols, maps, no_discard, hit_matrices)
+        if n_workers is not None:
+            self.n_workers = n_workers
         accounted_for = set()
-        self.c_map_options = []
-        self.c_options = []
-        self.c_disregarded_options = []
         self.combined = None
         self.combined_alternatives = []
         self.combined_map = {}
@@ -82,25 +99,27 @@ class Unmerge(GPM):
         self.combined_bonded = None
         self.combined_bonded_alternatives = []
         self.combined_map_alternatives = []
+        self.best_goodness = -float('inf')  # best goodness of a complete (valid) option so far
+        self.n_pruned = 0  # branches pruned
         #  ---- sorters  --------------------
-        goodness_sorter = lambda i: len(self.c_map_options[i]) - self.offness(self.c_options[i], self.c_map_options[i])
+        goodness_sorter = lambda i: self.c_goodness_options[i]  # len(map) - offness, calculated by store
         accounted_sorter = self.template_sorter_factory(accounted_for)
         # ---- rotate ----------------------------
         if self.rotational_approach:
             others = deque(self.mols)
+            orderings = []
             for s in range(len(self.mols)):
                 others.rotate(1)
-                self.unmerge_inner(Chem.Mol(), {}, list(others), [])
+                orderings.append(list(others))
+            self.explore(orderings)
         else:  # pre sort
             others = sorted(self.mols, key=accounted_sorter, reverse=True)
-            self.unmerge_inner(Chem.Mol(), {}, list(others), [])
-            i = sorted(range(len(self.c_options)),
-                       key=goodness_sorter,
-                       reverse=True)[0]
+            self.explore([list(others)])
+            orderings = []
             for alt in self.c_disregarded_options[0]:
-                aname = alt.GetProp('_Name')
-                not_alt = set([o for o in others if o.GetProp('_Name') != aname])
-                self.unmerge_inner(Chem.Mol(), {}, [alt] + list(not_alt), [])
+                not_alt = set([o for o in others if o is not alt])
+                orderings.append([alt] + list(not_alt))
+            self.explore(orderings)
         # ---- find best ------------------------------------
         if self.no_discard:
             valids = [i for i, v in enumerate(self.c_disregarded_options) if len(v) == 0]
@@ -128,15 +147,179 @@ class Unmerge(GPM):
         #         dv = self.measure_map(mol, m)
         #         print(j, [dd.GetProp('_Name') for dd in d], len(m), np.mean(dv), np.max(dv), self.offness(mol, m))
         # ----- fill ----------------------------------------------------------------
-        self.combined = self.c_options[i]
+        self.combined = self.get_option(i)
         self.combined_map = self.c_map_options[i]
         self.disregarded = self.c_disregarded_options[i]
         self.combined_bonded = self.bond()
         alternative_indices = [j for j in equals if j != i]
-        self.combined_alternatives = [self.c_options[j] for j in alternative_indices]
+        self.combined_alternatives = [self.get_option(j) for j in alternative_indices]
         self.combined_map_alternatives = [self.c_map_options[j] for j in alternative_indices]
         self.combined_bonded_alternatives = [self.bond(n) for n in range(len(self.combined_alternatives))]
 
+    def setup(self,
+              followup: Chem.Mol,
+              mols: List[Chem.Mol],
+              maps: Dict[str, List[Dict[int, int]]],
+              no_discard: bool = False,
+              hit_matrices: Optional[Dict[Tuple[int, int], Tuple[np.ndarray, ...]]] = None):
+        """
+        Stores the inputs and empties the options, without searching. Called by ``__init__`` and by the workers.
+        """
+        self.followup = followup
+        self.mols = mols
+        self.maps = maps
+        self.no_discard = no_discard
+        if self.no_discard:
+            self.max_strikes = 100
+        self.hit_indices = {id(mol): i for i, mol in enumerate(mols)}  # by identity as names may repeat
+        # ---- search tables ------------
+        # the search works on hit indices (see ``UnmergeState``), combined mols are made only for the chosen options.
+        self.names = [mol.GetProp('_Name') for mol in mols]
+        self.hit_sizes = [mol.GetNumAtoms() for mol in mols]
+        self.hit_starts = np.cumsum([0] + self.hit_sizes)[:-1]  # first atom of each hit in ``hit_coordinates``
+        self.hit_coordinates = np.vstack([SpatialIndex.get_coordinates(mol) for mol in mols]) if mols \
+                               else np.zeros((0, 3))
+        self.followup_neighbors = [[neigh.GetIdx() for neigh in atom.GetNeighbors()]
+                                   for atom in followup.GetAtoms()]
+        # combined is only ever a ``CombineMols`` of hits, so the other -> combined positional mapping
+        # is assembled from the hit x hit matrices (see ``get_inter_map``)
+        self.hit_matrices = hit_matrices if hit_matrices is not None else self.get_hit_matrices(mols)
+        self.inter_maps = {}  # (other index, included indices) -> other -> combined map
+        self.clear_options()
+
+    @classmethod
+    def get_hit_matrices(cls, mols: List[Chem.Mol]) -> Dict[Tuple[int, int], Tuple[np.ndarray, ...]]:
+        """
+        The ``_gpm_matrices`` of each ordered pair of hits (by index),
+        which depend on the hits only and not on the follow-up.
+        """
+        return {(a, b): cls._gpm_matrices(mol_A, mol_B)
+                for a, mol_A in enumerate(mols) for b, mol_B in enumerate(mols) if a != b}
+
+    def clear_options(self):
+        """
+        Empties the options found (``c_*`` lists).
+        """
+        self.c_map_options = []
+        self.c_options = []  # None until combined (see ``get_option``)
+        self.c_included_options = []  # indices of the hits in the combined mol (in order)
+        self.c_disregarded_options = []
+        self.c_goodness_options = []
+
+    # ---- exploration -------------------------------------------------------------------------------------------------
+
+    def explore(self, orderings: List[List[Chem.Mol]]) -> None:
+        """
+        Searches the trees starting from each ordering of the hits (serially or across ``n_workers`` processes).
+        The options are stored in the same order in either case.
+        A daemonic process (e.g. a worker of ``Victor.laboratory``) cannot have children, so it searches serially.
+        """
+        orderings = [tuple(self.hit_indices[id(other)] for other in others) for others in orderings]
+        n_workers = self.n_workers
+        if n_workers > 1 and multiprocessing.current_process().daemon:
+            log.debug('Unmerge in a daemonic process: the search is serial.')
+            n_workers = 1
+        if n_workers <= 1:
+            for others in orderings:
+                self.unmerge_inner(UnmergeState(), others, ())
+            return None
+        # the first level of each tree is split by map of the first hit.
+        # An empty combined means the possible map is the map itself, so identical maps are identical branches.
+        tasks = []
+        layout = []  # task index of each branch in serial order
+        for others in orderings:
+            explored = {}
+            for oi, o_pair in enumerate(self.maps[self.names[others[0]]]):
+                branch = frozenset(dict(o_pair).items())
+                if branch not in explored:
+                    explored[branch] = len(tasks)
+                    tasks.append((others, oi))
+                layout.append(explored[branch])
+        if len(tasks) == 0:
+            return None
+        payload = self.get_worker_payload()
+        with multiprocessing.Pool(min(n_workers, len(tasks)),
+                                  initializer=_initialize_worker,
+                                  initargs=(self.__class__, payload)) as pool:
+            results = pool.map(_explore_branch, tasks, chunksize=1)
+        for t in layout:
+            for included, map_items, disregarded, goodness in results[t]:
+                self.c_map_options.append(dict(map_items))
+                self.c_options.append(None)
+                self.c_included_options.append(included)
+                self.c_disregarded_options.append([self.mols[d] for d in disregarded])
+                self.c_goodness_options.append(goodness)
+
+    def get_worker_payload(self) -> Dict[str, Any]:
+        """
+        Picklable inputs for ``from_worker_payload``.
+        The mols are sent as binaries with their properties (the default pickling drops them).
+        """
+        flags = Chem.PropertyPickleOptions.AllProps
+        return dict(followup=self.followup.ToBinary(flags),
+                    mols=[mol.ToBinary(flags) for mol in self.mols],
+                    maps=self.maps,
+                    no_discard=self.no_discard,
+                    settings={key: getattr(self, key) for key in self._worker_settings})
+
+    @classmethod
+    def from_worker_payload(cls, payload: Dict[str, Any]) -> 'Unmerge':
+        """
+        An instance that has not searched yet, for ``explore_branch`` in a worker process.
+        """
+        self = cls.__new__(cls)
+        self.setup(followup=Chem.Mol(payload['followup']),
+                   mols=[Chem.Mol(binary) for binary in payload['mols']],
+                   maps=payload['maps'],
+                   no_discard=payload['no_discard'])
+        for key, value in payload['settings'].items():
+            setattr(self, key, value)
+        self.n_workers = 1
+        self.n_pruned = 0
+        return self
+
+    def explore_branch(self, others: Tuple[int, ...], oi: int) \
+            -> List[Tuple[Tuple[int, ...], List[Tuple[int, int]], List[int], float]]:
+        """
+        Worker side of ``explore``: searches the branch where the first hit (``others[0]``) is mapped via its ``oi``-th map.
+        Only indices and numbers are returned: the parent combines the mols of the options it picks.
+
+        :param others: ordering of the hits (indices)
+        :param oi: index of the map of the first hit
+        :return: list of options as (included indices, map items, disregarded indices, goodness)
+        """
+        # a worker process explores several branches, each from scratch.
+        self.clear_options()
+        self.best_goodness = -float('inf')
+        o_map = dict(self.maps[self.names[others[0]]][oi])
+        self.judge_n_move_on(UnmergeState(), others[0], o_map, others, ())
+        return [(self.c_included_options[j],
+                 list(self.c_map_options[j].items()),
+                 [self.hit_indices[id(m)] for m in self.c_disregarded_options[j]],
+                 self.c_goodness_options[j]) for j in range(len(self.c_options))]
+
+    def get_option(self, idx: int) -> Chem.Mol:
+        """
+        The combined mol of an option (made on first request).
+        """
+        if self.c_options[idx] is None:
+            combined = self.make_combined(self.c_included_options[idx])
+            disregarded = self.c_disregarded_options[idx]
+            combined.SetProp('parts', json.dumps([m.GetProp('_Name') for m in disregarded]))
+            self.c_options[idx] = combined
+        return self.c_options[idx]
+
+    def make_combined(self, included: Tuple[int, ...]) -> Chem.Mol:
+        """
+        The hits (indices) combined into a single mol in the given order, named after them.
+        """
+        combined = Chem.Mol()
+        for other in included:
+            combined = Chem.CombineMols(combined, self.mols[other])
+        if included:
+            combined.SetProp('_Name', '-'.join([self.names[other] for other in included]))
+        return combined
+
     def get_key(self, d: dict, v: Any):
         """
         Given a value and a dict and a value get the key.
@@ -201,43 +384,81 @@ class Unmerge(GPM):
         return template_sorter
 
 
-    def store(self, combined: Chem.Mol, combined_map: Dict[int, int], disregarded: List[Chem.Mol]):
-        combined.SetProp('parts', json.dumps([m.GetProp('_Name') for m in disregarded]))
-        self.c_map_options.append(combined_map)
-        self.c_options.append(combined)
-        self.c_disregarded_options.append(disregarded)
+    def store(self, state: 'UnmergeState', disregarded: Tuple[int, ...]):
+        self.c_map_options.append(dict(state.mapping))
+        self.c_options.append(None)  # see ``get_option``
+        self.c_included_options.append(state.included)
+        self.c_disregarded_options.append([self.mols[d] for d in disregarded])
+        goodness = len(state.mapping) - self.get_state_offness(state) if state.mapping else 0
+        self.c_goodness_options.append(goodness)
+        if state.mapping and (not self.no_discard or len(disregarded) == 0):
+            self.best_goodness = max(self.best_goodness, goodness)
         return None
 
+    def restore(self, start: int, end: int):
+        """
+        Stores again the options from ``start`` to ``end``, which are those of an identical branch.
+        """
+        self.c_map_options.extend(self.c_map_options[start:end])
+        self.c_options.extend(self.c_options[start:end])
+        self.c_included_options.extend(self.c_included_options[start:end])
+        self.c_disregarded_options.extend(self.c_disregarded_options[start:end])
+        self.c_goodness_options.extend(self.c_goodness_options[start:end])
+
+    def is_dominated(self, state: 'UnmergeState', others: Tuple[int, ...]) -> bool:
+        """
+        Branch and bound. The goodness of an option is the number of atoms mapped minus the offness.
+        The mapped atoms can at most grow by the most novel atoms each remaining hit can contribute
+        and the offness can only grow as mapped pairs are never removed.
+        A branch is dominated if its upper bound is less than the best option found so far
+        (ties are kept as they are the alternatives).
+
+        :param state:
+        :param others: the hits yet to be judged (indices)
+        :return:
+        """
+        if not self.branch_and_bound or self.pick != 0 or self.best_goodness == -float('inf'):
+            return False
+        elif len(state.mapping) == 0:  # nothing mapped yet
+            return False
+        accounted_for = set(state.mapping.keys())
+        template_sorter = self.template_sorter_factory(accounted_for)
+        # the novel atoms are at most the sum of the best of each hit or all the novel atoms any hit has
+        addable = {k for other in others for m in self.maps[self.names[other]] for k in m} - accounted_for
+        most_addable = sum([template_sorter(self.mols[other]) for other in others])
+        most_mapped = len(state.mapping) + min(most_addable, len(addable))
+        if most_mapped - self.get_state_offness(state) < self.best_goodness:
+            self.n_pruned += 1
+            return True
+        return False
+
 
     def unmerge_inner(self,
-                      combined: Chem.Mol,
-                      combined_map: Dict[int, int],
-                      others: List[Chem.Mol],
-                      disregarded: List[Chem.Mol]) -> None:
+                      state: 'UnmergeState',
+                      others: Tuple[int, ...],
+                      disregarded: Tuple[int, ...]) -> None:
         """
         Assesses a combination of maps
         rejections: unmapped (nothing maps) / unnovel (adds nothing)
 
-        :param combined:
-        :param combined_map:
-        :param others:
-        :param disregarded:
+        :param state: hits combined so far and map followup -> combined
+        :param others: hits yet to be judged (indices)
+        :param disregarded: hits rejected (indices)
         :return:
         """
         # stop
         if len(others) == 0:
-            self.store(combined=combined, combined_map=combined_map, disregarded=disregarded)
+            self.store(state, disregarded)
+            return None
+        elif self.is_dominated(state, others):
             return None
-        # prevent issues.
-        combined_map = dict(combined_map)
-        others = list(others)
-        disregarded = list(disregarded)
         # sort
-        accounted_for = set(combined_map.keys())
+        accounted_for = set(state.mapping.keys())
         # parse
         other = others[0]
-        oname = other.GetProp('_Name')
+        oname = self.names[other]
         ot = len(self.maps[oname])
+        explored = {}  # possible map -> slice of the options its branch stored. Maps often give the same branch.
         for oi, o_pair in enumerate(self.maps[oname]):
             o_map = dict(o_pair)
             o_present = set(o_map.keys())
@@ -246,69 +467,109 @@ class Unmerge(GPM):
                 possible_map = {}
             elif len(o_present - accounted_for) == 0:
                 possible_map = {}
-            elif combined.GetNumAtoms() == 0:
+            elif len(state.included) == 0:
                 possible_map = o_map
             else:
                 possible_map = self.get_possible_map(other=other,
                                                      label=label,
                                                      o_map=o_map,
-                                                     inter_map=self.get_positional_mapping(other, combined),
-                                                     combined=combined,
-                                                     combined_map=combined_map)
+                                                     inter_map=self.get_inter_map(other, state),
+                                                     state=state)
             # verdict
-            self.judge_n_move_on(combined, combined_map, other, possible_map, others, disregarded)
-
-
-    def judge_n_move_on(self, combined, combined_map, other, possible_map, others, disregarded):
+            branch = frozenset(possible_map.items())
+            if branch in explored:
+                self.restore(*explored[branch])
+                continue
+            start = len(self.c_options)
+            self.judge_n_move_on(state, other, possible_map, others, disregarded)
+            explored[branch] = (start, len(self.c_options))
+
+
+    def judge_n_move_on(self,
+                        state: 'UnmergeState',
+                        other: int,
+                        possible_map: Dict[int, int],
+                        others: Tuple[int, ...],
+                        disregarded: Tuple[int, ...]):
         """
-        The mutables need to be within their own scope
+        The state is immutable, so accepting makes a new one and rejecting does not touch it.
 
-        :param combined:
-        :param combined_map:
-        :param other:
-        :param possible_map:
-        :param others:
+        :param state:
+        :param other: hit judged (index)
+        :param possible_map: followup -> combined with ``other`` appended (empty is a reject)
+        :param others: hits to be judged, starting with ``other``
         :param disregarded:
         :return:
         """
         if len(possible_map) == 0:
             # reject
-            combined = Chem.Mol(combined)
-            disregarded = [*disregarded, other]  # new obj
+            disregarded = (*disregarded, other)
         else:
             # accept
-            combined_map = {**combined_map, **possible_map}  # new obj
-            combined = Chem.CombineMols(combined, other)  # new obj
-            name = '-'.join([m.GetProp('_Name') for m in (combined, other) if m.HasProp('_Name')])
-            combined.SetProp('_Name', name)
-            disregarded = disregarded.copy()  # new obj
+            state = self.extend_state(state, other, possible_map)
         # do inners
-        accounted_for = set(combined_map.keys())
+        accounted_for = set(state.mapping.keys())
         template_sorter = self.template_sorter_factory(accounted_for)
-        sorted_others = sorted(others[1:], key=template_sorter)
-        self.unmerge_inner(combined, combined_map, sorted_others, disregarded)
+        sorted_others = tuple(sorted(others[1:], key=lambda o: template_sorter(self.mols[o])))
+        self.unmerge_inner(state, sorted_others, disregarded)
+
+    def extend_state(self, state: 'UnmergeState', other: int, possible_map: Dict[int, int]) -> 'UnmergeState':
+        """
+        The state with the hit ``other`` appended (its atoms come after those already combined).
+        """
+        return UnmergeState(included=(*state.included, other),
+                            offsets=(*state.offsets, state.offsets[-1] + self.hit_sizes[other]),
+                            mapping=MappingProxyType({**state.mapping, **possible_map}))
+
+    def get_global_indices(self, state: 'UnmergeState', idxs: np.ndarray) -> np.ndarray:
+        """
+        Indices in ``hit_coordinates`` of atoms of combined (i.e. positions without combining the mols).
+        """
+        idxs = np.asarray(idxs, dtype=int)
+        offsets = np.array(state.offsets)
+        nth = np.searchsorted(offsets, idxs, side='right') - 1  # nth hit of the state
+        hits = np.array(state.included, dtype=int)[nth]
+        return self.hit_starts[hits] + idxs - offsets[nth]
+
+    def get_inter_map(self, other: int, state: 'UnmergeState') -> Dict[int, int]:
+        """
+        Same as ``get_positional_mapping(other, combined)``,
+        but the distance matrix is stacked from the precomputed blocks of the hits in combined
+        (their atoms are in the same order) and the mapping is memoised for that combination of hits.
+        The mapping is done on the whole matrix and not per hit as a closest-first assignment is not separable.
+
+        :param other: hit (index)
+        :param state:
+        :return: other -> combined
+        """
+        key = (other, state.included)
+        if key not in self.inter_maps:
+            blocks = [self.hit_matrices[other, included] for included in state.included]
+            matrices = [np.hstack([block[k] for block in blocks]) for k in range(3)]
+            self.inter_maps[key] = self._gpm_from_matrices(*matrices)
+        return self.inter_maps[key]
 
 
     def get_possible_map(self,
-                         other: Chem.Mol,
+                         other: int,
                          label: str,
                          o_map: Dict[int, int],  # followup -> other
                          inter_map: Dict[int, int],  # other -> combined
-                         combined: Chem.Mol,
-                         combined_map: Dict[int, int]) -> Dict[int, int]:
+                         state: 'UnmergeState') -> Dict[int, int]:
         """
         This analyses a single map (o_map) and returns a possible map
 
-        :param other:
+        :param other: hit (index)
         :param label:
         :param o_map: followup -> other
         :param inter_map:
-        :param combined:
-        :param combined_map: followup -> combined
+        :param state: hits combined and map followup -> combined
         :return: followup -> other
         """
         possible_map = {}
         strikes = 0  # x strikes is discarded
+        combined_map = state.mapping
+        n_combined = state.offsets[-1]
         accounted_for = set(combined_map.keys())
         for i, o in o_map.items():  # check each atom is okay
             # i = followup index
@@ -327,35 +588,43 @@ class Unmerge(GPM):
                     strikes += 1
             elif o not in inter_map:
                 # new atom that does not overlap
-                possible_map[i] = combined.GetNumAtoms() + o
+                possible_map[i] = n_combined + o
             elif inter_map[o] not in combined_map.values():
                 # overlaps but the overlap was not counted
-                possible_map[i] = combined.GetNumAtoms() + o
+                possible_map[i] = n_combined + o
             else:  # mismatch!
                 log.debug(f'{label} - {i} mismatch')
                 strikes += 1
         if strikes >= self.max_strikes:
             return {}
-        elif not self.check_possible_distances(other, possible_map, combined, combined_map, cutoff=self.distance_cutoff):
+        elif not self.check_possible_distances(other, possible_map, state, cutoff=self.distance_cutoff):
             return {}
         else:
             return possible_map
 
 
-    def check_possible_distances(self, other, possible_map, combined, combined_map, cutoff=3):
+    def check_possible_distances(self, other: int, possible_map: Dict[int, int], state: 'UnmergeState', cutoff=3):
+        # the bonds between the atoms of other and the atoms already in combined are measured in one go.
+        other_idxs = []
+        combined_idxs = []
+        combined_map = state.mapping
         for i, offset_o in possible_map.items():
-            unoffset_o = offset_o - combined.GetNumAtoms()
-            atom = self.followup.GetAtomWithIdx(i)
-            for neigh in atom.GetNeighbors():
-                ni = neigh.GetIdx()
+            unoffset_o = offset_o - state.offsets[-1]
+            for ni in self.followup_neighbors[i]:
                 if ni in possible_map:
                     pass  # assuming the inspiration compound was not janky
                 elif ni in combined_map:
-                    if self.get_inter_distance(other, combined, unoffset_o, combined_map[ni]) > cutoff:
-                        return False
+                    other_idxs.append(unoffset_o)
+                    combined_idxs.append(combined_map[ni])
                 else:
                     pass  # unmapped neighbor
-        return True
+        if not other_idxs:
+            return True
+        distances = SpatialIndex.get_pair_distances(self.hit_coordinates,
+                                                    self.hit_coordinates,
+                                                    self.hit_starts[other] + np.array(other_idxs),
+                                                    self.get_global_indices(state, np.array(combined_idxs)))
+        return not np.any(distances > cutoff)
 
 
     def bond(self, idx: Optional[int]=None):
@@ -398,19 +667,33 @@ class Unmerge(GPM):
         :param mapping: followup to comined
         :return:
         """
-        conf = mol.GetConformer()
-        d = np.array([])
+        pairs = []
         for fi, ci in mapping.items():
             fatom = self.followup.GetAtomWithIdx(fi)
             for neigh in fatom.GetNeighbors():
                 ni = neigh.GetIdx()
                 if ni not in mapping:
                     continue
-                nci = mapping[ni]
-                a = np.array(conf.GetAtomPosition(ci))
-                b = np.array(conf.GetAtomPosition(nci))
-                d = np.append(d, np.linalg.norm(a - b))
-        return d
+                pairs.append((ci, mapping[ni]))
+        if len(pairs) == 0:
+            return np.array([])
+        positions = mol.GetConformer().GetPositions()
+        idxs = np.array(pairs)
+        return np.linalg.norm(positions[idxs[:, 0]] - positions[idxs[:, 1]], axis=1)
+
+
+    def measure_state(self, state: 'UnmergeState') -> np.array:
+        """
+        Same as ``measure_map`` for the combined mol of a state.
+        """
+        mapping = state.mapping
+        pairs = [(ci, mapping[ni]) for fi, ci in mapping.items() for ni in self.followup_neighbors[fi] if ni in mapping]
+        if len(pairs) == 0:
+            return np.array([])
+        idxs = np.array(pairs)
+        positions = self.hit_coordinates
+        return np.linalg.norm(positions[self.get_global_indices(state, idxs[:, 0])] -
+                              positions[self.get_global_indices(state, idxs[:, 1])], axis=1)
 
 
     def offness(self, mol: Chem.Mol, mapping: Dict[int, int]) -> float:
@@ -421,6 +704,33 @@ class Unmerge(GPM):
         :param mapping:
         :return:
         """
-        d = self.measure_map(mol, mapping)
+        return self.get_distance_offness(self.measure_map(mol, mapping))
+
+
+    def get_state_offness(self, state: 'UnmergeState') -> float:
+        """
+        Same as ``offness`` for the combined mol of a state.
+        """
+        return self.get_distance_offness(self.measure_state(state))
+
+
+    @staticmethod
+    def get_distance_offness(d: np.array) -> float:
         # return np.linalg.norm(d - 1.5)/(d.size*0.5) # 1.5 ang
         return sum(d > 2.5) * 3
+
+
+# ---- worker process ----------------------------------------------------------------------------------------------------
+# the instance is made once per process by the initializer, so the mols are sent once per worker and not per task.
+
+_worker_unmerge = None
+
+
+def _initialize_worker(cls: type, payload: Dict[str, Any]) -> None:
+    global _worker_unmerge
+    _worker_unmerge = cls.from_worker_payload(payload)
+
+
+def _explore_branch(task: Tuple[Tuple[int, ...], int]) \
+        -> List[Tuple[Tuple[int, ...], List[Tuple[int, int]], List[int], float]]:
+    return _worker_unmerge.explore_branch(*task)
@@ -70,7 +70,7 @@ class MProVictor(Victor):
             # these are not hit inspired.
             cls.journal.error(f'No valid inspiration hits for {row.CID}.')
             return None
-        elif results and row.CID in results:
+        elif (results and row.CID in results) or cls.is_done(row.CID):
             cls.journal.info(f'{row.CID} has already been done.')
             return None
         elif row.covalent_warhead in (False, 'False', 'false'):
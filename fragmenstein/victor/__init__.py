@@ -23,6 +23,8 @@ but for simplicity is have been written that way.
 * VctorPlace => placement
 * VictorCombine => merging/linking
 * VictorUtils => Bits and bobs
+* VictorStream => streaming placement of many follow-ups from a file across processes
+* VictorLaboratory => batches of placements and combinations across worker processes (``.laboratory``)
 * 
     """
 ########################################################################################################################
@@ -31,12 +33,17 @@ from ._victor_utils import _VictorUtils
 from ._victor_validate import _VictorValidate
 from ._victor_combine import _VictorCombine
 from ._victor_place import _VictorPlace
+from ._victor_stream import _VictorStream
+from ._victor_laboratory import _VictorLaboratory
 
 
 from .minimalPDB import MinimalPDBParser
+from .result_store import ResultStore, SqliteResultStore, ParquetResultStore
+from .checkpoint_writer import CheckpointWriter
+from .reanimation_scheduler import ReanimationScheduler
 
 
-class Victor(_VictorUtils, _VictorValidate, _VictorCombine, _VictorPlace):
+class Victor(_VictorUtils, _VictorValidate, _VictorCombine, _VictorPlace, _VictorStream, _VictorLaboratory):
     """
     Victor (after Dr Victor Frankenstein) is a class that uses both Monster (makes blended compounds)
     and Igor (energy minimises).
@@ -137,6 +144,33 @@ class Victor(_VictorUtils, _VictorValidate, _VictorCombine, _VictorPlace):
     :vartype warhead_harmonisation: str
     :cvar work_path: class attr. where to save stuff
     :vartype work_path: str
+    :cvar params_cache_folder: folder in ``work_path`` where the params of each SMILES are cached (None: disabled)
+    :vartype params_cache_folder: str
+    :cvar completion_index_filename: SQLite file in ``work_path`` of the finished compounds (None: disabled)
+    :vartype completion_index_filename: str
+    :cvar reanimation_scheduler: the schedule of the minimisation rounds of ``reanimate``
+        (e.g. ``Victor.reanimation_scheduler = ReanimationScheduler(max_rounds=4, max_time=300)``)
+    :vartype reanimation_scheduler: ReanimationScheduler
+    :ivar reanimation_trace: the rounds of ``reanimate`` (constraint, ∆∆G, time), also in the summary
+    :vartype reanimation_trace: List[dict]
+    :cvar checkpoint_level: checkpoint files written in the folder of each compound:
+        'full' (all), 'summary' (the positioned and minimised mols and the jsons) or 'none'
+    :vartype checkpoint_level: str
+    :cvar checkpoint_writer: writes the checkpoint files in a background thread
+        (``Victor.checkpoint_writer.asynchronous = False`` to write straight away, ``Victor.flush_checkpoints()`` to wait)
+    :vartype checkpoint_writer: CheckpointWriter
+    :cvar record_mols: the records of ``get_record`` (and the batch runners) have the mols, for a ``ResultStore``
+    :vartype record_mols: bool
+    :cvar record_pdbblock: the records of ``get_record`` have the minimised holo PDB block
+    :vartype record_pdbblock: bool
+    :cvar stream_max_tasks_per_child: placements done by a ``place_stream`` worker before it is replaced
+    :vartype stream_max_tasks_per_child: int
+    :cvar stream_pyrosetta_options: pyrosetta init options of the worker processes of ``place_stream``
+    :vartype stream_pyrosetta_options: str
+    :cvar laboratory_pyrosetta_options: pyrosetta init options of the worker processes of ``laboratory``
+    :vartype laboratory_pyrosetta_options: str
+    :cvar laboratory_max_tasks_per_child: tasks done by a ``laboratory`` worker before it is replaced
+    :vartype laboratory_max_tasks_per_child: int
 
     ``warhead_definitions`` and ``covalent_definitions`` are class attributes that can be modified beforehand to
     allow a new attachment. ``covalent_definitions`` is a list of dictionaries of 'residue', 'smiles', 'names',
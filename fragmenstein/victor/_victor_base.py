@@ -23,6 +23,7 @@ from typing import List, Union, Optional, Callable, Dict
 from rdkit import Chem
 from ..m_rmsd import mRSMD
 from ..monster import Monster
+from ..igor import Igor
 
 
 class _VictorBase:
@@ -32,6 +33,11 @@ class _VictorBase:
     monster_mmff_minisation = True
     constraint_function_type = 'FLAT_HARMONIC'
     work_path = 'output'
+    params_cache_folder = 'params_cache'  # folder in work_path caching ``Params.from_smiles`` (None to disable)
+    completion_index_filename = 'completed.sqlite'  # SQLite in work_path of the finished compounds (None to disable)
+    checkpoint_level = 'full'  # checkpoint files written: 'full', 'summary' (mols and jsons) or 'none'
+    record_mols = False  # ``get_record`` has the minimised and positioned mols (for a ``ResultStore``)
+    record_pdbblock = False  # ``get_record`` has the minimised holo PDB block
     journal = logging.getLogger('Fragmenstein')
     journal.setLevel(logging.DEBUG)
 
@@ -117,8 +123,7 @@ class _VictorBase:
         """
         # ## Store
         # entry attributes
-        with open(pdb_filename) as fh:
-            self.apo_pdbblock = fh.read()
+        self.apo_pdbblock = Igor.resource_cache.get_pdbblock(pdb_filename)  # read once per process
         self.hits = hits
         self.ligand_resn = ligand_resn.upper()
         self.ligand_resi = ligand_resi
@@ -154,6 +159,7 @@ class _VictorBase:
                              'unbound_ref2015': {'total_score': float('nan')}}
         self.mrmsd = mRSMD.mock()
         self.ddG = float('nan')
+        self.reanimation_trace = []  # rounds of ``reanimate``
         # for debug purposes
         self.tick = time.time()
         self.tock = float('inf')
@@ -161,5 +167,6 @@ class _VictorBase:
 
     # ----------------- init called methods ----------------------------------------------------------------------------
 
-    def slugify(self, name: str):
+    @classmethod
+    def slugify(cls, name: str):
         return re.sub(r'[\W_.-]+', '-', name)
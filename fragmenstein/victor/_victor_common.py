@@ -21,15 +21,15 @@ class _VictorCommon(_VictorIgor):
 
     def _save_prerequisites(self):
         self._log_warnings()
-        #  saving params
+        #  saving params (and constraint) straight away: Igor reads them
         self.journal.debug(f'{self.long_name} - saving params')
         params_file = os.path.join(self.work_path, self.long_name, self.long_name + '.params')
         self.params.dump(params_file)
         # saving holo
         self.journal.debug(f'{self.long_name} - saving holo (unmimised)')
         holo_file = os.path.join(self.work_path, self.long_name, self.long_name + '.holo_unminimised.pdb')
-        with open(holo_file, 'w') as w:
-            w.write(self.unminimised_pdbblock)
+        if self._is_checkpointed('full'):
+            self._write_checkpoint(self.long_name + '.holo_unminimised.pdb', self.unminimised_pdbblock)
         # saving constraint
         if self.constraint is not None:
             self.journal.debug(f'{self.long_name} - saving constraint')
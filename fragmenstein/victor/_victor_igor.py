@@ -1,9 +1,33 @@
 from ._victor_store import _VictorStore
 from rdkit import Chem
 from rdkit.Chem import AllChem
+from typing import Optional
+from ..igor import Igor
 from ..m_rmsd import mRSMD
+from .reanimation_scheduler import ReanimationScheduler
 
 class _VictorIgor(_VictorStore):
+    reanimation_scheduler = ReanimationScheduler()  # the rounds of ``reanimate``
+
+    def _get_igor(self, params_file: str, constraint_file: str) -> Igor:
+        """
+        Igor with the ligand of ``unminimised_pdbblock`` spliced into a copy of the apo pose,
+        which is parsed once per process, unless covalent (the LINK record needs the parser).
+
+        :param params_file:
+        :param constraint_file:
+        :return:
+        """
+        options = dict(params_file=params_file,
+                       constraint_file=constraint_file,
+                       ligand_residue=self.ligand_resi,
+                       key_residues=[self.covalent_resi])
+        if self.is_covalent:
+            return Igor.from_pdbblock(pdbblock=self.unminimised_pdbblock, **options)
+        # the holo block is the apo block with the ligand appended (see ``_plonk_monster_in_structure``)
+        ligand_pdbblock = '\n'.join([line for line in self.unminimised_pdbblock.split('\n')
+                                     if line[:6] == 'HETATM' and line[17:20] == self.ligand_resn])
+        return Igor.from_apo_pdbblock(apo_pdbblock=self.apo_pdbblock, ligand_pdbblock=ligand_pdbblock, **options)
 
     def _fix_minimised(self) -> Chem.Mol:
         """
@@ -24,46 +48,41 @@ class _VictorIgor(_VictorStore):
         """
         self.igor.coordinate_constraint = 10.
         self.igor.minimise(cycles=5, default_coord_constraint=False)
-        self.energy_score = self.calculate_score()
-        dG_bound = self.energy_score['ligand_ref2015']['total_score']
-        dG_unbound = self.energy_score['unbound_ref2015']['total_score']
-        ddG = dG_bound - dG_unbound
+        ddG = self._score_ddG()
+        self.reanimation_trace = [{'round': 0, 'constraint': 10., '∆∆G': ddG, 'time': float('nan'), 'status': 'quick'}]
         return ddG
 
     def reanimate(self) -> float:
         """
-        Calls Igor recursively until the ddG is negative or zero.
+        Calls Igor repeatedly until the ddG is negative or zero, following the schedule of ``reanimation_scheduler``
+        (whose rounds are kept in ``reanimation_trace``).
         igor.minimise does a good job. this is just to get everything as a normal molecule
+        The rounds are scored in the 'interaction' mode of ``Igor.ligand_score``,
+        the split of the pose (``xyz_`` keys of ``energy_score``) is scored once, for the final pose,
+        if ``Igor.ligand_scoring_mode`` asks for it.
 
         :return: ddG (kcal/mol)
         """
-        ddG = 999
-        self.igor.coordinate_constraint = 0.
-        # self.igor.fa_intra_rep = 0.02 # 4x
-        # quick unconstrained minimisation to wiggle it out of nasty local minima
-        self.igor.minimise(cycles=15, default_coord_constraint=False)
-        self.igor.coordinate_constraint = 2
-        self.igor.minimise(cycles=5, default_coord_constraint=False)
-        self.igor.coordinate_constraint = 1
-        while ddG > 0:
-            self.journal.debug(f'{self.long_name} - Igor minimising')
-            self.igor.minimise(default_coord_constraint=False)
-            self.energy_score = self.calculate_score()
-            dG_bound = self.energy_score['ligand_ref2015']['total_score']
-            dG_unbound = self.energy_score['unbound_ref2015']['total_score']
-            ddG = dG_bound - dG_unbound
-            if ddG > 0:
-                self.igor.coordinate_constraint /= 2
-                self.journal.debug(
-                    f'{self.long_name} - coord_constraint lowered: {self.igor.coordinate_constraint}:  {ddG} kcal/mol.')
-            if self.igor.coordinate_constraint == 0.:
-                self.journal.warn(f'{self.long_name} - failed to minimise without constraints:  {ddG} kcal/mol.')
-                break
-            elif self.igor.coordinate_constraint < 0.005:
-                self.igor.coordinate_constraint = 0.
+        self.journal.debug(f'{self.long_name} - Igor minimising')
+        ddG, self.reanimation_trace = self.reanimation_scheduler.run(self.igor,
+                                                                     lambda: self._score_ddG(mode='interaction'))
+        if self.igor.ligand_scoring_mode in ('split', 'both'):
+            self.energy_score.update(self.igor.score_split())
+        for step in self.reanimation_trace:
+            self.journal.debug(f'{self.long_name} - round {step["round"]} at coord_constraint {step["constraint"]}: '
+                               f'{step["∆∆G"]} kcal/mol.')
+        if ddG > 0:
+            self.journal.warning(f'{self.long_name} - failed to minimise to a negative ddG '
+                                 f'({self.reanimation_trace[-1]["status"]}):  {ddG} kcal/mol.')
         self.ddG = ddG
         return ddG
 
+    def _score_ddG(self, mode: Optional[str] = None) -> float:
+        self.energy_score = self.calculate_score(mode)
+        dG_bound = self.energy_score['ligand_ref2015']['total_score']
+        dG_unbound = self.energy_score['unbound_ref2015']['total_score']
+        return dG_bound - dG_unbound
+
     def reanimate_n_store(self):
         self.reanimate()
         self._store_after_reanimation()
@@ -81,8 +100,8 @@ class _VictorIgor(_VictorStore):
         self.journal.debug(f'{self.long_name} - calculating mRMSD')
         return mRSMD.from_other_annotated_mols(self.minimised_mol, self.hits, self.monster.positioned_mol)
 
-    def calculate_score(self):
-        return {**self.igor.ligand_score(),
+    def calculate_score(self, mode: Optional[str] = None):
+        return {**self.igor.ligand_score(mode),
                 'unbound_ref2015': self.igor.detailed_scores(self.unbound_pose, 1)}
 
     @property
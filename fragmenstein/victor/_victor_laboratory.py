@@ -0,0 +1,240 @@
+########################################################################################################################
+
+__doc__ = \
+    """
+The laboratory: batches of placements and combinations run across worker processes.
+    """
+
+########################################################################################################################
+
+import inspect
+import multiprocessing
+import time
+from multiprocessing.connection import wait
+from typing import Any, Dict, Iterable, Iterator, List, MutableMapping, Optional, Set, Tuple
+
+from rdkit import Chem
+
+from ._victor_common import _VictorCommon
+
+
+class _VictorLaboratory(_VictorCommon):
+    laboratory_max_tasks_per_child = 10  # tasks done by a worker before it is replaced (Rosetta leaks memory)
+    # pyrosetta init options of the worker processes of ``laboratory``
+    laboratory_pyrosetta_options = '-no_optH false -mute all -ignore_unrecognized_res true -load_PDB_components false'
+
+    @classmethod
+    def laboratory(cls,
+                   entries: Iterable[Dict[str, Any]],
+                   cores: int = 1,
+                   timeout: Optional[float] = None,
+                   results: Optional[MutableMapping[str, dict]] = None,
+                   settings: Optional[Dict[str, Any]] = None,
+                   skip_done: bool = False) -> List[dict]:
+        """
+        Runs a batch of placements and combinations across ``cores`` worker processes
+        and returns the records (``get_record``) in the order of the entries.
+
+        An entry is a dictionary of the hits (``hits``), the arguments of the constructor (e.g. ``pdb_filename``)
+        and those of ``place``, if it has ``smiles``, or of ``combine`` otherwise:
+
+        >>> Victor.laboratory([{'hits': hits, 'pdb_filename': 'apo.pdb', 'smiles': 'CCO', 'long_name': 'ethanol'},
+        >>>                    {'hits': hits, 'pdb_filename': 'apo.pdb', 'long_name': 'merger'}], cores=20)
+
+        Each worker initialises pyrosetta once (``laboratory_pyrosetta_options``)
+        and is replaced after ``laboratory_max_tasks_per_child`` tasks to contain Rosetta memory leaks.
+        A task that runs longer than ``timeout`` seconds has its worker killed (and replaced).
+        A failed, timed out or crashed task gives a record with the ``error`` only.
+        Only the records are sent back, not the Victor instances.
+
+        :param entries: iterable of dictionaries (see above)
+        :param cores: worker processes
+        :param timeout: max wall-clock seconds per task (None is no limit)
+        :param results: mapping to which the records are written (keyed by name) as they finish, say a ``SqliteDict``
+        :param settings: class attributes to set in the workers (e.g. ``work_path``)
+        :param skip_done: skip (no record) the entries completed in ``work_path`` (see ``is_done``), say on restart
+        :return: records
+        """
+        cores = max(1, cores)
+        if skip_done:
+            work_path = (settings or {}).get('work_path', cls.work_path)
+            entries = (entry for entry in entries if not cls.is_done(cls._get_laboratory_name(entry), work_path))
+        tasks = enumerate(cls._pack_laboratory_entry(entry) for entry in entries)
+        records = {}
+        for index, record in cls._run_laboratory_tasks(tasks, cores, timeout, settings or {},
+                                                       cls.laboratory_pyrosetta_options,
+                                                       cls.laboratory_max_tasks_per_child):
+            records[index] = record
+            if results is not None:
+                results[record['name']] = record
+        return [records[index] for index in sorted(records)]
+
+    # ---- parent side -------------------------------------------------------------------------------------------------
+
+    @classmethod
+    def _run_laboratory_tasks(cls,
+                              tasks: Iterator[Tuple[int, Dict[str, Any]]],
+                              cores: int,
+                              timeout: Optional[float],
+                              settings: Dict[str, Any],
+                              pyrosetta_options: str,
+                              max_tasks: int) -> Iterator[Tuple[int, dict]]:
+        """
+        Runs the tasks (index and packed entry) across ``cores`` worker processes and yields the index and record
+        of each as it finishes. The tasks are read only when a worker is idle, so an iterator is never drained.
+        A worker is killed if its task runs longer than ``timeout`` seconds and is replaced if it crashed,
+        was killed or did ``max_tasks`` tasks. The workers are stopped when the generator is closed.
+        """
+        workers = []  # dictionaries of process, connection, task (index, entry) if busy, start time etc.
+        try:
+            task = next(tasks, None)
+            while task is not None or any(worker['task'] is not None for worker in workers):
+                # ---- send tasks to the idle workers, starting new workers up to ``cores`` -----------------------
+                while task is not None and len(workers) < cores:
+                    workers.append(cls._start_laboratory_worker(settings, pyrosetta_options, max_tasks))
+                for worker in workers:
+                    if task is not None and worker['task'] is None:
+                        worker['connection'].send(task)
+                        worker.update(task=task, start=time.time())
+                        task = next(tasks, None)
+                # ---- wait for a result, a crash or the earliest timeout ------------------------------------------
+                busy = [worker for worker in workers if worker['task'] is not None]
+                waiting = None if timeout is None else \
+                    max(0., min(worker['start'] for worker in busy) + timeout - time.time())
+                wait([worker['connection'] for worker in busy] + [worker['process'].sentinel for worker in busy],
+                     waiting)
+                for worker in busy:
+                    record = cls._get_laboratory_record(worker, timeout)
+                    if record is None:
+                        continue
+                    index = worker['task'][0]
+                    worker['task'] = None
+                    worker['done'] += 1
+                    if worker['failed'] or worker['done'] >= max_tasks:
+                        cls._stop_laboratory_worker(worker)
+                        workers.remove(worker)
+                    yield index, record
+        finally:
+            for worker in workers:
+                cls._stop_laboratory_worker(worker)
+
+    @classmethod
+    def _pack_laboratory_entry(cls, entry: Dict[str, Any]) -> Dict[str, Any]:
+        # the default pickling of a Chem.Mol drops its properties, such as the name of the hit.
+        return {**entry, 'hits': [hit.ToBinary(Chem.PropertyPickleOptions.AllProps) for hit in entry['hits']]}
+
+    @classmethod
+    def _start_laboratory_worker(cls,
+                                 settings: Dict[str, Any],
+                                 pyrosetta_options: str,
+                                 max_tasks: int) -> Dict[str, Any]:
+        parent_connection, child_connection = multiprocessing.Pipe()
+        process = multiprocessing.Process(target=_laboratory_worker,
+                                          args=(cls, settings, pyrosetta_options, max_tasks, child_connection),
+                                          daemon=True)
+        process.start()
+        child_connection.close()
+        return dict(process=process, connection=parent_connection, task=None, start=float('nan'), done=0, failed=False)
+
+    @classmethod
+    def _stop_laboratory_worker(cls, worker: Dict[str, Any]) -> None:
+        if worker['process'].is_alive():
+            try:
+                worker['connection'].send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            worker['process'].join(5)
+        if worker['process'].is_alive():
+            worker['process'].kill()
+            worker['process'].join()
+        worker['connection'].close()
+
+    @classmethod
+    def _get_laboratory_record(cls, worker: Dict[str, Any], timeout: Optional[float]) -> Optional[dict]:
+        """
+        The record of the task of the worker if it is over (done, crashed or timed out) else None.
+        A crash or a timeout flags the worker as ``failed`` as it needs replacing.
+        """
+        index, entry = worker['task']
+        try:
+            if worker['connection'].poll():
+                return worker['connection'].recv()[1]
+        except (EOFError, OSError):
+            pass  # died while sending
+        if not worker['process'].is_alive():
+            error = ChildProcessError(f"worker died (exitcode {worker['process'].exitcode})")
+        elif timeout is not None and time.time() - worker['start'] > timeout:
+            worker['process'].kill()
+            worker['process'].join()
+            error = TimeoutError(f'killed after {timeout} seconds')
+        else:
+            return None
+        cls.journal.error(f"{cls._get_laboratory_name(entry)} — {error.__class__.__name__}: {error}")
+        worker['failed'] = True
+        return cls._get_laboratory_error_record(entry, error)
+
+    @classmethod
+    def _get_laboratory_name(cls, entry: Dict[str, Any]) -> str:
+        # as in ``combine``, a merger is by default named after the hits (which may be packed as binaries).
+        if entry.get('long_name'):
+            return entry['long_name']
+        return '-'.join((Chem.Mol(hit) if isinstance(hit, bytes) else hit).GetProp('_Name') for hit in entry['hits'])
+
+    @classmethod
+    def _get_laboratory_error_record(cls, entry: Dict[str, Any], error: Exception) -> dict:
+        return {'name': cls._get_laboratory_name(entry),
+                'smiles': entry.get('smiles'),
+                'error': f'{error.__class__.__name__}: {error}'}
+
+    @classmethod
+    def _get_constructor_arguments(cls) -> Set[str]:
+        # subclasses (e.g. MProVictor) may pass ``**options`` on to the constructor of Victor.
+        arguments = set()
+        for klass in cls.__mro__:
+            if '__init__' in vars(klass):
+                arguments.update(name for name, parameter in inspect.signature(klass.__init__).parameters.items()
+                                 if parameter.kind not in (parameter.VAR_KEYWORD, parameter.VAR_POSITIONAL))
+        return arguments - {'self'}
+
+    # ---- worker side -------------------------------------------------------------------------------------------------
+
+    @classmethod
+    def _run_laboratory_entry(cls, packed: Dict[str, Any]) -> dict:
+        """
+        Runs a packed entry (hits as binaries) in this process and returns the record (``get_record``).
+        """
+        entry = dict(packed)
+        hits = [Chem.Mol(binary) for binary in entry.pop('hits')]
+        constructor_arguments = cls._get_constructor_arguments()
+        options = {key: entry.pop(key) for key in list(entry) if key in constructor_arguments}
+        try:
+            victor = cls(hits=hits, **options)
+            if 'smiles' in entry:
+                victor.place(**entry)
+            else:
+                victor.combine(**entry)
+            return victor.get_record()
+        except Exception as error:
+            cls.journal.error(f"{cls._get_laboratory_name(packed)} — {error.__class__.__name__}: {error}")
+            return cls._get_laboratory_error_record(packed, error)
+
+
+def _laboratory_worker(cls, settings, pyrosetta_options, max_tasks, connection):
+    """
+    The loop of a worker process of ``laboratory``: initialise once, then run tasks until told to stop
+    (``None``) or ``max_tasks`` are done.
+    """
+    import pyrosetta
+    import pyrosetta.distributed
+    pyrosetta.distributed.maybe_init(extra_options=pyrosetta_options)
+    for key, value in settings.items():
+        setattr(cls, key, value)
+    for _ in range(max_tasks):
+        task = connection.recv()
+        if task is None:
+            break
+        index, entry = task
+        connection.send((index, cls._run_laboratory_entry(entry)))
+        # the checkpoint files are written while the record is handled (a worker may be killed when idle).
+        cls.flush_checkpoints()
+    connection.close()
@@ -1,5 +1,10 @@
+import hashlib
+import json
+import os
+import pickle
 from typing import *
 from ._victor_common import _VictorCommon
+from rdkit import Chem
 from rdkit_to_params import Params
 from ..monster import Monster
 from ..igor import Igor
@@ -48,7 +53,7 @@ class _VictorPlace(_VictorCommon):
         self.make_output_folder()
         # make params
         self.journal.debug(f'{self.long_name} - Starting parameterisation')
-        self.params = Params.from_smiles(self.smiles, name=self.ligand_resn, generic=False, atomnames=self.atomnames)
+        self.params = self._get_params_from_smiles()
         # self.journal.warning(f'{self.long_name} - CHI HAS BEEN DISABLED')
         # self.params.CHI.data = []  # Chi is fixed, but older version. should probably check version
         self.mol = self.params.mol
@@ -76,11 +81,7 @@ class _VictorPlace(_VictorCommon):
         self._checkpoint_alpha()
         # ***** EGOR *******
         self.journal.debug(f'{self.long_name} - setting up Igor')
-        self.igor = Igor.from_pdbblock(pdbblock=self.unminimised_pdbblock,
-                                       params_file=params_file,
-                                       constraint_file=constraint_file,
-                                       ligand_residue=self.ligand_resi,
-                                       key_residues=[self.covalent_resi])
+        self.igor = self._get_igor(params_file, constraint_file)
         # user custom code.
         if self.pose_fx is not None:
             self.journal.debug(f'{self.long_name} - running custom pose mod.')
@@ -97,6 +98,69 @@ class _VictorPlace(_VictorCommon):
         self.ddG = ddG
         self._store_after_reanimation()
 
+    def _get_params_from_smiles(self) -> Params:
+        """
+        ``Params.from_smiles`` of the followup, cached on disk (``params_cache_folder`` in ``work_path``)
+        by canonical SMILES, residue name and atom names,
+        so a rerun or a repeated compound skips the parameterisation.
+        The atom names are indexed by the atoms of the given SMILES,
+        so if there are any the given SMILES is used instead of the canonical one.
+
+        :return: params, whose ``.mol`` is the template
+        """
+        if not self.params_cache_folder:
+            return Params.from_smiles(self.smiles, name=self.ligand_resn, generic=False, atomnames=self.atomnames)
+        atomnames = dict(enumerate(self.atomnames)) if isinstance(self.atomnames, list) else dict(self.atomnames or {})
+        mol = Chem.MolFromSmiles(self.smiles)
+        if atomnames or mol is None:
+            smiles = self.smiles
+        else:
+            smiles = Chem.MolToSmiles(mol)
+        key = json.dumps([smiles, self.ligand_resn, sorted(atomnames.items())])
+        folder = os.path.join(self.work_path, self.params_cache_folder)
+        filename = os.path.join(folder, hashlib.sha1(key.encode()).hexdigest() + '.pkl')
+        if os.path.exists(filename):
+            try:
+                with open(filename, 'rb') as fh:
+                    params = self._unpickle_params(fh.read())
+                self.journal.debug(f'{self.long_name} - params from cache ({smiles})')
+                return params
+            except Exception as error:
+                self.journal.warning(f'{self.long_name} - params cache unreadable ({error.__class__.__name__}: {error})')
+        params = Params.from_smiles(self.smiles, name=self.ligand_resn, generic=False, atomnames=self.atomnames)
+        os.makedirs(folder, exist_ok=True)
+        # written aside and moved, so another process never reads a partial file.
+        partial = f'{filename}.{os.getpid()}'
+        with open(partial, 'wb') as fh:
+            fh.write(self._pickle_params(params))
+        os.replace(partial, filename)
+        return params
+
+    @staticmethod
+    def _pickle_params(params: Params) -> bytes:
+        # the default pickling of a Chem.Mol drops its properties and Chem.Atom cannot be pickled,
+        # so the mol is stored as a binary and lists of its atoms (e.g. ``ordered_atoms``) as indices.
+        state = dict(params.__dict__)
+        mol = state.pop('mol')
+        atom_lists = [key for key, value in state.items()
+                      if isinstance(value, list) and value and all(isinstance(atom, Chem.Atom) for atom in value)]
+        for key in atom_lists:
+            state[key] = [atom.GetIdx() for atom in state[key]]
+        return pickle.dumps({'state': state,
+                             'atom_lists': atom_lists,
+                             'mol': mol.ToBinary(Chem.PropertyPickleOptions.AllProps),
+                             'params': params.dumps()})  # for humans
+
+    @staticmethod
+    def _unpickle_params(data: bytes) -> Params:
+        data = pickle.loads(data)
+        params = Params.__new__(Params)
+        params.__dict__.update(data['state'])
+        params.mol = Chem.Mol(data['mol'])
+        for key in data['atom_lists']:
+            setattr(params, key, [params.mol.GetAtomWithIdx(i) for i in data['state'][key]])
+        return params
+
     def _assert_placement_inputs(self):
         if '*' in self.smiles and (self.covalent_resi is None or self.covalent_resn is None):
             raise ValueError(f'{self.long_name} - is covalent but without known covalent residues')
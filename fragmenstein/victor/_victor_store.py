@@ -1,21 +1,59 @@
+import io
 import json
 import os
+from typing import Dict, Optional, Union
 
 import pyrosetta
 from rdkit import Chem
 
+from ..igor import Igor
 from ._victor_overridables import _VictorOverridables
+from .checkpoint_writer import CheckpointWriter
+from .completion_index import CompletionIndex
 
 
 class _VictorStore(_VictorOverridables):
     # _save_prerequisites is in VictorCommon
+    checkpoint_levels = ('none', 'summary', 'full')  # see ``checkpoint_level``
+    # writes the checkpoint files in a background thread (``.asynchronous = False`` to write straight away)
+    checkpoint_writer = CheckpointWriter()
+    _completion_indices: Dict[str, CompletionIndex] = {}  # by path, see ``get_completion_index``
 
     def checkpoint(self):
         self._checkpoint_alpha()
         self._checkpoint_bravo()
         self._checkpoint_charlie()
 
+    @classmethod
+    def flush_checkpoints(cls):
+        """
+        Blocks until the queued checkpoint files are written (this is done at exit too).
+        """
+        cls.checkpoint_writer.flush()
+
+    def _is_checkpointed(self, level: str) -> bool:
+        """
+        Are the files of ``level`` ('summary' or 'full') written at the ``checkpoint_level`` of the class?
+        """
+        if self.checkpoint_level not in self.checkpoint_levels:
+            raise ValueError(f'checkpoint_level {self.checkpoint_level} is not one of {self.checkpoint_levels}')
+        return self.checkpoint_levels.index(self.checkpoint_level) >= self.checkpoint_levels.index(level)
+
+    def _write_checkpoint(self, filename: str, content: Union[str, bytes]) -> None:
+        """
+        Queues the content (serialised) for the file in the folder of the compound.
+        """
+        self.checkpoint_writer.write(os.path.join(self.work_path, self.long_name, filename), content)
+
+    @staticmethod
+    def _pose_to_pdbblock(pose: pyrosetta.Pose) -> str:
+        buffer = pyrosetta.rosetta.std.stringbuf()
+        pose.dump_pdb(pyrosetta.rosetta.std.ostream(buffer))
+        return buffer.str()
+
     def _checkpoint_alpha(self):
+        if not self._is_checkpointed('full'):
+            return
         self._log_warnings()
         # saving hits (without copying)
         for h, hit in enumerate(self.hits):
@@ -23,25 +61,20 @@ class _VictorStore(_VictorOverridables):
                 name = hit.GetProp("_Name")
             else:
                 name = f'hit{h}'
-            hfile = os.path.join(self.work_path, self.long_name, f'{name}.pdb')
-            Chem.MolToPDBFile(hit, hfile)
-            mfile = os.path.join(self.work_path, self.long_name, f'{name}.mol')
-            Chem.MolToMolFile(hit, mfile, kekulize=False)
+            self._write_checkpoint(f'{name}.pdb', Chem.MolToPDBBlock(hit))
+            self._write_checkpoint(f'{name}.mol', Chem.MolToMolBlock(hit, kekulize=False))
         # saving params template
-        params_template_file = os.path.join(self.work_path, self.long_name, self.long_name + '.params_template.pdb')
-        Chem.MolToPDBFile(self.params.mol, params_template_file)
-        params_template_file = os.path.join(self.work_path, self.long_name, self.long_name + '.params_template.mol')
-        Chem.MolToMolFile(self.params.mol, params_template_file)
+        self._write_checkpoint(self.long_name + '.params_template.pdb', Chem.MolToPDBBlock(self.params.mol))
+        self._write_checkpoint(self.long_name + '.params_template.mol', Chem.MolToMolBlock(self.params.mol))
         # checking all is in order
-        ptest_file = os.path.join(self.work_path, self.long_name, self.long_name + '.params_test.pdb')
-        self.unbound_pose.dump_pdb(ptest_file)
-        pscore_file = os.path.join(self.work_path, self.long_name, self.long_name + '.params_test.score')
-        scorefxn = pyrosetta.get_fa_scorefxn()
-        with open(pscore_file, 'w') as w:
-            w.write(str(scorefxn(self.unbound_pose)))
+        self._write_checkpoint(self.long_name + '.params_test.pdb', self._pose_to_pdbblock(self.unbound_pose))
+        scorefxn = Igor.resource_cache.get_scorefxn()
+        self._write_checkpoint(self.long_name + '.params_test.score', str(scorefxn(self.unbound_pose)))
         self._log_warnings()
 
     def _checkpoint_bravo(self):
+        if not self._is_checkpointed('summary'):
+            return
         self._log_warnings()
         self.journal.debug(f'{self.long_name} - saving mols from monster')
         # if self.monster.scaffold is not None:
@@ -56,38 +89,70 @@ class _VictorStore(_VictorOverridables):
         #     chimera_file = os.path.join(self.work_path, self.long_name, self.long_name + '.chimera.mol')
         #     Chem.MolToMolFile(self.monster.chimera, chimera_file, kekulize=False)
         if self.monster.positioned_mol is not None:
-            pos_file = os.path.join(self.work_path, self.long_name, self.long_name + '.positioned.mol')
-            Chem.MolToMolFile(self.monster.positioned_mol, pos_file, kekulize=False)
-        if self.monster.mol_options:
-            opt_file = os.path.join(self.work_path, self.long_name, self.long_name + '.mol_options.sdf')
-            writer = Chem.SDWriter(opt_file)
+            self._write_checkpoint(self.long_name + '.positioned.mol',
+                                   Chem.MolToMolBlock(self.monster.positioned_mol, kekulize=False))
+        if self.monster.mol_options and self._is_checkpointed('full'):
+            block = io.StringIO()
+            writer = Chem.SDWriter(block)
             writer.SetKekulize(False)
             for t in self.monster.mol_options:
                 writer.write(t)
             writer.close()
-        frag_file = os.path.join(self.work_path, self.long_name, self.long_name + '.monster.json')
+            self._write_checkpoint(self.long_name + '.mol_options.sdf', block.getvalue())
         data = {'smiles': self.smiles,
                 'origin': self.monster.origin_from_mol(self.monster.positioned_mol),
                 'stdev': self.monster.stdev_from_mol(self.monster.positioned_mol)}
         # if disregard:
         #     data['disregard'] = disregard
-        with open(frag_file, 'w') as w:
-            json.dump(data, w)
+        self._write_checkpoint(self.long_name + '.monster.json', json.dumps(data))
         self._log_warnings()
         # unminimised_pdbblock will be saved by igor (round trip via pose)
 
     def _checkpoint_charlie(self):
         self._log_warnings()
-        self.journal.debug(f'{self.long_name} - saving pose from igor')
-        min_file = os.path.join(self.work_path, self.long_name, self.long_name + '.holo_minimised.pdb')
-        self.igor.pose.dump_pdb(min_file)
-        self.journal.debug(f'{self.long_name} - calculating Gibbs')
-        # recover bonds
-        lig_file = os.path.join(self.work_path, self.long_name, self.long_name + '.minimised.mol')
-        Chem.MolToMolFile(self.minimised_mol, lig_file)
-        score_file = os.path.join(self.work_path, self.long_name, self.long_name + '.minimised.json')
-        with open(score_file, 'w') as w:
-            json.dump({'Energy': self.energy_score,
-                       'mRMSD': self.mrmsd.mrmsd,
-                       'RMSDs': self.mrmsd.rmsds}, w)
-        self._log_warnings()
\ No newline at end of file
+        if self._is_checkpointed('full'):
+            self.journal.debug(f'{self.long_name} - saving pose from igor')
+            self._write_checkpoint(self.long_name + '.holo_minimised.pdb', self._pose_to_pdbblock(self.igor.pose))
+        if self._is_checkpointed('summary'):
+            # recover bonds
+            self._write_checkpoint(self.long_name + '.minimised.mol', Chem.MolToMolBlock(self.minimised_mol))
+            self._write_checkpoint(self.long_name + '.minimised.json',
+                                   json.dumps({'Energy': self.energy_score,
+                                               'mRMSD': self.mrmsd.mrmsd,
+                                               'RMSDs': self.mrmsd.rmsds}))
+        # last: the compound is done once all its files are written (not if any failed).
+        index = self.get_completion_index()
+        if index is not None:
+            self.checkpoint_writer.call_if_written(os.path.join(self.work_path, self.long_name),
+                                                   index.add, self.long_name, self.smiles)
+        self._log_warnings()
+
+    # =================== Completion index =============================================================================
+
+    @classmethod
+    def get_completion_index(cls, work_path: Optional[str] = None) -> Optional[CompletionIndex]:
+        """
+        The index of the compounds completed in ``work_path`` (``completion_index_filename``),
+        which is updated by ``_checkpoint_charlie``. None if disabled.
+
+        :param work_path: default ``cls.work_path``
+        :return:
+        """
+        if not cls.completion_index_filename:
+            return None
+        path = os.path.join(work_path or cls.work_path, cls.completion_index_filename)
+        if path not in cls._completion_indices:
+            cls._completion_indices[path] = CompletionIndex(path)
+        return cls._completion_indices[path]
+
+    @classmethod
+    def is_done(cls, long_name: str, work_path: Optional[str] = None) -> bool:
+        """
+        Was the compound completed in ``work_path``? For batch runs to skip the finished compounds on restart.
+
+        :param long_name: the name given to ``place`` or ``combine`` (it is slugified)
+        :param work_path: default ``cls.work_path``
+        :return:
+        """
+        index = cls.get_completion_index(work_path)
+        return index is not None and cls.slugify(long_name) in index
\ No newline at end of file
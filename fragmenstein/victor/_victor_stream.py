@@ -0,0 +1,164 @@
+########################################################################################################################
+
+__doc__ = \
+    """
+Streaming placement of many follow-ups (e.g. 100k+ enumerated analogues) read lazily from a file.
+    """
+
+########################################################################################################################
+
+import gzip
+import os
+from typing import Any, Dict, Iterable, Iterator, List, MutableMapping, Optional, Union
+
+from rdkit import Chem
+
+from ._victor_laboratory import _VictorLaboratory
+
+
+class _VictorStream(_VictorLaboratory):  # its workers run the placements
+    stream_max_tasks_per_child = 10  # placements done by a worker of ``place_stream`` before it is replaced
+    # pyrosetta init options of the worker processes of ``place_stream``
+    stream_pyrosetta_options = '-no_optH false -mute all -ignore_unrecognized_res true -load_PDB_components false'
+
+    @classmethod
+    def read_followups(cls, filename: str) -> Iterator[Dict[str, str]]:
+        """
+        Reads lazily the follow-ups from a SDF or a SMILES file (optionally gzipped)
+        as dictionaries with the keys ``smiles`` and ``long_name`` (the arguments of ``place``).
+        A SMILES file has a SMILES and optionally a name per line (whitespace separated),
+        blank lines, ``#`` comments and a header line starting with 'smiles' are skipped.
+        The name defaults to the file stem and the entry number.
+
+        :param filename: ``.sdf``, ``.sdf.gz``, ``.smi``, ``.smi.gz`` etc.
+        :return: generator of entries
+        """
+        stem = os.path.basename(filename).split('.')[0]
+        opener = gzip.open if filename.endswith('.gz') else open
+        extension = os.path.splitext(filename[:-3] if filename.endswith('.gz') else filename)[1].lower()
+        if extension in ('.sdf', '.sd', '.mol'):
+            with opener(filename, 'rb') as fh:
+                for n, mol in enumerate(Chem.ForwardSDMolSupplier(fh)):
+                    if mol is None:
+                        cls.journal.warning(f'Entry {n} of {filename} could not be read')
+                        continue
+                    name = mol.GetProp('_Name').strip() if mol.HasProp('_Name') else ''
+                    yield {'smiles': Chem.MolToSmiles(mol), 'long_name': name or f'{stem}-{n}'}
+        else:
+            with opener(filename, 'rt') as fh:
+                for n, line in enumerate(fh):
+                    parts = line.split()
+                    if not parts or parts[0].startswith('#') or parts[0].lower() == 'smiles':
+                        continue
+                    yield {'smiles': parts[0], 'long_name': parts[1] if len(parts) > 1 else f'{stem}-{n}'}
+
+    @classmethod
+    def place_stream(cls,
+                     followups: Union[str, Iterable[Dict[str, Any]]],
+                     hits: List[Chem.Mol],
+                     pdb_filename: str,
+                     results: Optional[MutableMapping[str, dict]] = None,
+                     cores: int = 1,
+                     timeout: Optional[float] = None,
+                     settings: Optional[Dict[str, Any]] = None,
+                     skip_done: bool = False,
+                     **victor_options) -> Iterator[dict]:
+        """
+        Places the follow-ups in a pool of worker processes and yields the records (``get_record``) as they finish
+        (not in input order), storing them in ``results`` (keyed by name) if given, say a ``SqliteDict``.
+        The follow-ups are read lazily, one whenever a worker is idle,
+        so the memory used does not depend on the number of follow-ups.
+
+        >>> store = SqliteDict('placed.sqlite', encode=json.dumps, decode=json.loads, autocommit=True)
+        >>> for record in Victor.place_stream('analogues.smi', hits, 'apo.pdb', results=store, cores=20):
+
+        Each worker initialises pyrosetta once (``stream_pyrosetta_options``)
+        and is replaced after ``stream_max_tasks_per_child`` placements, if it crashes (e.g. a segfault in Rosetta
+        or the OOM killer) or if it is killed as a placement ran longer than ``timeout``,
+        as the workers of ``laboratory`` (see ``_run_laboratory_tasks``).
+        A follow-up that fails, crashes or times out gives a record with the ``error`` only.
+
+        :param followups: SDF or SMILES filename (see ``read_followups``)
+            or iterable of dictionaries of the arguments of ``place`` (``smiles``, ``long_name``, ``merging_mode`` etc.)
+        :param hits: the hits, shared by all follow-ups
+        :param pdb_filename: apo structure
+        :param results: mapping to which the records are written as they finish
+        :param cores: worker processes (1 is in this process)
+        :param timeout: max wall-clock seconds per follow-up (None is no limit; not applied if ``cores`` is 1)
+        :param settings: class attributes to set in the workers (e.g. ``work_path``)
+        :param skip_done: skip the follow-ups completed in ``work_path`` (see ``is_done``), say on restart
+        :param victor_options: the other arguments of the constructor (e.g. ``ligand_resn``)
+        :return: generator of records (``get_record``)
+        """
+        if isinstance(followups, str):
+            followups = cls.read_followups(followups)
+        entries = cls._name_entries(followups)
+        if skip_done:
+            work_path = (settings or {}).get('work_path', cls.work_path)
+            entries = (entry for entry in entries if not cls.is_done(entry['long_name'], work_path))
+        hit_binaries = [hit.ToBinary(Chem.PropertyPickleOptions.AllProps) for hit in hits]
+        initargs = (cls, hit_binaries, pdb_filename, victor_options, settings or {}, cls.stream_pyrosetta_options)
+        if cores <= 1:
+            _initialize_stream_worker(*initargs)
+            for entry in entries:
+                record = _place_stream_entry(entry)
+                if results is not None:
+                    results[record['name']] = record
+                yield record
+            return
+        # the entries of ``laboratory``: all the arguments of the constructor and of ``place``.
+        shared = {**victor_options, 'pdb_filename': pdb_filename, 'hits': hit_binaries}
+        tasks = enumerate({**shared, **entry} for entry in entries)
+        for _, record in cls._run_laboratory_tasks(tasks, cores, timeout, settings or {},
+                                                   cls.stream_pyrosetta_options, cls.stream_max_tasks_per_child):
+            if results is not None:
+                results[record['name']] = record
+            yield record
+
+    @classmethod
+    def _name_entries(cls, followups: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        # names are used for the folders, so the default of ``place`` ('ligand') would clash.
+        for n, entry in enumerate(followups):
+            if 'long_name' not in entry:
+                entry = {**entry, 'long_name': f'followup{n}'}
+            yield entry
+
+    @classmethod
+    def _get_error_record(cls, entry: Dict[str, Any], error: Exception) -> dict:
+        return {'name': entry['long_name'],
+                'smiles': entry.get('smiles'),
+                'error': f'{error.__class__.__name__}: {error}'}
+
+
+# ======================================================================================================================
+# The worker side of ``place_stream``: the Victor class and the shared inputs are sent once per worker process.
+
+_stream_worker = {}
+
+
+def _initialize_stream_worker(cls, hit_binaries, pdb_filename, victor_options, settings, pyrosetta_options):
+    import pyrosetta
+    import pyrosetta.distributed
+    pyrosetta.distributed.maybe_init(extra_options=pyrosetta_options)
+    for key, value in settings.items():
+        setattr(cls, key, value)
+    _stream_worker.update(cls=cls,
+                          hits=[Chem.Mol(binary) for binary in hit_binaries],
+                          pdb_filename=pdb_filename,
+                          victor_options=victor_options)
+
+
+def _place_stream_entry(entry: Dict[str, Any]) -> dict:
+    cls = _stream_worker['cls']
+    try:
+        victor = cls(hits=[Chem.Mol(hit) for hit in _stream_worker['hits']],
+                     pdb_filename=_stream_worker['pdb_filename'],
+                     **_stream_worker['victor_options'])
+        victor.place(**entry)
+        return victor.get_record()
+    except Exception as error:
+        cls.journal.error(f"{entry['long_name']} — {error.__class__.__name__}: {error}")
+        return cls._get_error_record(entry, error)
+    finally:
+        # the files are written by the time the record is returned.
+        cls.flush_checkpoints()
@@ -75,7 +75,9 @@ class _VictorUtils(_VictorCommon):
                     'N_unconstrained_atoms': N_unconstrained_atoms,
                     'runtime': self.tock - self.tick,
                     'regarded': self.monster.matched,
-                    'disregarded': self.monster.unmatched
+                    'disregarded': self.monster.unmatched,
+                    'MCS_exhausted': self.monster.mcs_exhausted if self.monster is not None else False,
+                    'reanimation': self.reanimation_trace
                     }
         else:
             return {'name': self.long_name,
@@ -91,10 +93,27 @@ class _VictorUtils(_VictorCommon):
                     'N_unconstrained_atoms': self.unconstrained_heavy_atoms,
                     'runtime': self.tock - self.tick,
                     'regarded': self.monster.matched,
-                    'disregarded': self.monster.unmatched
+                    'disregarded': self.monster.unmatched,
+                    'MCS_exhausted': self.monster.mcs_exhausted if self.monster is not None else False,
+                    'reanimation': self.reanimation_trace
                     }
 
+    def get_record(self) -> dict:
+        """
+        The record of ``summarise`` with, if the class attributes ``record_mols`` and ``record_pdbblock`` are True,
+        the minimised and positioned mols (as binaries with their properties) and the minimised holo PDB block.
+        This is what the batch runners (``place_stream``, ``laboratory``) return, e.g. to a ``SqliteResultStore``.
 
+        :return: record
+        """
+        record = self.summarise()
+        if self.record_mols:
+            positioned_mol = self.monster.positioned_mol if self.monster is not None else None
+            for key, mol in (('minimised_mol', self.minimised_mol), ('positioned_mol', positioned_mol)):
+                record[key] = mol.ToBinary(Chem.PropertyPickleOptions.AllProps) if mol is not None else None
+        if self.record_pdbblock:
+            record['holo_pdbblock'] = self.minimised_pdbblock
+        return record
 
     # =================== Other ========================================================================================
 
@@ -455,6 +474,7 @@ class _VictorUtils(_VictorCommon):
         :return:
         """
         cls.journal.warning('`from_files`: You really should not use this.')
+        cls.flush_checkpoints()
         if os.path.exists(folder):
             pass # folder is fine
         elif not os.path.exists(folder) and os.path.exists(os.path.join(cls.work_path, folder)):
@@ -519,6 +539,7 @@ class _VictorUtils(_VictorCommon):
         self._warned = []
         minjson = os.path.join(folder, f'{self.long_name}.minimised.json')
         self.mrmsd = mRSMD.mock()
+        self.reanimation_trace = []
         if os.path.exists(minjson):
             md = json.load(open(minjson))
             self.energy_score = md["Energy"]
@@ -539,10 +560,3 @@ class _VictorUtils(_VictorCommon):
         else:
             self.minimised_mol = None
         return self
-
-    # =================== Laboratory ===================================================================================
-
-    @classmethod
-    def laboratory(cls, entries: List[dict], cores: int = 1):
-        raise NotImplementedError('Not yet written.')
-        pass
@@ -0,0 +1,119 @@
+########################################################################################################################
+
+__doc__ = \
+    """
+The checkpoint writer (not inherited): writes the checkpoint files of Victor in a background thread.
+    """
+
+########################################################################################################################
+
+import atexit
+import logging
+import os
+import queue
+import threading
+from typing import Callable, List, Set, Union
+
+
+class CheckpointWriter:
+    """
+    Writes files (and runs calls) queued by Victor in order in a background thread,
+    so the file I/O of the checkpoints is not on the critical path of a placement.
+    The content is serialised (str or bytes) before it is queued, so the thread touches no Victor objects.
+
+    >>> writer = CheckpointWriter()
+    >>> writer.write('output/ligand/ligand.minimised.json', json.dumps(data))
+    >>> writer.flush()  # blocks until all is written
+
+    The queue is flushed at exit (``atexit``) and a forked process starts its own thread and queue.
+    Errors in the thread are logged and kept in ``errors``, the files that could not be written in ``failed``
+    (a later successful write of the file removes it) and ``call_if_written`` skips a call
+    if a file in a given folder failed, say the completion record of a compound.
+
+    :ivar asynchronous: False writes straight away (in the calling thread)
+    """
+    journal = logging.getLogger('Fragmenstein')
+
+    def __init__(self, asynchronous: bool = True, max_queued: int = 1000):
+        """
+        :param asynchronous: write in a background thread
+        :param max_queued: tasks queued before ``write`` blocks (backpressure if the disk is slower)
+        """
+        self.asynchronous = asynchronous
+        self.max_queued = max_queued
+        self.errors: List[str] = []
+        self.failed: Set[str] = set()
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        atexit.register(self.flush)
+
+    def write(self, filename: str, content: Union[str, bytes]) -> None:
+        """
+        Write ``content`` to ``filename`` (overwriting it), once the previous tasks are done.
+        """
+        self.call(self._write, filename, content)
+
+    def call(self, fun: Callable, *args) -> None:
+        """
+        Call ``fun(*args)`` once the previous tasks are done, e.g. to record that all files of a compound are written.
+        """
+        if not self.asynchronous:
+            fun(*args)
+            return
+        if self._pid != os.getpid() or not self._thread.is_alive():
+            self._start()
+        self._queue.put((fun, args))
+
+    def call_if_written(self, folder: str, fun: Callable, *args) -> None:
+        """
+        Like ``call``, but ``fun(*args)`` is skipped (and logged as an error) if any file in ``folder`` failed.
+        """
+        self.call(self._call_if_written, folder, fun, *args)
+
+    def flush(self) -> None:
+        """
+        Block until all the queued tasks are done.
+        """
+        if self._queue is not None and self._pid == os.getpid() and self._thread.is_alive():
+            self._queue.join()
+
+    # ==== private =====================================================================================================
+
+    def _start(self) -> None:
+        self._queue = queue.Queue(self.max_queued)
+        self._thread = threading.Thread(target=self._work, name='CheckpointWriter', daemon=True)
+        self._pid = os.getpid()
+        self._thread.start()
+
+    def _work(self) -> None:
+        while True:
+            fun, args = self._queue.get()
+            try:
+                self._run(fun, *args)
+            finally:
+                self._queue.task_done()
+
+    def _run(self, fun: Callable, *args) -> None:
+        try:
+            fun(*args)
+        except Exception as error:
+            message = f'{error.__class__.__name__}: {error}'
+            self.errors.append(message)
+            self.journal.error(f'Checkpoint not written — {message}')
+
+    def _write(self, filename: str, content: Union[str, bytes]) -> None:
+        try:
+            with open(filename, 'wb' if isinstance(content, bytes) else 'w') as fh:
+                fh.write(content)
+        except Exception:
+            self.failed.add(os.path.normpath(filename))
+            raise
+        self.failed.discard(os.path.normpath(filename))
+
+    def _call_if_written(self, folder: str, fun: Callable, *args) -> None:
+        failed = sorted(filename for filename in self.failed
+                        if os.path.dirname(filename) == os.path.normpath(folder))
+        if failed:
+            raise IOError(f'{getattr(fun, "__name__", fun)} skipped as not written: {failed}')
+        fun(*args)
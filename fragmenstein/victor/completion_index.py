@@ -0,0 +1,80 @@
+########################################################################################################################
+
+__doc__ = \
+    """
+The completion index (not inherited) of a ``work_path``: which compounds are done, in a single SQLite table.
+    """
+
+########################################################################################################################
+
+import os
+import sqlite3
+import time
+from typing import List, Optional
+
+
+class CompletionIndex:
+    """
+    The names of the compounds whose placement or combination was completed, stored in a SQLite file,
+    which is updated in a single transaction at the last checkpoint of each compound (``_checkpoint_charlie``).
+    A batch that is restarted (e.g. after a preemption) checks it to skip the finished compounds
+    without listing the folders of ``work_path`` or parsing their files.
+
+    >>> index = CompletionIndex('output/completed.sqlite')
+    >>> 'x0305-x1249' in index
+
+    The connection is opened lazily in each process, so a forked worker does not share that of its parent,
+    and several processes can write to it concurrently (WAL journal).
+    """
+
+    def __init__(self, path: str, timeout: float = 60.):
+        """
+        :param path: SQLite filename
+        :param timeout: seconds to wait for the lock of another process
+        """
+        self.path = path
+        self.timeout = timeout
+        self._connection = None
+        self._pid = None
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self._connection is None or self._pid != os.getpid():
+            folder = os.path.dirname(self.path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            # also used by the thread of the checkpoint writer.
+            self._connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None,
+                                               check_same_thread=False)
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute('CREATE TABLE IF NOT EXISTS completed '
+                                     '(name TEXT PRIMARY KEY, smiles TEXT, error TEXT, time REAL)')
+            self._pid = os.getpid()
+        return self._connection
+
+    def __contains__(self, name: str) -> bool:
+        return self.connection.execute('SELECT 1 FROM completed WHERE name = ?', (name,)).fetchone() is not None
+
+    def __len__(self) -> int:
+        return self.connection.execute('SELECT COUNT(*) FROM completed').fetchone()[0]
+
+    def add(self, name: str, smiles: Optional[str] = None, error: str = '') -> None:
+        """
+        Record the compound as done (a single statement is a transaction, so it is atomic).
+        """
+        self.connection.execute('INSERT OR REPLACE INTO completed VALUES (?, ?, ?, ?)',
+                                (name, smiles, error, time.time()))
+
+    def discard(self, name: str) -> None:
+        """
+        Forget the compound, so it is redone.
+        """
+        self.connection.execute('DELETE FROM completed WHERE name = ?', (name,))
+
+    def get_names(self) -> List[str]:
+        return [row[0] for row in self.connection.execute('SELECT name FROM completed')]
+
+    def close(self) -> None:
+        if self._connection is not None and self._pid == os.getpid():
+            self._connection.close()
+        self._connection = None
@@ -0,0 +1,109 @@
+########################################################################################################################
+
+__doc__ = \
+    """
+The reanimation scheduler (not inherited): the schedule of minimisation rounds of ``Victor.reanimate``.
+    """
+
+########################################################################################################################
+
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+
+class ReanimationScheduler:
+    """
+    Runs the minimisation rounds of ``Victor.reanimate``:
+    after the warm-up rounds (by default, 15 cycles unconstrained and 5 at a coordinate constraint of 2),
+    a round minimises the pose at a coordinate constraint and scores it, until the ∆∆G is negative or zero.
+    NB. Igor restrains the atoms to their positions at the start of each round (``_get_scorefxn``),
+    so a higher constraint cannot bring a relaxed pose back towards the hits: the first round that passes is kept.
+
+    * The constraint is halved after each round that fails (∆∆G > 0), and dropped below ``min_constraint``.
+    * If halving the constraint improved the ∆∆G by less than ``energy_tolerance`` (kcal/mol),
+      the rounds have converged and the schedule stops (status 'converged').
+    * ``max_rounds`` and ``max_time`` (seconds) bound the rounds of a compound.
+
+    The trace of the rounds (``trace``) is a list of dictionaries (round, constraint, ∆∆G, time),
+    which ``Victor`` keeps in ``reanimation_trace`` and in the summary.
+    A different schedule is plugged in as a subclass (say overriding ``get_next_constraint``)
+    assigned to ``Victor.reanimation_scheduler``.
+
+    >>> Victor.reanimation_scheduler = ReanimationScheduler(max_rounds=4, max_time=300)
+    """
+
+    def __init__(self,
+                 initial_constraint: float = 1.,
+                 min_constraint: float = 0.005,
+                 energy_tolerance: Optional[float] = 0.1,
+                 max_rounds: int = 10,
+                 max_time: Optional[float] = None,
+                 cycles: int = 15,
+                 warmup: Sequence[Tuple[float, int]] = ((0., 15), (2., 5))):
+        """
+        :param initial_constraint: coordinate constraint of the first round
+        :param min_constraint: below this the constraint is dropped (zero)
+        :param energy_tolerance: ∆∆G improvement (kcal/mol) below which the rounds have converged (None: never)
+        :param max_rounds: maximum number of scored rounds
+        :param max_time: maximum seconds of a reanimation (checked after each round)
+        :param cycles: FastRelax cycles of a round
+        :param warmup: constraint and cycles of the rounds before the scored ones (not scored)
+        """
+        self.initial_constraint = initial_constraint
+        self.min_constraint = min_constraint
+        self.energy_tolerance = energy_tolerance
+        self.max_rounds = max_rounds
+        self.max_time = max_time
+        self.cycles = cycles
+        self.warmup = warmup
+
+    def run(self, igor, get_ddG: Callable[[], float]) -> Tuple[float, List[Dict[str, Any]]]:
+        """
+        Minimises the pose of ``igor`` (in place) following the schedule.
+
+        :param igor: the Igor instance of the compound
+        :param get_ddG: scores the current pose (∆∆G in kcal/mol)
+        :return: ∆∆G of the final pose and the trace of the rounds, the last of which has the ``status``
+        """
+        tick = time.time()
+        for constraint, cycles in self.warmup:
+            igor.coordinate_constraint = constraint
+            igor.minimise(cycles=cycles, default_coord_constraint=False)
+        trace = []
+        constraint = self.initial_constraint
+        while True:
+            igor.coordinate_constraint = constraint
+            igor.minimise(cycles=self.cycles, default_coord_constraint=False)
+            ddG = get_ddG()
+            trace.append({'round': len(trace), 'constraint': constraint, '∆∆G': ddG, 'time': time.time() - tick})
+            status = self.get_status(trace)
+            if status is not None:
+                trace[-1]['status'] = status
+                return ddG, trace
+            constraint = self.get_next_constraint(trace)
+
+    def get_status(self, trace: List[Dict[str, Any]]) -> Optional[str]:
+        """
+        Why the schedule stops after the last round of ``trace`` or None if it goes on.
+        """
+        last = trace[-1]
+        if last['∆∆G'] <= 0:
+            return 'passed'
+        elif last['constraint'] == 0.:
+            return 'unconstrained'
+        elif self.energy_tolerance is not None and len(trace) > 1 \
+                and trace[-2]['∆∆G'] - trace[-1]['∆∆G'] < self.energy_tolerance:
+            return 'converged'
+        elif len(trace) >= self.max_rounds:
+            return 'max_rounds'
+        elif self.max_time is not None and last['time'] >= self.max_time:
+            return 'max_time'
+        else:
+            return None
+
+    def get_next_constraint(self, trace: List[Dict[str, Any]]) -> float:
+        """
+        The constraint of the next round after a failed one: halved (or dropped below ``min_constraint``).
+        """
+        constraint = trace[-1]['constraint'] / 2
+        return constraint if constraint >= self.min_constraint else 0.
@@ -0,0 +1,294 @@
+########################################################################################################################
+
+__doc__ = \
+    """
+Result stores (not inherited): the records of a batch in a single file with typed columns,
+as opposed to a ``SqliteDict`` of JSON values and the mol files in the folder of each compound.
+    """
+
+########################################################################################################################
+
+import json
+import os
+import sqlite3
+import zlib
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, Iterator, List
+
+from rdkit import Chem
+
+
+class ResultStore(ABC):
+    """
+    Base class of the result stores, which are written to like the ``results`` mapping of ``place_stream``
+    and ``laboratory`` (``store[name] = record``) or in batches (``put_many``)
+    and read as a table (``get_table``) without opening the folder of each compound.
+
+    The columns are typed: the fields of ``summarise`` are stored as such (lists as JSON),
+    the mols (``minimised_mol``, ``positioned_mol``, see ``Victor.get_record``) as RDKit binaries
+    and the holo PDB block (``holo_pdbblock``) compressed. Other keys go in the JSON column ``extra``.
+
+    :cvar columns: column name to type (TEXT, REAL, INTEGER, JSON, MOL or PDB)
+    """
+    columns = {'name': 'TEXT',
+               'smiles': 'TEXT',
+               'error': 'TEXT',
+               'mode': 'TEXT',
+               '∆∆G': 'REAL',
+               '∆G_bound': 'REAL',
+               '∆G_unbound': 'REAL',
+               'comRMSD': 'REAL',
+               'N_constrained_atoms': 'REAL',
+               'N_unconstrained_atoms': 'REAL',
+               'runtime': 'REAL',
+               'regarded': 'JSON',
+               'disregarded': 'JSON',
+               'MCS_exhausted': 'INTEGER',
+               'reanimation': 'JSON',
+               'extra': 'JSON',
+               'minimised_mol': 'MOL',
+               'positioned_mol': 'MOL',
+               'holo_pdbblock': 'PDB'}
+
+    # ==== mapping-like interface ======================================================================================
+
+    def __setitem__(self, name: str, record: Dict[str, Any]) -> None:
+        self.put_many([{**record, 'name': name}])
+
+    def put(self, record: Dict[str, Any]) -> None:
+        self.put_many([record])
+
+    @abstractmethod
+    def put_many(self, records: Iterable[Dict[str, Any]]) -> None:
+        pass
+
+    @abstractmethod
+    def get_table(self, mols: bool = True, pdbblocks: bool = False):
+        """
+        The records as a pandas DataFrame with the mols as Chem.Mol (if ``mols``)
+        and the holo PDB blocks as str (if ``pdbblocks``).
+        """
+        pass
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    # ==== encoding ====================================================================================================
+
+    @classmethod
+    def encode(cls, record: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        A record as a row of the typed columns.
+        """
+        row = {}
+        extra = {}
+        for key, value in record.items():
+            kind = cls.columns.get(key)
+            if kind is None:
+                extra[key] = value
+            elif value is None:
+                row[key] = None
+            elif kind == 'JSON':
+                row[key] = json.dumps(value)
+            elif kind == 'MOL':
+                row[key] = value.ToBinary(Chem.PropertyPickleOptions.AllProps) \
+                    if isinstance(value, Chem.Mol) else bytes(value)
+            elif kind == 'PDB':
+                row[key] = zlib.compress(value.encode())
+            elif kind == 'INTEGER':
+                row[key] = int(value)
+            elif kind == 'REAL':
+                row[key] = float(value)
+            else:
+                row[key] = str(value)
+        if extra:
+            row['extra'] = json.dumps(extra, default=str)
+        return row
+
+    @classmethod
+    def decode(cls, row: Dict[str, Any], mols: bool = True, pdbblocks: bool = True) -> Dict[str, Any]:
+        """
+        A row as a record (the opposite of ``encode``).
+        """
+        record = {}
+        for key, value in row.items():
+            kind = cls.columns.get(key)
+            if kind == 'MOL' and not mols or kind == 'PDB' and not pdbblocks:
+                continue
+            elif value is None:
+                record[key] = None
+            elif key == 'extra':
+                record.update(json.loads(value))
+            elif kind == 'JSON':
+                record[key] = json.loads(value)
+            elif kind == 'MOL':
+                record[key] = Chem.Mol(value)
+            elif kind == 'PDB':
+                record[key] = zlib.decompress(value).decode()
+            elif kind == 'INTEGER':
+                record[key] = bool(value) if key == 'MCS_exhausted' else value
+            else:
+                record[key] = value
+        return record
+
+
+class SqliteResultStore(ResultStore):
+    """
+    Result store in a SQLite table (one row per compound, replaced if written again).
+
+    >>> store = SqliteResultStore('results.sqlite')
+    >>> for record in Victor.place_stream('analogues.smi', hits, 'apo.pdb', results=store, cores=20):
+    >>> table = store.get_table()
+    """
+    sql_types = {'TEXT': 'TEXT', 'REAL': 'REAL', 'INTEGER': 'INTEGER', 'JSON': 'TEXT', 'MOL': 'BLOB', 'PDB': 'BLOB'}
+
+    def __init__(self, path: str, table: str = 'results', timeout: float = 60.):
+        """
+        :param path: SQLite filename
+        :param table: table name
+        :param timeout: seconds to wait for the lock of another process
+        """
+        self.path = path
+        self.table = table
+        self.connection = sqlite3.connect(path, timeout=timeout)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        definitions = ', '.join(f'"{column}" {self.sql_types[kind]}' + (' PRIMARY KEY' if column == 'name' else '')
+                                for column, kind in self.columns.items())
+        self.connection.execute(f'CREATE TABLE IF NOT EXISTS "{table}" ({definitions})')
+        self.connection.commit()
+
+    def put_many(self, records: Iterable[Dict[str, Any]]) -> None:
+        """
+        Writes the records in a single transaction.
+        """
+        columns = list(self.columns)
+        names = ', '.join(f'"{column}"' for column in columns)
+        marks = ', '.join('?' * len(columns))
+        rows = [self.encode(record) for record in records]
+        with self.connection:
+            self.connection.executemany(f'INSERT OR REPLACE INTO "{self.table}" ({names}) VALUES ({marks})',
+                                        [tuple(row.get(column) for column in columns) for row in rows])
+
+    def __getitem__(self, name: str) -> Dict[str, Any]:
+        cursor = self.connection.execute(f'SELECT * FROM "{self.table}" WHERE name = ?', (name,))
+        values = cursor.fetchone()
+        if values is None:
+            raise KeyError(name)
+        return self.decode(dict(zip([column[0] for column in cursor.description], values)))
+
+    def __delitem__(self, name: str) -> None:
+        with self.connection:
+            self.connection.execute(f'DELETE FROM "{self.table}" WHERE name = ?', (name,))
+
+    def __contains__(self, name: str) -> bool:
+        return self.connection.execute(f'SELECT 1 FROM "{self.table}" WHERE name = ?', (name,)).fetchone() is not None
+
+    def __len__(self) -> int:
+        return self.connection.execute(f'SELECT COUNT(*) FROM "{self.table}"').fetchone()[0]
+
+    def __iter__(self) -> Iterator[str]:
+        return (row[0] for row in self.connection.execute(f'SELECT name FROM "{self.table}"'))
+
+    def get_table(self, mols: bool = True, pdbblocks: bool = False):
+        import pandas as pd
+        columns = [column for column, kind in self.columns.items()
+                   if (mols or kind != 'MOL') and (pdbblocks or kind != 'PDB')]
+        names = ', '.join(f'"{column}"' for column in columns)
+        table = pd.read_sql_query(f'SELECT {names} FROM "{self.table}"', self.connection)
+        return _decode_table(self, table)
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+class ParquetResultStore(ResultStore):
+    """
+    Result store in a folder of Parquet files (requires pyarrow), written in batches of ``batch_size`` records,
+    as Parquet files cannot be appended to. Read it with ``get_table`` or ``pd.read_parquet(folder)``.
+    A compound written again is in the table once (the last record).
+    Remember to ``close`` (or use as a context manager) to write the last batch.
+
+    >>> with ParquetResultStore('results') as store:
+    >>>     Victor.laboratory(entries, results=store, cores=20)
+    """
+
+    def __init__(self, folder: str, batch_size: int = 1000):
+        """
+        :param folder: folder of the parts
+        :param batch_size: records per Parquet file
+        """
+        self.folder = folder
+        self.batch_size = batch_size
+        self.buffer: List[Dict[str, Any]] = []
+        os.makedirs(folder, exist_ok=True)
+        self.parts = len([filename for filename in os.listdir(folder) if filename.endswith('.parquet')])
+
+    def put_many(self, records: Iterable[Dict[str, Any]]) -> None:
+        self.buffer.extend(self.encode(record) for record in records)
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self.buffer:
+            return
+        import pandas as pd
+        table = pd.DataFrame(self.buffer, columns=list(self.columns))
+        # written aside and renamed, so a reader never sees a partial file.
+        filename = os.path.join(self.folder, f'part-{self.parts:05d}-{os.getpid()}.parquet')
+        table.to_parquet(filename + '.partial', index=False)
+        os.replace(filename + '.partial', filename)
+        self.parts += 1
+        self.buffer = []
+
+    def __len__(self) -> int:
+        return len(self.get_table(mols=False))
+
+    def __contains__(self, name: str) -> bool:
+        return name in set(self.get_table(mols=False)['name'])
+
+    def get_table(self, mols: bool = True, pdbblocks: bool = False):
+        import pandas as pd
+        columns = [column for column, kind in self.columns.items()
+                   if (mols or kind != 'MOL') and (pdbblocks or kind != 'PDB')]
+        filenames = sorted(os.path.join(self.folder, filename) for filename in os.listdir(self.folder)
+                           if filename.endswith('.parquet'))
+        parts = [pd.read_parquet(filename, columns=columns) for filename in filenames]
+        if self.buffer:
+            parts.append(pd.DataFrame(self.buffer, columns=list(self.columns))[columns])
+        if not parts:
+            return pd.DataFrame(columns=columns)
+        table = pd.concat(parts, ignore_index=True).drop_duplicates('name', keep='last').reset_index(drop=True)
+        return _decode_table(self, table)
+
+
+def _decode_table(store: ResultStore, table):
+    """
+    Decodes the typed columns of a table read from a store (cf. ``ResultStore.decode``).
+    """
+    # an empty value may be read as None or nan (a column without values is float).
+    for column in list(table.columns):
+        kind = store.columns[column]
+        values = table[column]
+        if kind == 'JSON' and column != 'extra':
+            table[column] = [json.loads(value) if isinstance(value, str) else None for value in values]
+        elif kind == 'MOL':
+            table[column] = [Chem.Mol(value) if isinstance(value, bytes) else None for value in values]
+        elif kind == 'PDB':
+            table[column] = [zlib.decompress(value).decode() if isinstance(value, bytes) else None for value in values]
+        elif column == 'MCS_exhausted':
+            table[column] = table[column].astype('boolean')
+    if 'extra' in table.columns:
+        extras = [json.loads(value) if isinstance(value, str) else {} for value in table['extra']]
+        for key in sorted({key for extra in extras for key in extra}):
+            table[key] = [extra.get(key) for extra in extras]
+        table = table.drop(columns='extra')
+    return table
@@ -26,7 +26,7 @@ setup(
     name='Fragmenstein',
     version='0.6.6',
     packages=find_packages(),
-    install_requires=['numpy', 'rdkit-to-params', 'molecular-rectifier'],
+    install_requires=['numpy', 'scipy', 'rdkit-to-params', 'molecular-rectifier'],
     extras_require={'jupyter': ['jupyter']},
     url='https://github.com/matteoferla/Fragmenstein',
     license='MIT',
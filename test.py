@@ -1,4 +1,4 @@
-import unittest, os
+import unittest, os, json
 # ======================================================================================================================
 import pyrosetta
 
@@ -103,6 +103,141 @@ class MProPlaceTester(unittest.TestCase):
         # self.assertIn('x0995', victor.monster.unmatched) # red herring
 
 
+    def test_read_followups(self):
+        import tempfile
+        with tempfile.TemporaryDirectory() as folder:
+            smi_file = os.path.join(folder, 'analogues.smi')
+            with open(smi_file, 'w') as w:
+                w.write('smiles name\nCCO ethanol\n\nc1ccccc1\n')
+            entries = list(Victor.read_followups(smi_file))
+            self.assertEqual(entries, [{'smiles': 'CCO', 'long_name': 'ethanol'},
+                                       {'smiles': 'c1ccccc1', 'long_name': 'analogues-3'}])
+            sdf_file = os.path.join(folder, 'analogues.sdf')
+            writer = Chem.SDWriter(sdf_file)
+            for smiles in ('CCO', 'CCN'):
+                mol = Chem.MolFromSmiles(smiles)
+                mol.SetProp('_Name', smiles.lower())
+                writer.write(mol)
+            writer.close()
+            self.assertEqual([entry['long_name'] for entry in Victor.read_followups(sdf_file)], ['cco', 'ccn'])
+            # the extension decides, not a substring of the path
+            csv_file = os.path.join(folder, 'mols.csv')
+            with open(csv_file, 'w') as w:
+                w.write('CCO ethanol\n')
+            self.assertEqual(list(Victor.read_followups(csv_file)), [{'smiles': 'CCO', 'long_name': 'ethanol'}])
+
+    def test_params_cache(self):
+        from rdkit_to_params import Params
+        params = Params.from_smiles('*CC(=O)Nc1ccccc1', name='LIG')
+        cached = Victor._unpickle_params(Victor._pickle_params(params))
+        self.assertEqual(params.dumps(), cached.dumps())
+        self.assertEqual(Chem.MolToSmiles(params.mol), Chem.MolToSmiles(cached.mol))
+
+    def test_completion_index(self):
+        import tempfile
+        from fragmenstein.victor.completion_index import CompletionIndex
+        with tempfile.TemporaryDirectory() as folder:
+            index = CompletionIndex(os.path.join(folder, 'completed.sqlite'))
+            index.add('BEN-VAN-c98-4', 'CCO')
+            self.assertIn('BEN-VAN-c98-4', index)
+            self.assertNotIn('TRY-UNI-714a760b-6', index)
+            self.assertTrue(Victor.is_done('BEN VAN c98 4', work_path=folder))  # slugified
+            index.discard('BEN-VAN-c98-4')
+            self.assertEqual(len(index), 0)
+            index.close()
+
+    def test_result_store(self):
+        import tempfile
+        from fragmenstein.victor import SqliteResultStore
+        hit = MProVictor.get_mol('x0305')
+        record = {'name': 'x0305-copy', 'smiles': Chem.MolToSmiles(hit), 'error': '', '∆∆G': -5.,
+                  'regarded': ['x0305'], 'MCS_exhausted': False, 'minimised_mol': hit, 'note': 'extra'}
+        with tempfile.TemporaryDirectory() as folder:
+            with SqliteResultStore(os.path.join(folder, 'results.sqlite')) as store:
+                store.put_many([record, {'name': 'failed', 'error': 'ValueError: no'}])
+                self.assertEqual(len(store), 2)
+                self.assertEqual(store['x0305-copy']['regarded'], ['x0305'])
+                self.assertEqual(store['x0305-copy']['note'], 'extra')
+                table = store.get_table().set_index('name')
+                self.assertEqual(table.loc['x0305-copy', 'minimised_mol'].GetProp('_Name'), 'x0305')
+                self.assertIsNone(table.loc['failed', 'minimised_mol'])
+
+    def test_checkpoint_writer(self):
+        import tempfile
+        from fragmenstein.victor import CheckpointWriter
+        writer = CheckpointWriter()
+        with tempfile.TemporaryDirectory() as folder:
+            filenames = [os.path.join(folder, f'{i}.json') for i in range(100)]
+            for i, filename in enumerate(filenames):
+                writer.write(filename, json.dumps({'i': i}))
+            writer.write(os.path.join(folder, 'missing', 'x.json'), '{}')  # logged, not raised
+            done = []
+            writer.call_if_written(folder, done.append, 'written')
+            writer.call_if_written(os.path.join(folder, 'missing'), done.append, 'not written')
+            writer.flush()
+            self.assertTrue(all(map(os.path.exists, filenames)))
+            self.assertEqual(done, ['written'])
+            self.assertEqual(len(writer.errors), 2)
+            self.assertEqual(writer.failed, {os.path.join(folder, 'missing', 'x.json')})
+
+    def test_reanimation_scheduler(self):
+        from fragmenstein.victor import ReanimationScheduler
+
+        class MockIgor:  # the ∆∆G depends only on the constraint: passes below 0.6
+            coordinate_constraint = 0.
+
+            def minimise(self, cycles, default_coord_constraint):
+                pass
+
+        igor = MockIgor()
+        ddG, trace = ReanimationScheduler().run(igor, lambda: igor.coordinate_constraint - 0.6)
+        self.assertLessEqual(ddG, 0)
+        self.assertEqual([step['constraint'] for step in trace], [1., 0.5])  # stops at the first pass
+        self.assertEqual(trace[-1]['status'], 'passed')
+        # no improvement on halving: converged
+        ddG, trace = ReanimationScheduler().run(igor, lambda: 10.)
+        self.assertEqual([step['constraint'] for step in trace], [1., 0.5])
+        self.assertEqual(trace[-1]['status'], 'converged')
+        # without a tolerance it goes on down to unconstrained
+        ddG, trace = ReanimationScheduler(energy_tolerance=None, min_constraint=0.2).run(igor, lambda: 10.)
+        self.assertEqual([step['constraint'] for step in trace], [1., 0.5, 0.25, 0.])
+        self.assertEqual(trace[-1]['status'], 'unconstrained')
+
+    def test_score_interaction(self):
+        MProVictor.quick_renanimation = True
+        victor = MProVictor.from_hit_codes(hit_codes=['x0107', 'x0434'])
+        victor.place(smiles='Cc1ccncc1NC(=O)Cc1cccc(Cl)c1', long_name='interaction-scored')
+        self.assertEqual(victor.error_msg, '', victor.error_msg)
+        interaction = victor.igor.score_interaction()
+        split = victor.igor.score_split()  # verification
+        self.assertAlmostEqual(interaction['total_score'], split['xyz_∆∆G'], delta=1.)
+
+    def test_per_atom_scores(self):
+        MProVictor.quick_renanimation = True
+        victor = MProVictor.from_hit_codes(hit_codes=['x0107', 'x0434'])
+        victor.place(smiles='Cc1ccncc1NC(=O)Cc1cccc(Cl)c1', long_name='per-atom-scored')
+        self.assertEqual(victor.error_msg, '', victor.error_msg)
+        scores = victor.igor.per_atom_scores()
+        wider = victor.igor.per_atom_scores(cutoff=10.)  # the pairs beyond the range of the terms add nothing
+        for name in scores:
+            for score_type in scores[name]:
+                self.assertAlmostEqual(scores[name][score_type], wider[name][score_type], places=5)
+
+    def test_laboratory(self):
+        MProVictor.quick_renanimation = True
+        hits = [MProVictor.get_mol('x0107'), MProVictor.get_mol('x0434')]
+        entries = [dict(hits=hits, smiles='Cc1ccncc1NC(=O)Cc1cccc(Cl)c1', long_name='lab-placed'),
+                   dict(hits=hits, smiles='not a smiles', long_name='lab-failed')]
+        records = MProVictor.laboratory(entries, cores=2, timeout=600)
+        self.assertEqual([record['name'] for record in records], ['lab-placed', 'lab-failed'])
+        self.assertEqual(records[0]['error'], '', records[0]['error'])
+        self.assertNotEqual(records[1]['error'], '')
+        # a failed combination is named after its hits, as in ``combine``
+        record = MProVictor._get_laboratory_error_record(MProVictor._pack_laboratory_entry({'hits': hits}),
+                                                         ValueError('failed'))
+        self.assertEqual(record['name'], 'x0107-x0434')
+
+
 # ======================================================================================================================
 
 class VictorCombineTests(unittest.TestCase):
@@ -275,6 +410,255 @@ class Internals(unittest.TestCase):
             self.fail('should have raised a connection error')
         except ConnectionError as error:
             pass
+
+    def test_positional_mapping(self):
+        from rdkit.Geometry import Point3D
+        # a straight chain (1.5 Å apart along y) so the distances are known
+        conjoined = Chem.MolFromSmiles('*CCCO*')
+        conformer = Chem.Conformer(conjoined.GetNumAtoms())
+        for i in range(conjoined.GetNumAtoms()):
+            conformer.SetAtomPosition(i, Point3D(0., 1.5 * i, 0.))
+        conjoined.AddConformer(conformer)
+        self.assertEqual(['*', 'C', 'C', 'C', 'O', '*'], [atom.GetSymbol() for atom in conjoined.GetAtoms()])
+        copy = Chem.Mol(conjoined)
+        self.assertEqual({i: i for i in range(conjoined.GetNumAtoms())},
+                         Monster.get_positional_mapping(conjoined, copy),
+                         'identical mols should map atom for atom')
+        self.assertEqual({i: i for i in range(conjoined.GetNumAtoms())},
+                         Monster.get_positional_mapping(conjoined, copy, dummy_w_dummy=False),
+                         'without dummy_w_dummy dummies are regular atoms')
+        # 3 Å away: over the cutoff (2 Å), but within the dummy cutoff (4 Å)
+        self.translate(copy, x=3)
+        self.assertEqual({0: 0, 5: 5}, Monster.get_positional_mapping(conjoined, copy),
+                         'only the dummies should be in range')
+        self.assertEqual({}, Monster.get_positional_mapping(conjoined, copy, dummy_w_dummy=False),
+                         'without dummy_w_dummy nothing should be in range')
+        self.translate(copy, x=20)
+        self.assertEqual({}, Monster.get_positional_mapping(conjoined, copy), 'nothing should be in range')
+
+    def test_positional_assignment(self):
+        from fragmenstein.monster.positional_mapping import GPM
+
+        class OptimalGPM(GPM):
+            assignment = 'optimal'
+
+        distances = np.array([[1.0, 1.5],
+                              [1.2, 3.0]])
+        self.assertEqual({0: 0}, GPM._gpm_covert(distances, 2), 'greedy takes the closest first')
+        self.assertEqual({0: 1, 1: 0}, OptimalGPM._gpm_covert(distances, 2), 'optimal maximises the pairs')
+
+    def test_spatial_index(self):
+        from fragmenstein.monster.spatial_index import SpatialIndex
+        mol = self.make_mol('c1ccccc1CCCCO')
+        xyz = SpatialIndex.get_coordinates(mol)
+        idx_A, idx_B, distances = SpatialIndex.get_close_pairs(xyz, xyz, 2.)
+        dense = Chem.Get3DDistanceMatrix(mol)
+        expected = list(zip(*np.where(dense <= 2.)))
+        self.assertEqual(expected, list(zip(idx_A, idx_B)), 'the tree query differs from the dense matrix')
+        self.assertTrue(np.allclose(dense[idx_A, idx_B], distances))
+
+    def test_mcs_cache(self):
+        from fragmenstein.monster import MCSCache
+        toluene = self.make_mol('Cc1ccccc1')
+        phenol = self.make_mol('Oc1ccccc1')
+        monster = Monster([toluene])
+        monster.mcs_cache = MCSCache()
+        mode = monster.matching_modes[-1]
+        fresh = monster._get_atom_maps(toluene, phenol, **mode)
+        cached = monster._get_atom_maps(toluene, phenol, **mode)
+        self.assertEqual(fresh, cached)
+        self.assertEqual((1, 1), (monster.mcs_cache.hits, monster.mcs_cache.misses))
+        # same compound, different atom order
+        renumbered = Chem.RenumberAtoms(phenol, list(reversed(range(phenol.GetNumAtoms()))))
+        expected = monster._get_atom_maps_from_mcs(toluene, renumbered, monster._find_mcs(toluene, renumbered, **mode))
+        self.assertEqual(set(expected), set(monster._get_atom_maps(toluene, renumbered, **mode)))
+        self.assertEqual(2, monster.mcs_cache.hits)
+        # the maps are truncated by mcs_max_matches, so it is part of the key
+        monster.mcs_max_matches = 1
+        self.assertEqual(1, len(monster._get_atom_maps(toluene, phenol, **mode)))
+        self.assertEqual(2, monster.mcs_cache.misses)
+
+    def test_mcs_budget(self):
+        from fragmenstein.monster import MCSCache
+        toluene = self.make_mol('Cc1ccccc1')
+        monster = Monster([toluene])
+        monster.mcs_cache = MCSCache()
+        monster.mcs_budget = 0
+        monster.place(Chem.MolFromSmiles('Oc1ccccc1'), merging_mode='full')  # degrades to the strict mapping
+        self.assertTrue(monster.mcs_exhausted)
+        self.assertEqual(Chem.MolToSmiles(monster.positioned_mol), 'Oc1ccccc1')
+        # a placement of several hits goes through too
+        monster = Monster([MProVictor.get_mol('x0107'), MProVictor.get_mol('x0434')])
+        monster.mcs_cache = MCSCache()
+        monster.mcs_budget = 0
+        monster.place(Chem.MolFromSmiles('Cc1ccncc1NC(=O)Cc1cccc(Cl)c1'), merging_mode='full')
+        self.assertTrue(monster.mcs_exhausted)
+        self.assertIsNotNone(monster.positioned_mol)
+
+    def test_symmetric_atom_maps(self):
+        from rdkit.Chem import rdFMCS
+        toluene = Chem.MolFromMolFile('test_mols/toluene.mol')
+        rototoluene = Chem.MolFromMolFile('test_mols/rototoluene.mol')
+        monster = Monster([toluene])
+        mcs = rdFMCS.FindMCS([toluene, rototoluene], **monster.matching_modes[-1])
+        common = Chem.MolFromSmarts(mcs.smartsString)
+        # brute force: all matches of one against all matches of the other
+        expected = {tuple(sorted(zip(a, b))) for a in toluene.GetSubstructMatches(common, uniquify=False)
+                    for b in rototoluene.GetSubstructMatches(common, uniquify=False)}
+        found = monster._get_atom_maps_from_mcs(toluene, rototoluene, mcs)
+        self.assertEqual(expected, set(found))
+        self.assertEqual(len(expected), len(found))
+
+    def test_parallel_unmerge(self):
+        from fragmenstein.monster import Unmerge
+        hits = [MProVictor.get_mol(code) for code in ('x0107', 'x0434', 'x1382')]
+        monster = Monster(hits)
+        followup = Chem.MolFromSmiles('Cc1ccncc1NC(=O)Cc1cccc(Cl)c1')
+        maps = {hit.GetProp('_Name'): [dict(p) for p in monster._get_atom_maps(followup, hit,
+                                                                              **monster.matching_modes[-1])]
+                for hit in monster.hits}
+        serial = Unmerge(followup=followup, mols=monster.hits, maps=maps, n_workers=1)
+        parallel = Unmerge(followup=followup, mols=monster.hits, maps=maps, n_workers=2)
+        self.assertEqual(serial.combined_map, parallel.combined_map)
+        self.assertEqual(serial.combined_map_alternatives, parallel.combined_map_alternatives)
+        self.assertEqual([m.GetProp('_Name') for m in serial.disregarded],
+                         [m.GetProp('_Name') for m in parallel.disregarded])
+        self.assertEqual(Chem.MolToSmiles(serial.combined_bonded), Chem.MolToSmiles(parallel.combined_bonded))
+        # hits sharing a name are told apart by position
+        twins = [Chem.Mol(hits[0]), Chem.Mol(hits[0])]
+        serial = Unmerge(followup=followup, mols=twins, maps=maps, n_workers=1)
+        parallel = Unmerge(followup=followup, mols=twins, maps=maps, n_workers=2)
+        self.assertEqual(serial.c_included_options, parallel.c_included_options)
+        self.assertEqual([twins.index(m) for m in serial.disregarded], [twins.index(m) for m in parallel.disregarded])
+
+    def test_unmerge_branch_and_bound(self):
+        from fragmenstein.monster import Unmerge
+        hits = [MProVictor.get_mol(code) for code in ('x0305', 'x1249', 'x0692', 'x0434')]
+        monster = Monster(hits)
+        followup = Chem.MolFromSmiles('Cc1ccncc1NC(=O)Cc1cccc(Cl)c1')
+        maps = {hit.GetProp('_Name'): [dict(p) for p in monster._get_atom_maps(followup, hit,
+                                                                              **monster.matching_modes[0])]
+                for hit in monster.hits}
+        ExhaustiveUnmerge = type('ExhaustiveUnmerge', (Unmerge,), {'branch_and_bound': False})
+        pruned = Unmerge(followup=followup, mols=monster.hits, maps=maps)
+        exhaustive = ExhaustiveUnmerge(followup=followup, mols=monster.hits, maps=maps)
+        # branches were pruned, yet the best combination is the same
+        self.assertGreater(pruned.n_pruned, 0)
+        self.assertEqual(exhaustive.n_pruned, 0)
+        self.assertLess(len(pruned.c_options), len(exhaustive.c_options))
+        self.assertEqual(pruned.combined_map, exhaustive.combined_map)
+        self.assertEqual(pruned.combined_map_alternatives, exhaustive.combined_map_alternatives)
+        self.assertEqual([m.GetProp('_Name') for m in pruned.disregarded],
+                         [m.GetProp('_Name') for m in exhaustive.disregarded])
+
+    def test_sextant_cache(self):
+        hits = [MProVictor.get_mol(code) for code in ('x0107', 'x0434', 'x1382')]
+        monster = Monster(hits)
+        monster.place(Chem.MolFromSmiles('Cc1ccncc1NC(=O)Cc1cccc(Cl)c1'), merging_mode='none')
+        # embedded once for the placement and its alternatives
+        self.assertEqual(len(monster._sextant_cache), 1)
+        ensemble = list(monster._sextant_cache.values())[0]
+        self.assertEqual(ensemble.GetNumConformers(), monster.sextant_conformers)
+        self.assertEqual(monster.positioned_mol.GetNumConformers(), 1)
+
+    def test_place_many(self):
+        hits = [MProVictor.get_mol(code) for code in ('x0107', 'x0434', 'x1382')]
+        smiles = ['Cc1ccncc1NC(=O)Cc1cccc(Cl)c1', 'not a smiles', 'Cc1ccncc1NC(=O)Cc1ccccc1']
+        monster = Monster(hits)
+        placed = list(monster.place_many(smiles))
+        self.assertEqual(len(placed), 3)
+        self.assertIsNone(placed[1])
+        self.assertIsNone(monster._hit_cache)
+        for smi, mol in zip(smiles[::2], placed[::2]):
+            single = Monster(hits).place_smiles(smi)
+            self.assertEqual(Chem.MolToSmiles(mol), Chem.MolToSmiles(single.positioned_mol))
+            self.assertEqual(single.origin_from_mol(single.positioned_mol), monster.origin_from_mol(mol))
+
+    def test_posthoc_refine(self):
+        hits = [MProVictor.get_mol(code) for code in ('x0434', 'x0540')]
+        monster = Monster(hits)
+        refined = monster.posthoc_refine(hits[0])
+        name = hits[0].GetProp('_Name')
+        for atom in refined.GetAtoms():
+            origins = json.loads(atom.GetProp('_Origin'))
+            self.assertIn(f'{name}.{atom.GetIdx()}', origins)
+            self.assertGreaterEqual(atom.GetDoubleProp('_Max'), atom.GetDoubleProp('_Stdev'))
+            if len(origins) == 1:
+                self.assertEqual(atom.GetDoubleProp('_Max'), 0.)
+
+    def test_unmerge_inter_map(self):
+        from fragmenstein.monster import Unmerge
+        from fragmenstein.monster.unmerge_mapper import UnmergeState
+        hits = [MProVictor.get_mol(code) for code in ('x0107', 'x0434', 'x1382')]
+        monster = Monster(hits)
+        followup = Chem.MolFromSmiles('Cc1ccncc1NC(=O)Cc1cccc(Cl)c1')
+        maps = {hit.GetProp('_Name'): [dict(p) for p in monster._get_atom_maps(followup, hit,
+                                                                              **monster.matching_modes[-1])]
+                for hit in monster.hits}
+        unmerge = Unmerge(followup=followup, mols=monster.hits, maps=maps)
+        state = UnmergeState(included=(0, 1),
+                             offsets=(0, hits[0].GetNumAtoms(), hits[0].GetNumAtoms() + hits[1].GetNumAtoms()))
+        combined = unmerge.make_combined(state.included)
+        # from the precomputed blocks vs. from scratch
+        self.assertEqual(unmerge.get_positional_mapping(monster.hits[2], combined),
+                         unmerge.get_inter_map(2, state))
+        # the positions of a state are those of its combined mol
+        idxs = np.arange(combined.GetNumAtoms())
+        np.testing.assert_allclose(unmerge.hit_coordinates[unmerge.get_global_indices(state, idxs)],
+                                   combined.GetConformer().GetPositions())
+
+    def test_ring_registry(self):
+        toluene = Chem.MolFromMolFile('test_mols/toluene.mol')
+        toluene.SetProp('_Name', 'toluene')
+        monster = Monster([toluene])
+        collapsed = monster.collapse_ring(Chem.Mol(toluene))
+        cores = [atom for atom in collapsed.GetAtoms() if atom.GetIntProp('_ori_i') == -1]
+        self.assertEqual(len(cores), 1)
+        # the ring core carries a handle, the data is in the registry
+        self.assertFalse(cores[0].HasProp('_xs'))
+        ring = monster._get_ring(cores[0])
+        np.testing.assert_allclose(ring['xyz'], toluene.GetConformer().GetPositions()[ring['ori_is']])
+        expanded = monster.expand_ring(collapsed)
+        self.assertEqual(Chem.MolToSmiles(toluene), Chem.MolToSmiles(expanded))
+
+    def test_distance_context(self):
+        from fragmenstein.monster.distance_context import DistanceContext
+        from rdkit.Geometry import Point3D
+        toluene = Chem.MolFromMolFile('test_mols/toluene.mol')
+        mol = Chem.RWMol(toluene)
+        distances = DistanceContext(mol)
+        np.testing.assert_array_equal(distances.get_matrix(), Chem.Get3DDistanceMatrix(mol))
+        # appended and removed atoms are kept in step
+        n = mol.AddAtom(Chem.Atom(7))
+        mol.GetConformer().SetAtomPosition(n, Point3D(1., 2., 3.))
+        distances.add_atoms(mol)
+        mol.RemoveAtom(3)
+        mol.RemoveAtom(0)
+        distances.remove_atoms([3, 0])
+        np.testing.assert_array_equal(distances.get_matrix(), Chem.Get3DDistanceMatrix(mol))
+        # only the A-B distances remain
+        indices, matrix = distances.get_pair_matrix([0, 1], [1, 4])
+        self.assertEqual(indices.tolist(), [0, 1, 4])
+        self.assertTrue(np.isnan(matrix[0, 1]) and np.isnan(matrix[1, 1]))
+        self.assertAlmostEqual(matrix[0, 2], Chem.Get3DDistanceMatrix(mol)[0, 4])
+
+    def test_resource_cache(self):
+        from fragmenstein.igor import ResourceCache
+        cache = ResourceCache(max_scorefxns=2)
+        pdb_filename = os.path.join(MProVictor.get_mpro_path(), 'template.pdb')
+        pdbblock = cache.get_pdbblock(pdb_filename)
+        self.assertIs(cache.get_pdbblock(pdb_filename), pdbblock)
+        # poses and score functions are copies, so altering them does not alter the cache
+        pose = cache.get_apo_pose(pdbblock)
+        self.assertEqual(pose.total_residue(), cache.get_apo_pose(pdbblock).total_residue())
+        cst = pyrosetta.rosetta.core.scoring.ScoreType.coordinate_constraint
+        scorefxn = cache.get_scorefxn('ref2015', {'coordinate_constraint': 2.})
+        scorefxn.set_weight(cst, 5.)
+        self.assertEqual(cache.get_scorefxn('ref2015', {'coordinate_constraint': 2.}).get_weight(cst), 2.)
+        self.assertEqual((cache.hits, cache.misses), (3, 3))
+        cache.get_scorefxn('ref2015')
+        cache.get_scorefxn('ref2015_cart')
+        self.assertEqual(len(cache.stores['scorefxn']), 2)
 # ----------------------------------------------------------------------------------------------------------------------
 class UnresolvedProblems(unittest.TestCase):
     def test_recto_fail_A(self):